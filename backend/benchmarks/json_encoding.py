@@ -0,0 +1,102 @@
+"""Compare JSON backends on representative API payloads.
+
+Run with `python manage.py benchmark_json`.
+"""
+import json
+import timeit
+from datetime import datetime, timedelta
+
+from server.utils import fast_json
+
+
+def users_payload(count: int = 1000) -> dict:
+    """A `/api/v1/user/all` page as built by `handle_get_users`."""
+    created = datetime(2024, 1, 1)
+    users = [{
+        "id": i,
+        "created_utc": created + timedelta(minutes=i),
+        "updated_utc": created + timedelta(minutes=i, seconds=30),
+        "role_id": 2,
+        "first_name": f"First{i}",
+        "last_name": f"Last{i}",
+        "email": f"user{i}@example.com",
+        "role_name": "User"
+    } for i in range(1, count + 1)]
+    return {
+        "status_code": 200,
+        "message": "OK",
+        "status": "success",
+        "data": {"users": users, "next_cursor": count, "limit": count}
+    }
+
+
+def catalogue_payload(count: int = 100) -> dict:
+    """A `/api/v1/stripe/products` response with expanded prices."""
+    products = [{
+        "id": f"prod_{i:014d}",
+        "object": "product",
+        "active": True,
+        "created": 1700000000 + i,
+        "default_price": f"price_{i:014d}",
+        "description": "A representative product description " * 3,
+        "images": [f"https://files.stripe.com/links/{i}"],
+        "metadata": {"tier": "standard", "position": str(i)},
+        "name": f"Product {i}",
+        "display_price": {
+            "id": f"price_{i:014d}",
+            "object": "price",
+            "active": True,
+            "currency": "aud",
+            "type": "one_time",
+            "unit_amount": 1000 + i,
+            "unit_amount_decimal": str(1000 + i),
+            "recurring": None
+        }
+    } for i in range(count)]
+    return {
+        "status_code": 200,
+        "message": "OK",
+        "status": "success",
+        "data": {"products": products}
+    }
+
+
+def flask_default(obj: dict) -> bytes:
+    """What `jsonify` did before, the app's JSON encoder through the standard library."""
+    return json.dumps(obj, cls=fast_json.FastJSONEncoder).encode('utf-8')
+
+
+def _measure(encode, payload, number: int) -> tuple:
+    size = len(encode(payload))
+    seconds = min(timeit.repeat(lambda: encode(payload), number=number, repeat=3))
+    return seconds / number * 1e6, size
+
+
+def run(number: int = 200) -> list:
+    """Time each backend on each payload
+
+    Args:
+        number (int, optional): Encodes per measurement. Defaults to 200.
+
+    Returns:
+        list: a (payload, backend, microseconds per encode, bytes) tuple per measurement
+    """
+    backends = [backend for backend in fast_json.JSON_BACKENDS
+                if backend != 'orjson' or fast_json.orjson is not None]
+    previous = fast_json.get_json_backend()
+    results = []
+    try:
+        for payload_name, payload in (("users", users_payload()), ("catalogue", catalogue_payload())):
+            results.append((payload_name, "flask", *_measure(flask_default, payload, number)))
+            for backend in backends:
+                fast_json.set_json_backend(backend)
+                results.append((payload_name, backend, *_measure(fast_json.dumps_bytes, payload, number)))
+    finally:
+        fast_json.set_json_backend(previous)
+    return results
+
+
+def report(results: list):
+    print(f"{'payload':<12}{'backend':<10}{'us/encode':>12}{'bytes':>10}")
+    for payload_name, backend, micros, size in results:
+        print(f"{payload_name:<12}{backend:<10}{micros:>12.1f}{size:>10}")
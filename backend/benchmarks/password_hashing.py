@@ -0,0 +1,97 @@
+"""Measure login throughput under concurrent load, and what it does to other endpoints.
+
+Run with `python manage.py benchmark_passwords`.
+"""
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from loguru import logger
+
+from server import create_server, db
+from server.extensions import password_hasher
+from server.models.user import Role, User
+
+EMAIL = "benchmark@example.com"
+PASSWORD = "benchmark-password"
+
+
+def _login_worker(app, logins: int, results: list):
+    client = app.test_client()
+    for _ in range(logins):
+        response = client.post('/api/v1/auth/login', json={"email": EMAIL, "password": PASSWORD})
+        results.append(response.status_code)
+
+
+def _probe_worker(app, stop: threading.Event, latencies: list):
+    client = app.test_client()
+    while not stop.is_set():
+        start = time.perf_counter()
+        client.get('/api/v1/server/health')
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.005)
+
+
+def measure(workers: int, logins: int, concurrency: int, iterations: int) -> tuple:
+    """Run `logins` logins from `concurrency` threads while probing the health endpoint
+
+    Returns:
+        tuple: workers, logins per second, rejected logins, health p50 and p99 in milliseconds
+    """
+    app = create_server('testing')
+    logger.disable('server')
+    with tempfile.TemporaryDirectory() as directory:
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(directory, 'benchmark.sqlite')
+        app.config.update(PASSWORD_HASH_WORKERS=workers, PASSWORD_PBKDF2_ITERATIONS=iterations)
+        password_hasher.init_app(app)
+        with app.app_context():
+            db.create_all()
+            Role.insert_roles()
+            db.session.add(User(first_name="Benchmark", last_name="User", email=EMAIL, password=PASSWORD))
+            db.session.commit()
+
+        statuses, latencies, stop = [], [], threading.Event()
+        probe = threading.Thread(target=_probe_worker, args=(app, stop, latencies))
+        threads = [threading.Thread(target=_login_worker, args=(app, logins // concurrency, statuses))
+                   for _ in range(concurrency)]
+        probe.start()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        probe.join()
+        password_hasher.shutdown()
+        with app.app_context():
+            db.session.remove()
+            db.get_engine().dispose()
+    logger.enable('server')
+
+    succeeded = statuses.count(200)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return workers, succeeded / elapsed, statuses.count(503), quantiles[49], quantiles[98]
+
+
+def run(logins: int = 200, concurrency: int = 8, iterations: int = 150000) -> list:
+    """Compare hashing on the request threads with hashing in a process pool
+
+    Args:
+        logins (int, optional): Logins per measurement. Defaults to 200.
+        concurrency (int, optional): Threads logging in at once. Defaults to 8.
+        iterations (int, optional): pbkdf2 iterations. Defaults to 150000.
+
+    Returns:
+        list: a `measure` tuple for inline hashing and for a pool of one process per CPU
+    """
+    return [measure(workers, logins, concurrency, iterations) for workers in (0, os.cpu_count() or 1)]
+
+
+def report(results: list):
+    print(f"{'workers':<10}{'logins/s':>10}{'rejected':>10}{'health p50 ms':>15}{'health p99 ms':>15}")
+    for workers, throughput, rejected, p50, p99 in results:
+        mode = 'inline' if workers == 0 else str(workers)
+        print(f"{mode:<10}{throughput:>10.1f}{rejected:>10}{p50:>15.1f}{p99:>15.1f}")
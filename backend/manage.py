@@ -291,6 +291,84 @@ def test(filename=None, coverage_console=False):
     return exit_code
 
 
+####################################################################################
+#
+#         Diagnostics
+#
+####################################################################################
+
+
+@manager.option('-n',
+                '--number',
+                dest='number',
+                default=20,
+                type=int,
+                help='The most requests shown')
+@manager.option('-e',
+                '--endpoint',
+                dest='endpoint',
+                default=None,
+                help='Only show requests to this endpoint, e.g. user.get_users')
+@manager.option('-m',
+                '--min-ms',
+                dest='min_ms',
+                default=0,
+                type=float,
+                help='Only show requests at least this slow')
+def slow_requests(number, endpoint, min_ms):
+    """Show the newest entries of the slow request journal."""
+    from server.utils.slow_requests import journal_path, read_journal
+    entries = read_journal(journal_path(server_app), limit=number, endpoint=endpoint, min_ms=min_ms)
+    if not entries:
+        print('No slow requests recorded')
+    for entry in entries:
+        print('{time} {method} {path} -> {status} in {duration_ms}ms ({request_id})'.format(**entry))
+        print('    parameters: {}'.format(json.dumps(entry['parameters'])))
+        print('    timings: {}'.format(', '.join(f"{name}={duration}ms" for name, duration in entry['timings'].items())))
+        print('    queries: {}'.format(entry['queries']['count']))
+        for statement in entry['queries']['statements']:
+            print('        {duration_ms}ms, {executions}x {statement}'.format(**statement))
+        for call in entry['stripe_calls']:
+            print('    stripe: {call} {duration_ms}ms'.format(**call))
+
+
+####################################################################################
+#
+#         Benchmarks
+#
+####################################################################################
+
+
+@manager.option('-n',
+                '--number',
+                dest='number',
+                default=200,
+                type=int,
+                help='Encodes per measurement')
+def benchmark_json(number):
+    """Compare JSON backends on representative API payloads."""
+    from benchmarks.json_encoding import report, run
+    report(run(number=number))
+
+
+@manager.option('-n',
+                '--logins',
+                dest='logins',
+                default=200,
+                type=int,
+                help='Logins per measurement')
+@manager.option('-c',
+                '--concurrency',
+                dest='concurrency',
+                default=8,
+                type=int,
+                help='Threads logging in at once')
+def benchmark_passwords(logins, concurrency):
+    """Compare login throughput with inline and pooled password hashing."""
+    from benchmarks.password_hashing import report, run
+    report(run(logins=logins, concurrency=concurrency))
+
+
 ####################################################################################
 #
 #         Global
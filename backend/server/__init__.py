@@ -1,25 +1,30 @@
 import os
 import time
+from uuid import uuid4
 
 from dotenv import load_dotenv
 from flasgger import Swagger
-from flask import Flask, g, jsonify
+from flask import Flask, g, jsonify, request
 from flask_compress import Compress
-from flask_cors import CORS
 from flask_login import LoginManager
 from flask_mail import Mail
 from flask_rq import RQ
 from flask_sqlalchemy import SQLAlchemy
 
 from server.config import config as Config
-from server.extensions import compress, db, login_manager, mail
+from server.extensions import compress, db, limiter, login_manager, mail, metrics, password_hasher, profiler
 
 from .middlewares.api_logger import log_request, log_response
 from .middlewares.response_manipulator import response_manipulator
-from .middlewares.preflight import handle_preflight
+from .middlewares.cors import CORSMiddleware
+from .middlewares.profiler import init_profiler
+from .utils.fast_json import init_json
 from .utils.flasgger import setup_flasgger
 from .utils.http_status_codes import handle_status_code
 from .utils.logger import setup_logger
+from .utils.query_counter import init_query_counter
+from .utils.slow_requests import init_slow_requests
+from .utils.timing import init_timing
 
 
 def create_server(config_name=None):
@@ -27,18 +32,6 @@ def create_server(config_name=None):
     load_dotenv('config.env')
     server = Flask(__name__, static_folder='static')
 
-    # Apply the custom preflight handling middleware by calling it with the server
-    handle_preflight(server)  # Adjust this line to correctly apply your middleware
-
-    frontend_origin = os.getenv('FRONTEND_ORIGIN', 'http://localhost:3000')
-    CORS(server,
-         supports_credentials=True,
-         origins=[frontend_origin],
-         methods=["GET", "POST", "OPTIONS", "PUT", "DELETE"],
-         allow_headers=[
-             'Content-Type', 'Authorization', 'ngrok-skip-browser-warning'
-         ])
-
     setup_flasgger(server)
 
     if not config_name:
@@ -48,14 +41,39 @@ def create_server(config_name=None):
     server.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
     Config[config_name].init_app(server)
+    init_json(server)
+
+    # CORS wraps the whole app so preflights are answered before routing
+    server.wsgi_app = CORSMiddleware(server.wsgi_app,
+                                     origins=server.config['CORS_ORIGINS'],
+                                     max_age=server.config['CORS_MAX_AGE'])
+
+    # Profiling hooks go first so the profile covers every other hook
+    init_profiler(server)
 
     # Set up extensions
     db.init_app(server)
     login_manager.init_app(server)
     mail.init_app(server)
+    metrics.init_app(server)
+    profiler.init_app(server)
     compress.init_app(server)
+    limiter.init_app(server)
+    password_hasher.init_app(server)
     RQ(server)
 
+    # Size the in-process caches kept by the services from this app's config
+    from .integrations.stripe import init_stripe
+    from .services.api_key import api_key_cache
+    from .services.principal import principal_cache
+    from .services.revocation import token_revocations
+    from .services.stripe_catalogue import stripe_catalogue
+    principal_cache.init_app(server)
+    api_key_cache.init_app(server)
+    token_revocations.init_app(server)
+    init_stripe(server)
+    stripe_catalogue.init_app(server)
+
     # Configure SSL if platform supports it
     if not server.debug and not server.testing and not server.config[
             'SSL_DISABLE']:
@@ -69,6 +87,7 @@ def create_server(config_name=None):
     def before_request():
         # Store the start time in Flask's global `g` object
         g.start_time = time.time()
+        g.request_id = request.headers.get('X-Request-ID') or uuid4().hex
 
     # @server.errorhandler(404)
     # def page_not_found(e):
@@ -79,6 +98,9 @@ def create_server(config_name=None):
     server.before_request(log_request)
     server.after_request(response_manipulator)
     server.after_request(log_response)
+    init_slow_requests(server)
+    init_timing(server)
+    init_query_counter(server)
 
     # Register blueprints
     from .apis import server_blueprint as server_blueprint
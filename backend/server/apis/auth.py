@@ -1,9 +1,11 @@
 # Assuming you have a SECRET_KEY defined in your config
-from flask import Blueprint, request
+from flask import Blueprint, g, request
 from loguru import logger
 
-from server.handlers import (handle_login, handle_admin, handle_user, handle_refresh, handle_logout, handle_forgot_password, handle_reset_password)
-from server.middlewares import rate_limit, admin_token_required, user_token_required
+from server.handlers import (handle_login, handle_admin, handle_user, handle_refresh, handle_refresh_session, handle_logout, handle_revoke_token,
+                             handle_get_sessions, handle_revoke_session, handle_revoke_user_sessions, handle_create_api_key,
+                             handle_get_api_keys, handle_revoke_api_key, handle_forgot_password, handle_reset_password)
+from server.middlewares import rate_limit, admin_claims_required, admin_token_required, user_claims_required, user_token_required
 
 auth_blueprint = Blueprint("auth", __name__)
 
@@ -11,12 +13,12 @@ auth_blueprint = Blueprint("auth", __name__)
 @auth_blueprint.route("/login", methods=["POST", "OPTIONS"])
 @rate_limit(50, 30)  # Applying custom rate limit as decorator
 def login():
-    return handle_login(request.json)
+    return handle_login(request.json, device=request.user_agent.string)
 
 
 @auth_blueprint.route("/admin", methods=["GET"])
 @rate_limit(50, 30)  # Applying custom rate limit as decorator
-@admin_token_required
+@admin_claims_required
 def admin(user):
     logger.info(f"/admin route called by {user.email}")
     return handle_admin(user)
@@ -24,7 +26,7 @@ def admin(user):
 
 @auth_blueprint.route("/user", methods=["GET"])
 @rate_limit(50, 30)  # Applying custom rate limit as decorator
-@user_token_required
+@user_claims_required
 def user(user):
     logger.info(f"/user route called by {user.email}")
     return handle_user(user)
@@ -34,15 +36,83 @@ def user(user):
 @rate_limit(50, 30)  # Applying custom rate limit as decorator
 @user_token_required
 def refresh(user):
+    """Deprecated, re-issue an access token for a valid access token when `LEGACY_TOKEN_REFRESH_ENABLED`."""
     logger.info(f"/refresh route called by {user.email}")
-    return handle_refresh(user)
+    return handle_refresh(user, g.token_claims)
+
+
+@auth_blueprint.route("/refresh", methods=["POST"])
+@rate_limit(50, 30)  # Applying custom rate limit as decorator
+def refresh_session():
+    """Exchange a refresh token for a new access token and the session's next refresh token."""
+    return handle_refresh_session(request.get_json(silent=True))
+
+
+@auth_blueprint.route("/sessions", methods=["GET"])
+@rate_limit(50, 30)  # Applying custom rate limit as decorator
+@user_token_required
+def get_sessions(user):
+    return handle_get_sessions(user)
+
+
+@auth_blueprint.route("/sessions/<int:session_id>", methods=["DELETE"])
+@rate_limit(50, 30)  # Applying custom rate limit as decorator
+@user_token_required
+def revoke_session(user, session_id):
+    return handle_revoke_session(user, session_id)
+
+
+@auth_blueprint.route("/sessions", methods=["DELETE"])
+@rate_limit(50, 30)  # Applying custom rate limit as decorator
+@user_token_required
+def revoke_sessions(user):
+    return handle_revoke_user_sessions(user, user.id)
+
+
+@auth_blueprint.route("/sessions/user/<int:user_id>", methods=["DELETE"])
+@rate_limit(50, 30)  # Applying custom rate limit as decorator
+@admin_token_required
+def revoke_user_sessions(user, user_id):
+    logger.info(f"/sessions/user/{user_id} route called by {user.email}")
+    return handle_revoke_user_sessions(user, user_id)
+
+
+@auth_blueprint.route("/api-keys", methods=["POST"])
+@rate_limit(50, 30)  # Applying custom rate limit as decorator
+@user_token_required
+def create_api_key(user):
+    logger.info(f"/api-keys route called by {user.email}")
+    return handle_create_api_key(user, request.get_json(silent=True))
+
+
+@auth_blueprint.route("/api-keys", methods=["GET"])
+@rate_limit(50, 30)  # Applying custom rate limit as decorator
+@user_token_required
+def get_api_keys(user):
+    return handle_get_api_keys(user)
+
+
+@auth_blueprint.route("/api-keys/<int:key_id>", methods=["DELETE"])
+@rate_limit(50, 30)  # Applying custom rate limit as decorator
+@user_token_required
+def revoke_api_key(user, key_id):
+    logger.info(f"/api-keys/{key_id} route called by {user.email}")
+    return handle_revoke_api_key(user, key_id)
 
 
 @auth_blueprint.route("/logout", methods=["POST"])
 @rate_limit(50, 30)  # Applying custom rate limit as decorator
 @user_token_required
 def logout(user):
-    return handle_logout(user)
+    return handle_logout(user, g.token_claims, request.get_json(silent=True))
+
+
+@auth_blueprint.route("/revoke", methods=["POST"])
+@rate_limit(50, 30)  # Applying custom rate limit as decorator
+@admin_token_required
+def revoke(user):
+    logger.info(f"/revoke route called by {user.email}")
+    return handle_revoke_token(user, request.json)
 
 
 @auth_blueprint.route("/forgot-password", methods=["POST"])
@@ -3,13 +3,13 @@ from flask import Blueprint, request
 from loguru import logger
 
 from server.handlers import (handle_get_roles)
-from server.middlewares import rate_limit, user_token_required, admin_token_required
+from server.middlewares import rate_limit, admin_claims_required
 
 role_blueprint = Blueprint("role", __name__)
 
 
 @role_blueprint.route("/all", methods=["GET"])
 @rate_limit(50, 30)  # Applying custom rate limit as decorator
-@admin_token_required
+@admin_claims_required
 def get_roles(user):
     return handle_get_roles(user)
\ No newline at end of file
@@ -1,6 +1,11 @@
-from flask import Blueprint, Response, jsonify, send_from_directory
+import os
+
+from flask import Blueprint, Response, current_app, jsonify, request, send_file, send_from_directory
 from loguru import logger
 
+from server.extensions import metrics, profiler
+from server.middlewares.authorizer import admin_token_required
+from server.middlewares.profiler import profile_path
 from server.utils.http_status_codes import handle_status_code
 
 server_blueprint = Blueprint('server', __name__)
@@ -19,3 +24,49 @@ def health_check():
 @server_blueprint.route('/javascript/<path:filename>')
 def serve_js(filename):
     return send_from_directory('static/javascript', filename)
+
+
+@server_blueprint.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Prometheus metrics for every worker on this host, in the text exposition format.
+    Served to scrapers sending `METRICS_TOKEN` as a bearer token or calling from `METRICS_ALLOWED_IPS`.
+    """
+    if not metrics.enabled:
+        code = 404
+        return handle_status_code(code, data={"info": "Metrics are disabled"}), code
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if not metrics.allows(request.remote_addr, token if scheme.lower() == 'bearer' else None):
+        code = 403
+        return handle_status_code(code, data={"error_info": "Metrics are not available to this client"}), code
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@server_blueprint.route('/profiler', methods=['GET'])
+@admin_token_required
+def get_profiler_stacks(user):
+    """
+    This worker's continuously sampled CPU stacks in the folded format flamegraph tools read,
+    over the last `seconds` (default every window kept).
+    """
+    if not profiler.enabled:
+        code = 404
+        return handle_status_code(code, data={"info": "Profiler is disabled"}), code
+    seconds = request.args.get('seconds', type=float)
+    lines = [f"{stack} {count}\n" for stack, count in profiler.folded(seconds).most_common()]
+    response = Response(''.join(lines), mimetype='text/plain')
+    response.headers['X-Worker-Pid'] = str(os.getpid())
+    return response
+
+
+@server_blueprint.route('/profiles/<profile_id>', methods=['GET'])
+@admin_token_required
+def get_profile(user, profile_id):
+    """
+    Download a request profile by the id returned in its `X-Profile-Id` header.
+    """
+    path = profile_path(current_app, profile_id)
+    if path is None:
+        code = 404
+        return handle_status_code(code, data={"error_info": "Profile not found"}), code
+    return send_file(path, as_attachment=True, attachment_filename=path.rsplit('/', 1)[-1])
@@ -3,7 +3,7 @@ from flask import Blueprint, request
 from loguru import logger
 
 from server.handlers import (handle_create_user, handle_get_users, handle_get_user, handle_get_user_by_id, handle_update_user, handle_update_user_by_id, handle_delete_user, handle_delete_user_by_id)
-from server.middlewares import rate_limit, user_token_required, admin_token_required
+from server.middlewares import rate_limit, user_token_required, admin_token_required, user_claims_required, admin_claims_required
 
 user_blueprint = Blueprint("user", __name__)
 
@@ -58,21 +58,21 @@ def create_user():
 
 @user_blueprint.route("/all", methods=["GET"])
 @rate_limit(50, 30)  # Applying custom rate limit as decorator
-@admin_token_required
+@admin_claims_required
 def get_users(user):
-    return handle_get_users(user)
+    return handle_get_users(user, request.args)
 
 
 @user_blueprint.route("/", methods=["GET"])
 @rate_limit(50, 30)  # Applying custom rate limit as decorator
-@user_token_required
+@user_claims_required
 def get_user(user):
     return handle_get_user(user)
 
 
 @user_blueprint.route("/<int:userId>", methods=["GET"])
 @rate_limit(50, 30)  # Applying custom rate limit as decorator
-@admin_token_required
+@admin_claims_required
 def get_user_by_id(user, userId):
     # Assuming 'handle_get_user' can accept a userId to fetch a specific user
     return handle_get_user_by_id(userId)
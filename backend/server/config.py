@@ -47,6 +47,135 @@ class ServerConfig:
     FAKE_EMAIL = os.environ.get('FAKE_EMAIL')
     FAKE_PASSWORD = os.environ.get('FAKE_PASSWORD')
 
+    # CORS, a comma separated list of origins which may include wildcard subdomains like https://*.example.com
+    CORS_ORIGINS = os.environ.get('FRONTEND_ORIGIN', 'http://localhost:3000')
+    CORS_MAX_AGE = int(os.environ.get('CORS_MAX_AGE', 3600))
+
+    # Prometheus metrics, `mmap` shares them between the workers on a host
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_STORAGE = os.environ.get('METRICS_STORAGE', 'memory')
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    # Scrapers send METRICS_TOKEN as a bearer token or call from one of these comma separated addresses or networks
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1')
+
+    # Query counting, repeated statements and requests over the budget are logged, 0 disables either
+    QUERY_N_PLUS_ONE_THRESHOLD = int(os.environ.get('QUERY_N_PLUS_ONE_THRESHOLD', 5))
+    QUERY_BUDGET_WARNING = int(os.environ.get('QUERY_BUDGET_WARNING', 0))
+
+    # Per-phase request timings in a Server-Timing response header
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED',
+                                           'true').lower() == 'true'
+
+    # On-demand profiling of admin requests sent with an `X-Profile` header, see `middlewares/profiler.py`
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    PROFILE_SAMPLE_HZ = float(os.environ.get('PROFILE_SAMPLE_HZ', 1000))
+
+    # Continuous sampling profiler, folded stacks are served at /api/v1/server/profiler
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'false').lower() == 'true'
+    PROFILER_HZ = float(os.environ.get('PROFILER_HZ', 19))
+    PROFILER_WINDOW_SECONDS = float(os.environ.get('PROFILER_WINDOW_SECONDS', 60))
+    PROFILER_WINDOWS = int(os.environ.get('PROFILER_WINDOWS', 10))
+
+    # Slow request journal in data/server/slow_requests, read it with `python manage.py slow_requests`
+    SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 1000))
+    SLOW_REQUEST_JOURNAL_PATH = os.environ.get('SLOW_REQUEST_JOURNAL_PATH')
+    SLOW_REQUEST_JOURNAL_MAX_BYTES = int(os.environ.get('SLOW_REQUEST_JOURNAL_MAX_BYTES', 5 * 1024 * 1024))
+    SLOW_REQUEST_JOURNAL_FILES = int(os.environ.get('SLOW_REQUEST_JOURNAL_FILES', 5))
+    SLOW_REQUEST_MAX_STATEMENTS = int(os.environ.get('SLOW_REQUEST_MAX_STATEMENTS', 20))
+
+    # Rate Limiting
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED',
+                                        'true').lower() == 'true'
+    RATE_LIMIT_STRATEGY = os.environ.get('RATE_LIMIT_STRATEGY', 'sliding_window')
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE', 'memory')
+    RATE_LIMIT_STORAGE_PATH = os.environ.get('RATE_LIMIT_STORAGE_PATH')
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 65536))
+
+    # Password hashing processes per web worker, -1 shares the CPUs between WEB_CONCURRENCY web workers
+    # and 0 hashes on the request thread
+    PASSWORD_HASH_ALGORITHM = os.environ.get('PASSWORD_HASH_ALGORITHM', 'pbkdf2')
+    PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 150000))
+    PASSWORD_SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', 32768))
+    PASSWORD_SCRYPT_R = int(os.environ.get('PASSWORD_SCRYPT_R', 8))
+    PASSWORD_SCRYPT_P = int(os.environ.get('PASSWORD_SCRYPT_P', 1))
+    PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 3))
+    PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 65536))
+    PASSWORD_ARGON2_PARALLELISM = int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 4))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 0))
+    PASSWORD_HASH_TIMEOUT_SECONDS = float(os.environ.get('PASSWORD_HASH_TIMEOUT_SECONDS', 10))
+
+    # Authenticated principal cache
+    PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 10000))
+    PRINCIPAL_CACHE_TTL_SECONDS = float(
+        os.environ.get('PRINCIPAL_CACHE_TTL_SECONDS', 60))
+
+    # Access tokens, and the refresh token sessions that renew them
+    TOKEN_EXPIRATION_TIME_SECONDS = int(os.environ.get('TOKEN_EXPIRATION_TIME_SECONDS', 900))
+    REFRESH_TOKEN_EXPIRATION_SECONDS = int(os.environ.get('REFRESH_TOKEN_EXPIRATION_SECONDS', 30 * 86400))
+    # Deprecated `GET /auth/refresh`, renewing an access token with itself
+    LEGACY_TOKEN_REFRESH_ENABLED = os.environ.get('LEGACY_TOKEN_REFRESH_ENABLED', 'false').lower() == 'true'
+
+    # API keys for machine clients, cached per worker by prefix and rate limited per key
+    API_KEY_CACHE_SIZE = int(os.environ.get('API_KEY_CACHE_SIZE', 10000))
+    API_KEY_CACHE_TTL_SECONDS = float(os.environ.get('API_KEY_CACHE_TTL_SECONDS', 60))
+    API_KEY_UNKNOWN_CACHE_SIZE = int(os.environ.get('API_KEY_UNKNOWN_CACHE_SIZE', 1000))
+    API_KEY_SYNC_SECONDS = float(os.environ.get('API_KEY_SYNC_SECONDS', 5))
+    API_KEY_RATE_LIMIT = int(os.environ.get('API_KEY_RATE_LIMIT', 600))
+    API_KEY_RATE_LIMIT_WINDOW = int(os.environ.get('API_KEY_RATE_LIMIT_WINDOW', 60))
+
+    # Token revocation, each worker checks a Bloom filter over the revoked tokens table
+    REVOCATION_FILTER_CAPACITY = int(os.environ.get('REVOCATION_FILTER_CAPACITY', 100000))
+    REVOCATION_FILTER_ERROR_RATE = float(os.environ.get('REVOCATION_FILTER_ERROR_RATE', 0.001))
+    REVOCATION_SYNC_SECONDS = float(os.environ.get('REVOCATION_SYNC_SECONDS', 5))
+    REVOCATION_REBUILD_SECONDS = float(os.environ.get('REVOCATION_REBUILD_SECONDS', 3600))
+
+    # Stateless auth, read-only routes authorize from token claims while they are fresh
+    AUTH_STATELESS = os.environ.get('AUTH_STATELESS', 'false').lower() == 'true'
+    AUTH_STATELESS_MAX_STALENESS_SECONDS = float(
+        os.environ.get('AUTH_STATELESS_MAX_STALENESS_SECONDS', 60))
+
+    # Stripe catalogue cache
+    STRIPE_CATALOGUE_FRESH_SECONDS = float(
+        os.environ.get('STRIPE_CATALOGUE_FRESH_SECONDS', 60))
+    STRIPE_CATALOGUE_STALE_SECONDS = float(
+        os.environ.get('STRIPE_CATALOGUE_STALE_SECONDS', 3600))
+    STRIPE_CATALOGUE_REFRESH_SECONDS = float(
+        os.environ.get('STRIPE_CATALOGUE_REFRESH_SECONDS', 300))
+    STRIPE_MAX_CONCURRENCY = int(os.environ.get('STRIPE_MAX_CONCURRENCY', 8))
+
+    # Stripe client resilience
+    STRIPE_TIMEOUT_SECONDS = float(os.environ.get('STRIPE_TIMEOUT_SECONDS', 10))
+    STRIPE_DEADLINE_SECONDS = float(os.environ.get('STRIPE_DEADLINE_SECONDS', 20))
+    STRIPE_MAX_RETRIES = int(os.environ.get('STRIPE_MAX_RETRIES', 2))
+    STRIPE_BACKOFF_BASE_SECONDS = float(
+        os.environ.get('STRIPE_BACKOFF_BASE_SECONDS', 0.25))
+    STRIPE_BACKOFF_CAP_SECONDS = float(
+        os.environ.get('STRIPE_BACKOFF_CAP_SECONDS', 2))
+    STRIPE_BREAKER_FAILURES = int(os.environ.get('STRIPE_BREAKER_FAILURES', 5))
+    STRIPE_BREAKER_RECOVERY_SECONDS = float(
+        os.environ.get('STRIPE_BREAKER_RECOVERY_SECONDS', 30))
+
+    # JSON encoding, `auto` uses orjson when it is installed
+    JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto')
+    JSONIFY_PRETTYPRINT_REGULAR = False
+
+    # Response body logging, sample rates are per status (`404`, `5xx`) or endpoint (`user.get_users`)
+    RESPONSE_LOG_BODY = os.environ.get('RESPONSE_LOG_BODY', 'true').lower() == 'true'
+    RESPONSE_LOG_MAX_BYTES = int(os.environ.get('RESPONSE_LOG_MAX_BYTES', 500))
+    RESPONSE_LOG_SAMPLE_RATE = float(os.environ.get('RESPONSE_LOG_SAMPLE_RATE', 1.0))
+    RESPONSE_LOG_SAMPLE_RATES = os.environ.get('RESPONSE_LOG_SAMPLE_RATES', '')
+
+    # Logging, `json` lines are written by a background thread, `text` is colorized for development
+    LOG_FORMAT = os.environ.get('LOG_FORMAT')
+    LOG_BUFFER_SIZE = int(os.environ.get('LOG_BUFFER_SIZE', 10000))
+    LOG_FILE_MAX_BYTES = int(os.environ.get('LOG_FILE_MAX_BYTES', 10 * 1024 * 1024))
+    LOG_FILE_BACKUP_COUNT = int(os.environ.get('LOG_FILE_BACKUP_COUNT', 10))
+    LOG_FILE_COMPRESS = os.environ.get('LOG_FILE_COMPRESS', 'true').lower() == 'true'
+
     @staticmethod
     def init_app(app):
         pass
@@ -69,6 +198,7 @@ class DevelopmentConfig(ServerConfig):
 class TestingConfig(ServerConfig):
     ENV = 'testing'
     TESTING = True
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0))
     SQLALCHEMY_DATABASE_URI = os.environ.get(
         'TEST_DATABASE_URL',
         'sqlite:///' + os.path.join(root_project_dir, 'data-test.sqlite'))
@@ -82,6 +212,8 @@ class TestingConfig(ServerConfig):
 class ProductionConfig(ServerConfig):
     ENV = 'production'
     DEBUG = False
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE', 'shared_memory')
+    METRICS_STORAGE = os.environ.get('METRICS_STORAGE', 'mmap')
     SQLALCHEMY_DATABASE_URI = os.environ.get(
         'DATABASE_URL',
         'sqlite:///' + os.path.join(root_project_dir, 'data.sqlite'))
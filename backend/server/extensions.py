@@ -4,8 +4,17 @@ from flask_mail import Mail
 from flask_rq import RQ
 from flask_sqlalchemy import SQLAlchemy
 
+from server.utils.metrics import MetricsRegistry
+from server.utils.passwords import PasswordHasher
+from server.utils.rate_limiter import RateLimiter
+from server.utils.stack_sampler import ContinuousProfiler
+
 # Initialize extensions
 db = SQLAlchemy()
 login_manager = LoginManager()
 mail = Mail()
 compress = Compress()
+limiter = RateLimiter()
+metrics = MetricsRegistry()
+profiler = ContinuousProfiler()
+password_hasher = PasswordHasher()
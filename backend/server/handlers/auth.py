@@ -4,16 +4,17 @@ import jwt
 # Assuming you have a SECRET_KEY defined in your config
 from flask import current_app, request
 from loguru import logger
-from werkzeug.security import check_password_hash
 
 from server.models import User, Role  # Your User model
 from server.schemas import UserSchema  # Your User schema
-from server.services import login_user, get_new_token
+from server.services import (login_user, get_new_token, renew_token, revoke_token, rotate_session, get_user_sessions,
+                             revoke_session, revoke_session_by_token, revoke_user_sessions, create_api_key,
+                             get_user_api_keys, revoke_api_key)
 from server.utils.http_status_codes import handle_status_code
 from server.handlers.global_functions import check_not_success_message_and_get_code_and_response
 
 
-def handle_login(request_data):
+def handle_login(request_data, device=None):
     email = request_data.get("email")
     password = request_data.get("password")
 
@@ -24,12 +25,14 @@ def handle_login(request_data):
             code, data={"error_info": "Email and password are required"})
         return response, code
 
-    success, message, token = login_user(email, password)
-    
+    success, message, tokens = login_user(email, password, device=request_data.get("device") or device)
+
     if success:
         code = 200
-        response = handle_status_code(code, data={"info": message, "user_token": token})
+        response = handle_status_code(code, data={"info": message, **tokens})
         return response, code
+    elif "currently unavailable" in message:
+        return check_not_success_message_and_get_code_and_response(message)
     else:
         code = 401
         response = handle_status_code(code, data={"error_info": message})
@@ -70,26 +73,170 @@ def handle_user(user):
     return response, code
 
 
-def handle_refresh(user):
+def handle_refresh(user, claims):
+    if not current_app.config['LEGACY_TOKEN_REFRESH_ENABLED']:
+        code = 410
+        response = handle_status_code(code, data={"error_info": "Refresh with POST and a refresh token"})
+        return response, code
     if user is None:
         logger.warning("Unauthorized access to /refresh route, no user provided")
         code = 401
         response = handle_status_code(code, data={"error_info": "Unauthorized"})
     else:
-        logger.info(f"Token refreshed for {user.email}")
-        success, message, token = get_new_token(user)
+        success, message, token = renew_token(user, claims)
         if success:
+            logger.info(f"Token refreshed for {user.email}")
             code = 200
             response = handle_status_code(code, data={"info": "Token refreshed", "user_token": token})
         else:
-            code = 500
+            code = 500 if message == 'Unexpected error occurred' else 401
             response = handle_status_code(code, data={"error_info": message})
     return response, code
 
 
-def handle_logout(request_data):
-    # TODO: Implement logout functionality for backend (i.e. remove token)
-    pass
+def handle_refresh_session(request_data):
+    refresh_token = (request_data or {}).get("refresh_token")
+    if not refresh_token:
+        code = 400
+        response = handle_status_code(code, data={"error_info": "Refresh token is required"})
+        return response, code
+
+    success, message, session = rotate_session(refresh_token)
+    if not success:
+        code = 500 if message == 'Unexpected error occurred' else 401
+        response = handle_status_code(code, data={"error_info": message})
+        return response, code
+
+    principal, new_refresh_token, session_id = session
+    success, message, token = get_new_token(principal, session_id=session_id)
+    if not success:
+        code = 500
+        response = handle_status_code(code, data={"error_info": message})
+        return response, code
+    code = 200
+    response = handle_status_code(code, data={"info": "Token refreshed", "user_token": token,
+                                              "refresh_token": new_refresh_token})
+    return response, code
+
+
+def handle_get_sessions(user):
+    success, message, sessions = get_user_sessions(user.id)
+    if not success:
+        code = 500
+        response = handle_status_code(code, data={"error_info": message})
+        return response, code
+    code = 200
+    response = handle_status_code(code, data={"sessions": sessions})
+    return response, code
+
+
+def handle_revoke_session(user, session_id):
+    success, message = revoke_session(session_id, user_id=user.id)
+    if success:
+        code = 200
+        response = handle_status_code(code, data={"info": message})
+    else:
+        code = 404 if message == 'Session does not exist' else 500
+        response = handle_status_code(code, data={"error_info": message})
+    return response, code
+
+
+def handle_revoke_user_sessions(user, user_id):
+    success, message, revoked = revoke_user_sessions(user_id)
+    if success:
+        logger.info(f"{user.email} revoked {revoked} sessions of user {user_id}")
+        code = 200
+        response = handle_status_code(code, data={"info": message, "revoked": revoked})
+    else:
+        code = 500
+        response = handle_status_code(code, data={"error_info": message})
+    return response, code
+
+
+def handle_create_api_key(user, request_data):
+    request_data = request_data or {}
+    success, message, api_key = create_api_key(user,
+                                               name=request_data.get("name"),
+                                               scopes=request_data.get("scopes"),
+                                               rate_limit=request_data.get("rate_limit"),
+                                               rate_limit_window=request_data.get("rate_limit_window"),
+                                               expires_in_seconds=request_data.get("expires_in_seconds"))
+    if success:
+        code = 201
+        response = handle_status_code(code, data={"info": message, **api_key})
+    else:
+        code = {'Scopes exceed your permissions': 403, 'Unexpected error occurred': 500}.get(message, 400)
+        response = handle_status_code(code, data={"error_info": message})
+    return response, code
+
+
+def handle_get_api_keys(user):
+    success, message, api_keys = get_user_api_keys(user.id)
+    if not success:
+        code = 500
+        response = handle_status_code(code, data={"error_info": message})
+        return response, code
+    code = 200
+    response = handle_status_code(code, data={"api_keys": api_keys})
+    return response, code
+
+
+def handle_revoke_api_key(user, key_id):
+    # Admins may revoke anyone's key, users only their own
+    success, message = revoke_api_key(key_id, user_id=None if user.is_admin() else user.id)
+    if success:
+        code = 200
+        response = handle_status_code(code, data={"info": message})
+    else:
+        code = 404 if message == 'API key does not exist' else 500
+        response = handle_status_code(code, data={"error_info": message})
+    return response, code
+
+
+def handle_logout(user, claims, request_data=None):
+    refresh_token = (request_data or {}).get("refresh_token")
+    if refresh_token:
+        revoke_session_by_token(refresh_token)
+    elif claims.get("sid") is not None:
+        revoke_session(claims["sid"], user_id=user.id)
+    success, message = revoke_token(claims)
+    if success:
+        logger.info(f"User {user.email} logged out")
+        code = 200
+        response = handle_status_code(code, data={"info": "Logged out"})
+    elif message == 'Token cannot be revoked':
+        code = 400
+        response = handle_status_code(code, data={"error_info": message})
+    else:
+        code = 500
+        response = handle_status_code(code, data={"error_info": message})
+    return response, code
+
+
+def handle_revoke_token(user, request_data):
+    token = (request_data or {}).get("token")
+    if not token:
+        code = 400
+        response = handle_status_code(code, data={"error_info": "Token is required"})
+        return response, code
+    try:
+        # Expired tokens are already unusable, revoking one is harmless
+        claims = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"],
+                            options={"verify_exp": False})
+    except jwt.InvalidTokenError:
+        code = 400
+        response = handle_status_code(code, data={"error_info": "Token is invalid"})
+        return response, code
+
+    success, message = revoke_token(claims)
+    if success:
+        logger.info(f"Admin {user.email} revoked a token of user {claims.get('user_id')}")
+        code = 200
+        response = handle_status_code(code, data={"info": message})
+    else:
+        code = 400 if message == 'Token cannot be revoked' else 500
+        response = handle_status_code(code, data={"error_info": message})
+    return response, code
 
 
 def handle_forgot_password(request_data):
@@ -13,6 +13,10 @@ def check_not_success_message_and_get_code_and_response(message: str) -> Tuple[j
         logger.error(f"User already exists: {message}")
         code = 409
         response = handle_status_code(code, data={"error_info": message})
+    elif "currently unavailable" in message:
+        logger.error(f"Dependency unavailable: {message}")
+        code = 503
+        response = handle_status_code(code, data={"error_info": message})
     else:
         code = 500
         response = handle_status_code(code, data={"error_info": message})
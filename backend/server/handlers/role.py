@@ -4,6 +4,7 @@ from loguru import logger
 from server.services import (get_roles)
 from server.models import Role
 from server.utils.http_status_codes import handle_status_code
+from server.utils.serializer import serialize_many
 from server.handlers.global_functions import check_not_success_message_and_get_code_and_response
 
 
@@ -32,7 +33,7 @@ def unified_response(success: bool, message: str, data=None, code=500):
 def handle_get_roles(user):
     if user.is_admin():
         success, message, roles = get_roles()
-        role_dict_list = [role.to_dict(include_sensitive=True) for role in roles]
         if not success:
             return unified_response(False, message, code=500)
+        role_dict_list = serialize_many(Role, roles, include_sensitive=True)
         return unified_response(True, message, data={"roles": role_dict_list}, code=200)
\ No newline at end of file
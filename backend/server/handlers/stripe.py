@@ -1,8 +1,9 @@
 # Assuming you have a SECRET_KEY defined in your config
 from loguru import logger
 
-from server.services import (get_products, get_services, get_session_by_id)
-from server.utils.http_status_codes import handle_status_code
+from server.services import (get_catalogue_payload, get_products, get_services, get_session_by_id)
+from server.utils.http_status_codes import handle_status_code, raw_status_code
+from server.utils.streaming import stream_status_code, wants_stream
 from server.handlers.global_functions import check_not_success_message_and_get_code_and_response
 
 
@@ -29,18 +30,29 @@ def unified_response(success: bool, message: str, data=None, code=500):
         return response, code
 
 
-def handle_get_products():
-    success, message, products = get_products()
+def handle_get_products(request_args):
+    if wants_stream(request_args):
+        success, message, products = get_products()
+        if not success:
+            return unified_response(False, message, code=500)
+        return stream_status_code(200, "products", products)
+    # The catalogue is encoded once per refresh rather than per request
+    success, message, payload = get_catalogue_payload("products")
     if not success:
         return unified_response(False, message, code=500)
-    return unified_response(True, message, data={"products": products}, code=200)
+    return raw_status_code(200, payload)
 
 
-def handle_get_services():
-    success, message, services = get_services()
+def handle_get_services(request_args):
+    if wants_stream(request_args):
+        success, message, services = get_services()
+        if not success:
+            return unified_response(False, message, code=500)
+        return stream_status_code(200, "services", services)
+    success, message, payload = get_catalogue_payload("services")
     if not success:
         return unified_response(False, message, code=500)
-    return unified_response(True, message, data={"services": services}, code=200)
+    return raw_status_code(200, payload)
 
 
 def handle_get_session_by_id(user, session_id):
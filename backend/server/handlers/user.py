@@ -2,9 +2,10 @@
 from loguru import logger
 
 from server.schemas import UserSchema  # Your User schema
-from server.services import (create_user, get_users, get_user_by_id, update_user, update_user_by_id, delete_user, delete_user_by_id)
+from server.services import (create_user, get_users_page, iter_users, get_user_by_id, update_user, update_user_by_id, delete_user, delete_user_by_id)
 from server.models import User, Role
 from server.utils.http_status_codes import handle_status_code
+from server.utils.streaming import stream_status_code, wants_stream
 from server.handlers.global_functions import check_not_success_message_and_get_code_and_response
 
 
@@ -40,29 +41,51 @@ def handle_create_user(request_data):
     return unified_response(success, message, data={"info": message}, code=201 if success else 500)
 
 
-def handle_get_users(user):
+DEFAULT_USERS_PAGE_SIZE = 100
+MAX_USERS_PAGE_SIZE = 1000
+
+
+def parse_page_args(request_args) -> tuple[bool, str, int, int]:
+    """Parse the `limit` and `cursor` query parameters of a keyset paginated endpoint"""
+    try:
+        limit = int(request_args.get('limit', DEFAULT_USERS_PAGE_SIZE))
+        cursor = request_args.get('cursor')
+        cursor = int(cursor) if cursor not in (None, '') else None
+    except ValueError:
+        return False, 'limit and cursor must be integers', 0, None
+    if not 1 <= limit <= MAX_USERS_PAGE_SIZE:
+        return False, f'limit must be between 1 and {MAX_USERS_PAGE_SIZE}', 0, None
+    return True, 'Success', limit, cursor
+
+
+def handle_get_users(user, request_args):
     if user.is_admin():
-        success, message, users = get_users()
-        
-        user_dict_list = []
-        
-        for user in users:
-            role_name = user.get_role_name()
-            user_dict = user.to_dict()
-            user_dict['role_name'] = role_name
-            user_dict_list.append(user_dict)
-            
+        valid, message, limit, cursor = parse_page_args(request_args)
+        if not valid:
+            return handle_status_code(400, data={"error_info": message}), 400
+
+        if wants_stream(request_args):
+            # Streams every user after the cursor, so there is no next page
+            success, message, rows = iter_users(cursor=cursor)
+            if not success:
+                return unified_response(False, message, code=500)
+            return stream_status_code(200, "users", rows, trailer={"next_cursor": None})
+
+        success, message, page = get_users_page(limit=limit, cursor=cursor)
         if not success:
             return unified_response(False, message, code=500)
-        return unified_response(True, message, data={"users": user_dict_list}, code=200)
+        return unified_response(True, message, data={"users": page["users"], "next_cursor": page["next_cursor"], "limit": limit}, code=200)
     
     
-def handle_get_user(user):
+def handle_get_user(principal):
+    success, message, user = get_user_by_id(principal.id)
+    if not success:
+        return unified_response(False, message, code=500)
     if not isinstance(user, User):
         return unified_response(False, 'User not found', code=404)
     else:
         user_dict = user.to_dict()
-        user_dict['role_name'] = user.get_role_name()
+        user_dict['role_name'] = principal.role_name
         return unified_response(True, 'Success', data={"user": user_dict}, code=200)
 
 
@@ -75,7 +98,7 @@ def handle_get_user_by_id(userId):
     return unified_response(True, message, data={"user": user_dict}, code=200)
 
 
-def handle_update_user(user, request_data):
+def handle_update_user(principal, request_data):
     if "password" in request_data:
         # If there's an attempt to directly update the password, return an error response
         return unified_response(False, "Password updates are not allowed here. Please use the dedicated password update endpoint.", code=400)
@@ -84,6 +107,10 @@ def handle_update_user(user, request_data):
     if not valid:
         return unified_response(False, "Failed to update user. Provided data was not valid.", data={"error_info": data_or_errors}, code=400)
     
+    success, message, user = get_user_by_id(principal.id)
+    if not success or user is None:
+        return unified_response(False, 'User does not exist', code=400)
+
     success, message, user = update_user(user, data_or_errors)
     return unified_response(success, message, data={"user": user.to_dict()}, code=200 if success else 500)
 
@@ -104,8 +131,12 @@ def handle_update_user_by_id(userId, request_data):
     return unified_response(success, message, data={"user": user.to_dict()}, code=200 if success else 500)
 
 
-def handle_delete_user(user):
-    success, message, user = delete_user(user)
+def handle_delete_user(principal):
+    success, message, user = get_user_by_id(principal.id)
+    if not success or user is None:
+        return unified_response(False, 'User does not exist', code=400)
+
+    success, message = delete_user(user)
     if not success:
         return unified_response(False, message, code=500)
     return unified_response(True, message, data={"info": message}, code=200)
@@ -1,7 +1,140 @@
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
 import stripe
 from flask import jsonify
 from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from server.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from server.utils.singleflight import SingleFlight
+from server.utils.timing import merge_phases, phase, record_phases
+
+# Shared by every StripeIntegration in the process so concurrent requests coalesce
+_flights = SingleFlight()
+_executor = None
+_executor_pid = None
+_setup_lock = threading.Lock()
+_client_pid = None
+_integration = None
+
+# Opened when Stripe keeps failing so requests fail fast instead of tying up workers
+stripe_breaker = CircuitBreaker('Stripe')
+
+
+class StripeSettings:
+    """Timeouts, retries and concurrency for Stripe calls, set from the app's config by `init_stripe`.
+
+    Kept outside the app so the catalogue's background threads can read them without an
+    app context.
+    """
+
+    def __init__(self):
+        self.max_concurrency = 8
+        self.timeout_seconds = 10.0
+        self.deadline_seconds = 20.0
+        self.max_retries = 2
+        self.backoff_base_seconds = 0.25
+        self.backoff_cap_seconds = 2.0
+
+    def init_app(self, app):
+        config = app.config
+        self.max_concurrency = config.get('STRIPE_MAX_CONCURRENCY', 8)
+        self.timeout_seconds = config.get('STRIPE_TIMEOUT_SECONDS', 10.0)
+        self.deadline_seconds = config.get('STRIPE_DEADLINE_SECONDS', 20.0)
+        self.max_retries = config.get('STRIPE_MAX_RETRIES', 2)
+        self.backoff_base_seconds = config.get('STRIPE_BACKOFF_BASE_SECONDS', 0.25)
+        self.backoff_cap_seconds = config.get('STRIPE_BACKOFF_CAP_SECONDS', 2.0)
+
+
+stripe_settings = StripeSettings()
+
+
+def init_stripe(app):
+    """Configure Stripe calls, the circuit breaker and the price pool from the app's config
+
+    The pool and HTTP client are rebuilt on their next use so they pick up the new sizes.
+    """
+    global _executor, _client_pid
+    stripe_settings.init_app(app)
+    stripe_breaker.failure_threshold = app.config.get('STRIPE_BREAKER_FAILURES', 5)
+    stripe_breaker.recovery_seconds = app.config.get('STRIPE_BREAKER_RECOVERY_SECONDS', 30.0)
+    with _setup_lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=False)
+        _executor = None
+        _client_pid = None
+
+
+def to_plain(value):
+    """Recursively convert Stripe objects into plain dicts and lists that are safe to cache."""
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_plain(item) for item in value]
+    return value
+
+
+def _price_executor() -> ThreadPoolExecutor:
+    """Return this process's bounded pool for concurrent Stripe calls."""
+    global _executor, _executor_pid
+    # Pool threads do not survive a fork, so each worker creates its own
+    if _executor is None or _executor_pid != os.getpid():
+        with _setup_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=stripe_settings.max_concurrency,
+                                               thread_name_prefix='stripe')
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _configure_http_client():
+    """Install a pooled keep-alive HTTP client with a request timeout for this process."""
+    global _client_pid
+    if _client_pid == os.getpid():
+        return
+    with _setup_lock:
+        if _client_pid == os.getpid():
+            return
+        session = requests.Session()
+        pool_size = stripe_settings.max_concurrency * 2
+        session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
+        session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
+        stripe.default_http_client = stripe.http_client.RequestsClient(
+            timeout=stripe_settings.timeout_seconds, session=session)
+        # Retries are handled by StripeIntegration so they respect the deadline and breaker
+        stripe.max_network_retries = 0
+        _client_pid = os.getpid()
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+        return True
+    if isinstance(error, stripe.error.APIError):
+        return error.http_status is None or error.http_status >= 500
+    return False
+
+
+def get_stripe_integration() -> 'StripeIntegration':
+    """Return the process-wide Stripe integration, creating it on first use."""
+    global _integration
+    if _integration is None:
+        _integration = StripeIntegration()
+    return _integration
+
+
+def _call_name(fn) -> str:
+    """Name a Stripe API function for request diagnostics, e.g. `Product.list`."""
+    owner = getattr(fn, '__self__', None)
+    if owner is None:
+        return getattr(fn, '__qualname__', repr(fn))
+    owner_name = owner.__name__ if isinstance(owner, type) else type(owner).__name__
+    return f"{owner_name}.{fn.__name__}"
 
 
 class StripeIntegration:
@@ -13,47 +146,155 @@ class StripeIntegration:
         if not self.api_key:
             raise ValueError("Stripe API key (STRIPE_SECRET_KEY) is not set in environment variables.")
         stripe.api_key = self.api_key
+        _configure_http_client()
+
+    def _call(self, fn, *args, call_name=None, **kwargs):
+        """
+        Calls Stripe through the circuit breaker, retrying transient failures with
+        jittered exponential backoff until the call deadline.
+        :param fn: The Stripe API function to call.
+        :param call_name: The call's name in request diagnostics, required when `fn` wraps the API call.
+        :return: The result of the call.
+        """
+        with phase("stripe", detail=call_name or _call_name(fn)):
+            return self._call_with_retries(fn, *args, **kwargs)
+
+    def _call_with_retries(self, fn, *args, **kwargs):
+        stripe_breaker.before_call()
+        settings = stripe_settings
+        deadline = time.monotonic() + settings.deadline_seconds
+        attempt = 0
+        while True:
+            try:
+                result = fn(*args, **kwargs)
+            except stripe.error.StripeError as e:
+                if not _is_retryable(e):
+                    # Stripe answered, so it is healthy even though the request was rejected
+                    stripe_breaker.record_success()
+                    raise
+                backoff = random.uniform(0, min(settings.backoff_cap_seconds,
+                                                settings.backoff_base_seconds * 2**attempt))
+                if attempt >= settings.max_retries or time.monotonic() + backoff >= deadline:
+                    stripe_breaker.record_failure()
+                    raise
+                attempt += 1
+                logger.warning(f"Retrying Stripe call after error ({attempt}): {e}")
+                time.sleep(backoff)
+                continue
+            except Exception:
+                # Anything else must still settle the call, or a half open trial would never end
+                stripe_breaker.record_failure()
+                raise
+            stripe_breaker.record_success()
+            return result
 
-    def fetch_products(self, limit=10000):
+    def fetch_products(self, limit=100):
         """
-        Fetches a list of products from Stripe, limited by the specified number.
-        :param limit: Number of products to fetch.
+        Fetches a list of products from Stripe. Concurrent callers share one crawl.
+        :param limit: Number of products per page, Stripe allows at most 100.
         :return: JSON response containing product data.
         """
         try:
-            products = stripe.Product.list(limit=limit)
-            product_data = [product for product in products.auto_paging_iter()]
-            logger.info(f"Fetched {len(product_data)} products from Stripe.")
+            product_data = _flights.do(('products', limit), self._list_products, limit)
             return True, "successfully obtained products", product_data
+        except CircuitOpenError:
+            return False, "Stripe is currently unavailable", []
         except stripe.error.StripeError as e:
             logger.error(f"Stripe error: {e}")
             return False, "Stripe error occurred", []
         except Exception as e:
             logger.error(f"Unexpected error occurred: {e}")
             return False, "Unexpected error occurred", []
-        
+
+    def _list_products(self, limit):
+        product_data = self._call(lambda: list(stripe.Product.list(limit=limit).auto_paging_iter()),
+                                  call_name="Product.list")
+        logger.info(f"Fetched {len(product_data)} products from Stripe.")
+        return product_data
+
+    def fetch_products_with_prices(self, page_size=100):
+        """
+        Fetches every active product with its default price expanded, in one paged pass.
+        Any price Stripe did not expand is fetched concurrently. Concurrent callers share one crawl.
+        :param page_size: Number of products per page, Stripe allows at most 100.
+        :return: Tuple of success, message and a list of products as plain dicts.
+        """
+        try:
+            product_data = _flights.do(('products_with_prices', page_size),
+                                       self._list_products_with_prices, page_size)
+            # Each caller gets its own copies, the coalesced result is shared
+            return True, "successfully obtained products", [dict(product) for product in product_data]
+        except CircuitOpenError:
+            return False, "Stripe is currently unavailable", []
+        except stripe.error.StripeError as e:
+            logger.error(f"Stripe error: {e}")
+            return False, "Stripe error occurred", []
+
+    def _list_products_with_prices(self, page_size):
+        # The whole paged crawl is retried, so a failure on a later page is not served half done
+        products = self._call(lambda: list(
+            stripe.Product.list(limit=page_size, active=True,
+                                expand=['data.default_price']).auto_paging_iter()),
+                              call_name="Product.list")
+        product_data = [to_plain(product) for product in products]
+
+        missing = [product['default_price'] for product in product_data
+                   if isinstance(product.get('default_price'), str)]
+        if missing:
+            prices = self.fetch_prices(missing)
+            for product in product_data:
+                price_id = product.get('default_price')
+                if isinstance(price_id, str) and prices.get(price_id) is not None:
+                    product['default_price'] = to_plain(prices[price_id])
+
+        logger.info(f"Fetched {len(product_data)} products with prices from Stripe.")
+        return product_data
+
     def fetch_price(self, price_id):
         """
         Fetches the price details from Stripe using the given price ID.
+        Concurrent callers for the same price share one request.
         :param price_id: The ID of the price to fetch.
         :return: Price object if found, otherwise None.
         """
         try:
-            price = stripe.Price.retrieve(price_id)
-            logger.info(f"Fetched price details for {price_id} = {price}")
-            return price
+            return _flights.do(('price', price_id), self._retrieve_price, price_id)
         except stripe.error.InvalidRequestError:
             return None
-        
+
+    def _retrieve_price(self, price_id):
+        price = self._call(stripe.Price.retrieve, price_id)
+        logger.debug(f"Fetched price details for {price_id}")
+        return price
+
+    def fetch_prices(self, price_ids):
+        """
+        Fetches several prices concurrently on a bounded thread pool.
+        :param price_ids: The IDs of the prices to fetch, duplicates are fetched once.
+        :return: Dict of price ID to price object, or None where the price was not found.
+        """
+        unique_ids = list(dict.fromkeys(price_ids))
+        if len(unique_ids) <= 1:
+            return {price_id: self.fetch_price(price_id) for price_id in unique_ids}
+        start = time.perf_counter()
+        results = list(_price_executor().map(partial(record_phases, self.fetch_price), unique_ids))
+        # Pool threads have no request context, so their Stripe calls are added to the request here
+        merge_phases([recorded for price, recorded in results], time.perf_counter() - start)
+        return {price_id: price for price_id, (price, recorded) in zip(unique_ids, results)}
+
     def fetch_session_by_id(self, session_id):
         """
         Fetches the session details from Stripe using the given session ID.
+        Concurrent callers for the same session share one request.
         :param session_id: The ID of the session to fetch.
         :return: Session object if found, otherwise None.
         """
         try:
-            session = stripe.checkout.Session.retrieve(session_id)
-            logger.info(f"Fetched session details for {session_id}")
-            return session
+            return _flights.do(('session', session_id), self._retrieve_session, session_id)
         except stripe.error.InvalidRequestError:
             return None
+
+    def _retrieve_session(self, session_id):
+        session = self._call(stripe.checkout.Session.retrieve, session_id)
+        logger.info(f"Fetched session details for {session_id}")
+        return session
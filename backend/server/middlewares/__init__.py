@@ -2,4 +2,5 @@ from server.middlewares.api_logger import *  # noqa
 from server.middlewares.authorizer import *  # noqa
 from server.middlewares.rate_limit import *  # noqa
 from server.middlewares.response_manipulator import *  # noqa
-from server.middlewares.preflight import * # noqa
+from server.middlewares.cors import *  # noqa
+from server.middlewares.profiler import *  # noqa
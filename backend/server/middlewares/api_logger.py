@@ -1,52 +1,125 @@
 # Standard Imports
+import random
+import time
 
 # Third Party Imports
-from flask import Response, request
+from flask import Response, current_app, g, request
 from loguru import logger
 
 # Local Imports
+from server.utils.timing import request_timings
+
+
+class ResponseLogSampling:
+    """Sampling rates for logging response bodies.
+
+    Rules are parsed once from `RESPONSE_LOG_SAMPLE_RATES`, a comma separated list of
+    `key=rate` pairs where the key is a status code (`404`), a status class (`5xx`) or an
+    endpoint (`user.get_users`). The most specific match wins, in that order, and anything
+    unmatched uses `RESPONSE_LOG_SAMPLE_RATE`.
+    """
+
+    def __init__(self, default_rate: float = 1.0, rules: str = ''):
+        self.default_rate = default_rate
+        self.statuses = {}
+        self.endpoints = {}
+        for rule in filter(None, (rule.strip() for rule in (rules or '').split(','))):
+            key, _, rate = rule.partition('=')
+            key = key.strip()
+            try:
+                rate = float(rate)
+            except ValueError:
+                logger.error(f"Invalid response log sample rate: {rule}")
+                continue
+            if key[:1].isdigit():
+                self.statuses[key.lower()] = rate
+            else:
+                self.endpoints[key] = rate
+
+    def rate(self, status_code: int, endpoint: str) -> float:
+        if self.statuses:
+            status = str(status_code)
+            if status in self.statuses:
+                return self.statuses[status]
+            status_class = status[0] + 'xx'
+            if status_class in self.statuses:
+                return self.statuses[status_class]
+        return self.endpoints.get(endpoint, self.default_rate)
+
+    def sampled(self, status_code: int, endpoint: str) -> bool:
+        rate = self.rate(status_code, endpoint)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def get_response_log_sampling(app) -> ResponseLogSampling:
+    sampling = app.extensions.get('response_log_sampling')
+    if sampling is None:
+        sampling = app.extensions['response_log_sampling'] = ResponseLogSampling(
+            app.config.get('RESPONSE_LOG_SAMPLE_RATE', 1.0),
+            app.config.get('RESPONSE_LOG_SAMPLE_RATES', ''))
+    return sampling
+
+
+def read_body_prefix(response: Response, max_length: int) -> tuple[bytes, int]:
+    """Read up to `max_length` bytes of a buffered response body without joining or copying the rest
+
+    Args:
+        response (Response): A response that is neither streamed nor in direct passthrough mode
+        max_length (int): The most bytes to read
+
+    Returns:
+        bytes: the start of the body
+        int: the length of the whole body
+    """
+    prefix, remaining, total = [], max_length, 0
+    for chunk in response.response:
+        if isinstance(chunk, str):
+            chunk = chunk.encode(response.charset)
+        total += len(chunk)
+        if remaining > 0:
+            prefix.append(bytes(memoryview(chunk)[:remaining]))
+            remaining -= len(prefix[-1])
+    return b''.join(prefix), total
 
 
 def log_request():
     """Log details of the request"""
-    # Check if the request is a CORS preflight request
-    if request.method == "OPTIONS" and "Access-Control-Request-Method" in request.headers:
-        logger.info(f"Preflight CORS request: {request.method} {request.path}")
-    else:
-        logger.info(f"Request: {request.method} {request.path}")
+    # CORS preflights are answered by CORSMiddleware and never reach here
+    logger.debug("Request: {} {}", request.method, request.path)
     # Add more details as needed
 
 
 def log_response(response):
-    """Log details of the response."""
-    # Check if the response is to a CORS preflight request
+    """Log details of the response, one line per request with its status and latency."""
+    access_logger = logger.bind(method=request.method,
+                                path=request.path,
+                                status=response.status_code)
+    if 'start_time' in g:
+        access_logger = access_logger.bind(
+            latency_ms=round((time.time() - g.start_time) * 1000, 2),
+            timings={name: duration for name, (duration, count) in request_timings().items()})
+
     if request.method == "OPTIONS":
-        preflight_info = "Preflight CORS response"
-        logger.info(f"{preflight_info}: {response.status}")
+        access_logger.info("OPTIONS response: {}", response.status)
     else:
+        # Reading a streamed body here would buffer it all and consume the stream before it is sent
+        if response.is_streamed:
+            access_logger.info("Response: {} [Streamed]", response.status)
         # Ensure response is a Flask Response object and not a Werkzeug BaseResponse, which may be in direct passthrough mode
-        if isinstance(response, Response):
-            try:
-                # Attempt to access response.data safely
-                max_length = 500
-                truncated_data = response.get_data()[:max_length]
-
-                if len(response.get_data()) > max_length:
-                    truncated_data += b"... [Truncated]"
-
-                # Decode the bytes to a string, assuming UTF-8 encoding. Adjust the encoding if needed.
-                decoded_data = truncated_data.decode('utf-8', errors='replace')
-
-                logger.info(
-                    f"Response: {response.status}, Data: {decoded_data}")
-            except RuntimeError as e:
-                # Handle cases where the response is in direct passthrough mode
-                logger.error(f"Error logging response data: {e}")
-                logger.info(
-                    f"Response: {response.status} [Data not accessible]")
+        elif not isinstance(response, Response) or response.direct_passthrough:
+            access_logger.info("Response: {} [Direct passthrough mode]", response.status)
+        elif not current_app.config.get('RESPONSE_LOG_BODY', True) or \
+                not get_response_log_sampling(current_app).sampled(response.status_code, request.endpoint):
+            access_logger.info("Response: {}", response.status)
         else:
-            # If response is not a Flask Response object (e.g., direct passthrough mode), log without trying to access data
-            logger.info(
-                f"Response: {response.status} [Direct passthrough mode]")
-    logger.info("Response sent successfully.")
+            max_length = current_app.config.get('RESPONSE_LOG_MAX_BYTES', 500)
+            truncated_data, length = read_body_prefix(response, max_length)
+
+            if length > max_length:
+                truncated_data += b"... [Truncated]"
+
+            # Decode the bytes to a string, assuming UTF-8 encoding. Adjust the encoding if needed.
+            decoded_data = truncated_data.decode('utf-8', errors='replace')
+
+            access_logger.info("Response: {}, Data: {}", response.status, decoded_data)
     return response
@@ -1,66 +1,181 @@
 from functools import wraps
-from flask import request, jsonify
+from flask import Response, g, request
 from loguru import logger
 from server.utils.http_status_codes import handle_status_code
-from server.services.user import get_user_by_id
+from server.extensions import limiter
+from server.middlewares.rate_limit import RATE_LIMITED_BODY
+from server.services.api_key import authenticate_api_key
+from server.services.principal import get_principal
+from server.services.revocation import is_token_revoked
+from server.types.principal import Principal
+from server.utils.timing import phase
 import jwt
+import time
 from flask import current_app
 from jwt import ExpiredSignatureError, InvalidTokenError
 
-def token_validation(f, require_admin=False):
+API_KEY_HEADER = 'X-API-Key'
+
+
+def principal_from_fresh_claims(data: dict) -> Principal:
+    """Return a principal built from the token claims when stateless auth allows it.
+
+    Claims are only trusted while the token is younger than the configured max staleness,
+    after that the principal is resolved from the database again.
+    """
+    config = current_app.config
+    if not config['AUTH_STATELESS'] or 'perms' not in data or 'iat' not in data:
+        return None
+    if time.time() - data['iat'] > config['AUTH_STATELESS_MAX_STALENESS_SECONDS']:
+        return None
+    return Principal.from_claims(data)
+
+
+def admin_principal_from_request() -> Principal:
+    """Return the principal of the request's bearer token when it belongs to an admin.
+
+    For hooks that run outside a decorated view, any invalid, superseded or non-admin
+    token gives `None` rather than an error response.
+    """
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if not token:
+        return None
+    try:
+        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+    except InvalidTokenError:
+        return None
+    if is_token_revoked(data):
+        return None
+    success, message, user = get_principal(user_id=data.get('user_id'), issued_at=data.get('iat'))
+    if not success or not user or ('ver' in data and data['ver'] != user.version):
+        return None
+    return user if user.is_admin() else None
+
+
+def api_key_validation(api_key: str, require_admin=False):
+    """Authenticate an `X-API-Key` header and apply the key's own rate limit
+
+    Returns:
+        tuple: the key's principal and None, or None and the error response and code
+    """
+    success, message, entry = authenticate_api_key(api_key)
+    if not success:
+        logger.error(f"Failed to access endpoint, {message}")
+        code = 500 if message == 'Unexpected error occurred' else 401
+        response = handle_status_code(code, data={"error_info": "Server error" if code == 500 else message})
+        return None, (response, code)
+
+    if limiter.enabled:
+        result = limiter.hit(f"api_key:{entry.id}", entry.rate_limit, entry.rate_limit_window)
+        g.rate_limit_result = result
+        if not result.allowed:
+            logger.warning("Rate limit exceeded for API key {}", entry.id)
+            return None, (Response(RATE_LIMITED_BODY, status=429, mimetype='application/json'), 429)
+
+    if require_admin and not entry.principal.is_admin():
+        logger.error("Failed to access endpoint, API key is not scoped for admin!")
+        code = 403
+        response = handle_status_code(code, data={"error_info": "Not authorized!"})
+        return None, (response, code)
+
+    g.api_key_id = entry.id
+    return entry.principal, None
+
+
+def token_validation(f, require_admin=False, stateless=False, allow_api_key=False):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        logger.info("Checking if token is valid")
-        token = None
+        api_key = request.headers.get(API_KEY_HEADER) if allow_api_key else None
+        if api_key:
+            with phase("auth"):
+                user, error = api_key_validation(api_key, require_admin=require_admin)
+            if error is not None:
+                return error
+            return f(user, *args, **kwargs)
 
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(" ")[1]
+        with phase("auth"):
+            logger.debug("Checking if token is valid")
+            token = None
 
-        if not token:
-            logger.error("Failed to access endpoint, token is missing!")
-            code = 401
-            response = handle_status_code(code, data={"error_info": "Token is missing!"})
-            return response, 401
+            if 'Authorization' in request.headers:
+                token = request.headers['Authorization'].split(" ")[1]
 
-        try:
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            success, message, user = get_user_by_id(user_id=data['user_id'])
+            if not token:
+                logger.error("Failed to access endpoint, token is missing!")
+                code = 401
+                response = handle_status_code(code, data={"error_info": "Token is missing!"})
+                return response, 401
+
+            try:
+                data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+                if is_token_revoked(data):
+                    logger.error("Failed to access endpoint, token has been revoked!")
+                    code = 401
+                    response = handle_status_code(code, data={"error_info": "Token has been revoked!"})
+                    return response, 401
+                # Kept for views that act on the token itself, like logout
+                g.token_claims = data
+                user = principal_from_fresh_claims(data) if stateless else None
+                if user is None:
+                    # Resolve a cached principal snapshot rather than querying the user each request
+                    success, message, user = get_principal(user_id=data['user_id'],
+                                                           issued_at=data.get('iat'))
+
+                    if not success or not user:
+                        logger.error("Failed to access endpoint, user does not exist!")
+                        code = 401
+                        response = handle_status_code(code, data={"error_info": "User does not exist!"})
+                        return response, 401
 
-            if not success or not user:
-                logger.error("Failed to access endpoint, user does not exist!")
+                    if 'ver' in data and data['ver'] != user.version:
+                        logger.error("Failed to access endpoint, token was issued before a credential change!")
+                        code = 401
+                        response = handle_status_code(code, data={"error_info": "Token has been superseded!"})
+                        return response, 401
+
+                if require_admin and not user.is_admin():
+                    logger.error("Failed to access endpoint, user is not an admin!")
+                    code = 403
+                    response = handle_status_code(code, data={"error_info": "Not authorized!"})
+                    return response, 403
+
+            except ExpiredSignatureError:
+                logger.error("Failed to access endpoint, token has expired!")
+                code = 401
+                response = handle_status_code(code, data={"error_info": "Token has expired!"})
+                return response, 401
+            except InvalidTokenError:
+                logger.error("Failed to access endpoint, token is invalid!")
                 code = 401
-                response = handle_status_code(code, data={"error_info": "User does not exist!"})
+                response = handle_status_code(code, data={"error_info": "Token is invalid!"})
                 return response, 401
+            except Exception as e:
+                logger.error(f"Failed to access endpoint: {e}")
+                code = 500
+                response = handle_status_code(code, data={"error_info": "Server error"})
+                return response, 500
 
-            if require_admin and not user.is_admin():
-                logger.error("Failed to access endpoint, user is not an admin!")
-                code = 403
-                response = handle_status_code(code, data={"error_info": "Not authorized!"})
-                return response, 403
-
-        except ExpiredSignatureError:
-            logger.error("Failed to access endpoint, token has expired!")
-            code = 401
-            response = handle_status_code(code, data={"error_info": "Token has expired!"})
-            return response, 401
-        except InvalidTokenError:
-            logger.error("Failed to access endpoint, token is invalid!")
-            code = 401
-            response = handle_status_code(code, data={"error_info": "Token is invalid!"})
-            return response, 401
-        except Exception as e:
-            logger.error(f"Failed to access endpoint: {e}")
-            code = 500
-            response = handle_status_code(code, data={"error_info": "Server error"})
-            return response, 500
-
-        # Inject user into the function arguments
+        # Inject the user's principal into the function arguments
         return f(user, *args, **kwargs)
 
     return decorated_function
 
+
 def user_token_required(f):
     return token_validation(f, require_admin=False)
 
+
 def admin_token_required(f):
     return token_validation(f, require_admin=True)
+
+
+def user_claims_required(f):
+    """Like `user_token_required`, but may authorize from token claims alone when
+    `AUTH_STATELESS` is enabled, or with an `X-API-Key`. Only use on read-only routes."""
+    return token_validation(f, require_admin=False, stateless=True, allow_api_key=True)
+
+
+def admin_claims_required(f):
+    """Like `admin_token_required`, but may authorize from token claims alone when
+    `AUTH_STATELESS` is enabled, or with an admin scoped `X-API-Key`. Only use on read-only routes."""
+    return token_validation(f, require_admin=True, stateless=True, allow_api_key=True)
@@ -0,0 +1,105 @@
+# Standard Imports
+
+# Third Party Imports
+from loguru import logger
+
+# Local Imports
+
+CORS_METHODS = "GET, POST, OPTIONS, PUT, DELETE"
+CORS_HEADERS = "Content-Type,Authorization,ngrok-skip-browser-warning,X-API-Key,X-Profile"
+# Response headers browsers let scripts read, such as the id of a requested profile
+CORS_EXPOSE_HEADERS = "X-Profile-Id"
+
+
+def _split_port(host: str) -> tuple[str, str]:
+    hostname, _, port = host.partition(':')
+    return hostname, port
+
+
+class CORSMiddleware:
+    """WSGI middleware applying CORS to every response from precomputed header blocks.
+
+    Allowed origins are exact origins, matched with a set lookup, or wildcard subdomain
+    patterns like `https://*.example.com`, matched by looking up each parent domain of the
+    request's origin. A pattern with a port only matches that port, one without matches
+    any port. Preflight requests are answered here without entering Flask, and every
+    response varies on `Origin` so shared caches keep the per-origin headers apart.
+
+    Args:
+        app: The WSGI application to wrap
+        origins (str | list): Allowed origins, as a list or a comma separated string
+        methods (str, optional): The allowed methods. Defaults to CORS_METHODS.
+        headers (str, optional): The allowed request headers. Defaults to CORS_HEADERS.
+        max_age (int, optional): How long browsers may cache a preflight, in seconds. Defaults to 3600.
+    """
+
+    def __init__(self, app, origins, methods: str = CORS_METHODS,
+                 headers: str = CORS_HEADERS, max_age: int = 3600):
+        self.app = app
+        if isinstance(origins, str):
+            origins = origins.split(',')
+        self.origins = set()
+        self.wildcard_domains = set()
+        for origin in (origin.strip().rstrip('/') for origin in origins):
+            if not origin:
+                continue
+            scheme, _, host = origin.partition('://')
+            if host.startswith('*.'):
+                self.wildcard_domains.add((scheme, ) + _split_port(host[2:]))
+            else:
+                self.origins.add(origin)
+
+        # Everything but the origin itself is the same for every allowed request
+        self.response_headers = [
+            ('Access-Control-Allow-Credentials', 'true'),
+            ('Access-Control-Expose-Headers', CORS_EXPOSE_HEADERS),
+        ]
+        self.preflight_headers = self.response_headers + [
+            ('Access-Control-Allow-Methods', methods),
+            ('Access-Control-Allow-Headers', headers),
+            ('Access-Control-Max-Age', str(max_age)),
+            ('Vary', 'Origin'),
+            ('Content-Length', '0'),
+        ]
+        logger.info("CORS allowing {} origins and {} wildcard domains",
+                    len(self.origins), len(self.wildcard_domains))
+
+    def is_allowed(self, origin: str) -> bool:
+        if origin in self.origins:
+            return True
+        if not self.wildcard_domains:
+            return False
+        scheme, _, host = origin.partition('://')
+        hostname, port = _split_port(host)
+        # Subdomains only, so `https://*.example.com` does not allow `https://example.com`
+        labels = hostname.split('.')
+        for i in range(1, len(labels)):
+            domain = '.'.join(labels[i:])
+            if (scheme, domain, port) in self.wildcard_domains or (scheme, domain, '') in self.wildcard_domains:
+                return True
+        return False
+
+    def __call__(self, environ, start_response):
+        origin = environ.get('HTTP_ORIGIN')
+        allowed = origin is not None and self.is_allowed(origin)
+
+        if environ['REQUEST_METHOD'] == 'OPTIONS' and 'HTTP_ACCESS_CONTROL_REQUEST_METHOD' in environ:
+            headers = [('Access-Control-Allow-Origin', origin)] + self.preflight_headers \
+                if allowed else [('Vary', 'Origin'), ('Content-Length', '0')]
+            start_response('204 NO CONTENT', headers)
+            return [b'']
+
+        def cors_start_response(status, headers, exc_info=None):
+            for i, (name, value) in enumerate(headers):
+                if name.lower() == 'vary':
+                    if 'origin' not in value.lower():
+                        headers[i] = (name, value + ', Origin')
+                    break
+            else:
+                headers.append(('Vary', 'Origin'))
+            if allowed:
+                headers.append(('Access-Control-Allow-Origin', origin))
+                headers.extend(self.response_headers)
+            return start_response(status, headers, exc_info)
+
+        return self.app(environ, cors_start_response)
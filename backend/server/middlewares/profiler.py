@@ -0,0 +1,117 @@
+# Standard Imports
+import cProfile
+import os
+import re
+import threading
+from uuid import uuid4
+
+# Third Party Imports
+from flask import current_app, g, request
+from loguru import logger
+
+# Local Imports
+from server.config import root_project_dir
+from server.middlewares.authorizer import admin_principal_from_request
+from server.utils.stack_sampler import StackSampler, write_folded
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+# `1` or `true` use the deterministic profiler
+PROFILE_MODES = ('cprofile', 'sampling')
+PROFILE_EXTENSIONS = {'cprofile': 'pstats', 'sampling': 'folded'}
+PROFILE_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def profile_dir(app) -> str:
+    return app.config.get('PROFILE_DIR') or os.path.join(root_project_dir, 'data', 'server', 'profiles')
+
+
+def profile_path(app, profile_id: str) -> str:
+    """Return the artifact of a profile, or None when the id is unknown
+
+    Args:
+        app: The Flask app whose profile directory is searched
+        profile_id (str): The id returned in the `X-Profile-Id` header
+
+    Returns:
+        str: The path to the `.pstats` or `.folded` file
+    """
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    for extension in PROFILE_EXTENSIONS.values():
+        path = os.path.join(profile_dir(app), f"{profile_id}.{extension}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def requested_profile_mode() -> str:
+    """Return the profiler the request asked for with the `X-Profile` header or `profile`
+    query parameter, or None."""
+    mode = request.headers.get(PROFILE_HEADER) or request.args.get('profile')
+    if not mode:
+        return None
+    mode = mode.lower()
+    if mode in ('1', 'true'):
+        return 'cprofile'
+    return mode if mode in PROFILE_MODES else None
+
+
+def _start_profile():
+    mode = requested_profile_mode()
+    if mode is None:
+        return
+    if admin_principal_from_request() is None:
+        logger.warning("Ignoring profile request to {} without an admin token", request.path)
+        return
+
+    if mode == 'sampling':
+        profiler = StackSampler(1 / current_app.config['PROFILE_SAMPLE_HZ'],
+                                thread_id=threading.get_ident())
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    g.profile = (mode, profiler)
+
+
+def _stop_profile() -> str:
+    """Stop the request's profiler and write its artifact, returning the profile id."""
+    mode, profiler = g.pop('profile')
+    profile_id = uuid4().hex
+    directory = profile_dir(current_app)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{profile_id}.{PROFILE_EXTENSIONS[mode]}")
+    if mode == 'sampling':
+        write_folded(profiler.stop(), path)
+    else:
+        profiler.disable()
+        profiler.dump_stats(path)
+    logger.info("Profiled {} {} to {}", request.method, request.path, path)
+    return profile_id
+
+
+def _finish_profile(response):
+    if 'profile' in g:
+        response.headers[PROFILE_ID_HEADER] = _stop_profile()
+    return response
+
+
+def _abandon_profile(exception=None):
+    # A request that raised never reached `after_request`, the profiler must still stop
+    if 'profile' in g:
+        _stop_profile()
+
+
+def init_profiler(app):
+    """Profile requests from admins that ask for it, call before the other hooks are registered
+
+    A request with an `X-Profile: cprofile|sampling` header, or a `profile` query parameter,
+    and an admin bearer token runs under that profiler. The artifact is written to the
+    profile directory and its id returned in the `X-Profile-Id` response header.
+    """
+    if not app.config['PROFILING_ENABLED']:
+        return
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_abandon_profile)
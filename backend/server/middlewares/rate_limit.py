@@ -1,41 +1,53 @@
+import json
 from functools import wraps
-from time import time
 
-from flask import abort, g, request
+from flask import Response, g, request
 from loguru import logger
 
+from server.extensions import limiter
+from server.utils.http_status_codes import HTTP_STATUS_CODES
 
-def rate_limit(max_requests, time_window):
+# The rejection body never changes, so build it once rather than on every blocked request
+RATE_LIMITED_BODY = json.dumps({
+    "status_code": 429,
+    "message": HTTP_STATUS_CODES[429]["message"],
+    "status": HTTP_STATUS_CODES[429]["status"],
+    "data": {
+        "error_info": "Too many requests."
+    }
+}).encode()
+
+
+def rate_limit(max_requests, time_window, strategy=None):
     """Rate limiter decorator with default values that can be overridden.
 
     Args:
-        max_requests (int, optional): The maximum amount of requests allowed. Defaults to 100.
-        time_window (int, optional): The time window in seconds which the max requests is applied to. Defaults to 60.
+        max_requests (int): The maximum amount of requests allowed.
+        time_window (int): The time window in seconds which the max requests is applied to.
+        strategy (str, optional): `sliding_window` or `token_bucket`. Defaults to the
+            `RATE_LIMIT_STRATEGY` config value.
     """
 
     def decorator(f):
 
         @wraps(f)
         def wrapped(*args, **kwargs):
-            # Initialize g.rate_limit if it doesn't exist
-            if not hasattr(g, 'rate_limit'):
-                g.rate_limit = {}
-            # Create a unique key for each endpoint and IP
-            key = f"rate_limit:{request.endpoint}:{request.remote_addr}"
-            if key not in g:
-                g.rate_limit[key] = (0, time())
+            if not limiter.enabled:
+                return f(*args, **kwargs)
 
-            requests, last_checked = g.rate_limit[key]
-
-            # Reset the count if time window has passed
-            if time() - last_checked > time_window:
-                g.rate_limit[key] = (1, time())
-            elif requests >= max_requests:
-                abort(429, "Too many requests.")
-            else:
-                g.rate_limit[key] = (requests + 1, last_checked)
-
-            logger.info(f"Within rate limit for {request.endpoint}")
+            # Create a unique key for each endpoint and IP
+            key = f"{request.endpoint}:{request.remote_addr}"
+            result = limiter.hit(key, max_requests, time_window, strategy)
+            g.rate_limit_result = result
+
+            if not result.allowed:
+                logger.warning("Rate limit exceeded for {} by {}",
+                               request.endpoint, request.remote_addr)
+                return Response(RATE_LIMITED_BODY,
+                                status=429,
+                                mimetype='application/json')
+
+            logger.debug("Within rate limit for {}", request.endpoint)
             return f(*args, **kwargs)
 
         return wrapped
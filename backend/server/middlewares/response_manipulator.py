@@ -1,15 +1,15 @@
 # Standard Imports
 import datetime
-import os
 import time
 
 # Third Party Imports
-from flask import Response, g, jsonify
+from flask import Response, current_app, g, jsonify
 from loguru import logger
 from werkzeug.exceptions import BadRequest
 
 # Assuming HTTP_STATUS_CODES is a dictionary mapping status codes to messages
 from server.utils.http_status_codes import HTTP_STATUS_CODES
+from server.utils.timing import request_timings, server_timing_header
 
 
 def calculate_response_time():
@@ -22,16 +22,10 @@ def append_metadata(response, metadata):
     # Add metadata to response headers or body as needed
     response.headers['X-Response-Time'] = metadata['responseTime']
     response.headers['X-Timestamp'] = metadata['timestamp']
-
-
-def handle_cors_headers(response, frontend_origin):
-    response.headers[
-        'Access-Control-Allow-Origin'] = frontend_origin  # or a specific domain
-    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS, PUT, DELETE'
-    response.headers[
-        'Access-Control-Allow-Headers'] = 'Content-Type,Authorization,ngrok-skip-browser-warning'
-    response.headers['Access-Control-Allow-Credentials'] = 'true'
-    return response
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    if current_app.config['SERVER_TIMING_ENABLED']:
+        response.headers['Server-Timing'] = server_timing_header(request_timings())
 
 
 def create_error_response(status_code, message, metadata):
@@ -52,16 +46,12 @@ def response_manipulator(response):
 
     try:
         append_metadata(response, metadata)
-        frontend_origin = os.getenv(
-            'FRONTEND_ORIGIN',
-            'http://localhost:5000')  # Default value for development
-        handle_cors_headers(response, frontend_origin)
     except Exception as e:
         logger.error(f"Error manipulating response: {e}")
         return create_error_response(500, "Internal Server Error", metadata)
 
     # Log response headers and status
-    logger.debug(f"Response Headers: {response.headers}")
-    logger.debug(f"Response Status: {response.status}")
+    logger.debug("Response Headers: {}", response.headers)
+    logger.debug("Response Status: {}", response.status)
 
     return response
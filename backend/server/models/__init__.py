@@ -1 +1,4 @@
-from .user import *
\ No newline at end of file
+from .user import *
+from .revoked_token import *
+from .user_session import *
+from .api_key import *
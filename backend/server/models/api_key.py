@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from .. import db
+
+
+class ApiKey(db.Model):
+    """A machine client's API key, acting as its owner within its scopes.
+
+    Only a hash of the key is stored. Keys are found by their public prefix, which is
+    indexed, and the hash of the presented key is compared against that row.
+    """
+    __tablename__ = 'api_keys'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), index=True, nullable=False)
+    name = db.Column(db.String(64))
+    prefix = db.Column(db.String(16), unique=True, index=True, nullable=False)
+    key_hash = db.Column(db.String(64), nullable=False)
+    # `Permission` bits, intersected with the owner's role permissions
+    scopes = db.Column(db.Integer, nullable=False, default=0)
+    rate_limit = db.Column(db.Integer)
+    rate_limit_window = db.Column(db.Integer)
+    created_utc = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_utc = db.Column(db.DateTime)
+    expires_utc = db.Column(db.DateTime)
+    revoked_utc = db.Column(db.DateTime)
+
+    SENSITIVE_COLUMNS = ('key_hash',)
+
+    def __repr__(self):
+        return '<ApiKey \'%s\'>' % self.prefix
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from .. import db
+
+
+class RevokedToken(db.Model):
+    """A token revoked before it expired, kept until it expires."""
+    __tablename__ = 'revoked_tokens'
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(32), unique=True, index=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), index=True)
+    expires_utc = db.Column(db.DateTime, index=True, nullable=False)
+    revoked_utc = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return '<RevokedToken \'%s\'>' % self.jti
@@ -2,10 +2,13 @@ from flask import current_app
 from flask_login import AnonymousUserMixin, UserMixin
 from itsdangerous import BadSignature, SignatureExpired
 from itsdangerous import TimedJSONWebSignatureSerializer as Serializer
-from werkzeug.security import check_password_hash, generate_password_hash
 from datetime import datetime
+from loguru import logger
 
 from .. import db
+from ..extensions import password_hasher
+from ..utils.passwords import PasswordHashingBusy
+from ..utils.serializer import get_serializer
 
 
 class Permission:
@@ -44,22 +47,16 @@ class Role(db.Model):
 
     def __repr__(self):
         return '<Role \'%s\'>' % self.name
-    
+
+    SENSITIVE_COLUMNS = ('permissions',)
+
     def to_dict(self, include_sensitive: bool = False) -> dict:
         """Return a dictionary representation of the the model.
 
         Returns:
-            dict: A dictionary representation of the equipment
+            dict: A dictionary representation of the role
         """
-        model_dict = {
-            column.name: getattr(self, column.name)
-            for column in self.__table__.columns
-        }
-
-        if not include_sensitive:
-            model_dict.pop('permissions')
-            
-        return model_dict
+        return get_serializer(Role, include_sensitive)(self)
 
 
 class User(UserMixin, db.Model):
@@ -73,6 +70,8 @@ class User(UserMixin, db.Model):
     last_name = db.Column(db.String(64), index=True)
     email = db.Column(db.String(64), unique=True, index=True)
     password_hash = db.Column(db.String(128))
+    # Bumped when credentials or role change so tokens issued before can be rejected
+    auth_version = db.Column(db.Integer, default=0)
     
     def __init__(self, **kwargs):
         super(User, self).__init__(**kwargs)
@@ -83,22 +82,23 @@ class User(UserMixin, db.Model):
             if self.role is None:
                 self.role = Role.query.filter_by(default=True).first()
 
+    SENSITIVE_COLUMNS = ('password_hash', 'confirmed', 'auth_version')
+
     def to_dict(self, include_sensitive: bool = False) -> dict:
         """Return a dictionary representation of the the model.
 
         Returns:
-            dict: A dictionary representation of the equipment
+            dict: A dictionary representation of the user, with datetimes as ISO 8601 UTC strings
         """
-        model_dict = {
-            column.name: getattr(self, column.name)
-            for column in self.__table__.columns
-        }
+        return get_serializer(User, include_sensitive)(self)
 
-        if not include_sensitive:
-            model_dict.pop('password_hash')
-            model_dict.pop('confirmed')
-
-        return model_dict
+    @classmethod
+    def public_columns(cls) -> list:
+        """Return the columns included in the public `to_dict` representation."""
+        return [
+            column for column in cls.__table__.columns
+            if column.name not in cls.SENSITIVE_COLUMNS
+        ]
 
     def full_name(self):
         return '%s %s' % (self.first_name, self.last_name)
@@ -122,10 +122,19 @@ class User(UserMixin, db.Model):
 
     @password.setter
     def password(self, password):
-        self.password_hash = generate_password_hash(password)
+        # Hashes on this thread for scripts and fixtures, requests hash through
+        # `password_hasher.hash` in the service layer to get the pool's admission control
+        self.set_password_hash(password_hasher.hash_inline(password))
+
+    def set_password_hash(self, password_hash):
+        self.password_hash = password_hash
+        self.bump_auth_version()
+
+    def bump_auth_version(self):
+        self.auth_version = (self.auth_version or 0) + 1
 
     def verify_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
 
     def generate_confirmation_token(self, expiration=604800):
         """Generate a confirmation token to email a new user."""
@@ -187,7 +196,11 @@ class User(UserMixin, db.Model):
             return False
         if data.get('reset') != self.id:
             return False
-        self.password = new_password
+        try:
+            self.set_password_hash(password_hasher.hash(new_password))
+        except PasswordHashingBusy as e:
+            logger.warning(f"Rejecting password reset, password hashing is saturated: {e}")
+            return False
         db.session.add(self)
         db.session.commit()
         return True
@@ -220,7 +233,3 @@ class User(UserMixin, db.Model):
 
     def __repr__(self):
         return '<User \'%s\'>' % self.full_name()
-
-    def get_app_access_token(self):
-        # TODO: Create new tables for access tokens for devices
-        return "fake_token_for_now"
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from .. import db
+
+
+class UserSession(db.Model):
+    """A device's refresh token session, only a hash of the current token is stored."""
+    __tablename__ = 'sessions'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), index=True, nullable=False)
+    token_hash = db.Column(db.String(64), unique=True, index=True, nullable=False)
+    # The token this one replaced, presenting it again means the session's tokens leaked
+    previous_token_hash = db.Column(db.String(64), index=True)
+    device = db.Column(db.String(128))
+    # The user's auth version when the session started, a credential change ends the session
+    auth_version = db.Column(db.Integer, default=0)
+    created_utc = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_utc = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_utc = db.Column(db.DateTime, index=True, nullable=False)
+    revoked_utc = db.Column(db.DateTime)
+
+    SENSITIVE_COLUMNS = ('token_hash', 'previous_token_hash', 'auth_version')
+
+    def __repr__(self):
+        return '<UserSession %s of user %s>' % (self.id, self.user_id)
@@ -1,4 +1,8 @@
+from server.services.principal import *  # noqa
 from server.services.user import *  # noqa
 from server.services.auth import *  # noqa
 from server.services.role import *  # noqa
-from server.services.stripe import *  # noqa
\ No newline at end of file
+from server.services.stripe import *  # noqa
+from server.services.revocation import *  # noqa
+from server.services.session import *  # noqa
+from server.services.api_key import *  # noqa
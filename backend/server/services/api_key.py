@@ -0,0 +1,334 @@
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from flask import current_app
+from loguru import logger
+
+from server.extensions import db
+from server.models.api_key import ApiKey
+from server.models.user import Permission, User
+from server.services.principal import _principal_from_row, _principal_query, principal_cache
+from server.types.principal import Principal
+from server.utils.cache import TTLCache
+from server.utils.serializer import serialize_many
+
+API_KEY_MARKER = 'sk_'
+PREFIX_LENGTH = 12
+# Scopes a key can be given, a key never has permissions its owner's role lacks
+API_KEY_SCOPES = {
+    'general': Permission.GENERAL,
+    'admin': Permission.ADMINISTER,
+}
+MAX_NAME_LENGTH = 64
+
+
+def hash_api_key(api_key: str) -> str:
+    """API keys are 256 random bits, so unlike passwords a fast hash is enough to protect them."""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+def api_key_prefix(api_key: str) -> str:
+    """Return the public prefix of a key shaped like `sk_<prefix>_<secret>`, or None."""
+    if not api_key.startswith(API_KEY_MARKER) or len(api_key) <= len(API_KEY_MARKER) + PREFIX_LENGTH + 1:
+        return None
+    end = len(API_KEY_MARKER) + PREFIX_LENGTH
+    if api_key[end] != '_':
+        return None
+    return api_key[len(API_KEY_MARKER):end]
+
+
+def scopes_to_permissions(scopes: list) -> int:
+    """Combine scope names into `Permission` bits
+
+    Raises:
+        ValueError: A scope is unknown
+    """
+    permissions = 0
+    for scope in scopes:
+        if scope not in API_KEY_SCOPES:
+            raise ValueError(f"Unknown scope '{scope}'")
+        permissions |= API_KEY_SCOPES[scope]
+    return permissions
+
+
+def permissions_to_scopes(permissions: int) -> list:
+    return [scope for scope, bits in API_KEY_SCOPES.items() if (permissions & bits) == bits]
+
+
+class ApiKeyEntry(NamedTuple):
+    """What authenticating a key needs, cached per key prefix."""
+    id: int
+    key_hash: str
+    principal: Principal
+    rate_limit: int
+    rate_limit_window: int
+    # Unix time, or None for keys that do not expire
+    expires_at: float
+    # The owner's principal cache generation when loaded, a change to the owner discards the entry
+    generation: int
+
+
+class ApiKeyCache:
+    """Bounded LRU/TTL cache of API keys by prefix, so a known key authenticates without a query.
+
+    Unknown prefixes are remembered in a separate, smaller cache, which keeps guessed keys off
+    the database without evicting real ones. Revoking a key drops it from this worker's cache
+    straight away. Every `sync_seconds` a background thread drops keys revoked by any worker
+    since its last run and records when keys were last used, so authenticating never writes.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0, unknown_maxsize: int = 1000,
+                 sync_seconds: float = 5.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._unknown = TTLCache(maxsize=unknown_maxsize, ttl=ttl)
+        self.sync_seconds = sync_seconds
+        self._used = {}
+        self._pid = None
+        self._synced_at = time.monotonic()
+        self._synced_until = datetime.utcnow()
+        self._syncing = threading.Lock()
+
+    def init_app(self, app):
+        config = app.config
+        ttl = config.get('API_KEY_CACHE_TTL_SECONDS', 60.0)
+        self._cache = TTLCache(maxsize=config.get('API_KEY_CACHE_SIZE', 10000), ttl=ttl)
+        self._unknown = TTLCache(maxsize=config.get('API_KEY_UNKNOWN_CACHE_SIZE', 1000), ttl=ttl)
+        self.sync_seconds = config.get('API_KEY_SYNC_SECONDS', 5.0)
+
+    def get(self, prefix: str):
+        """Return the entry for a prefix, False for a cached unknown prefix, or None on a miss."""
+        if self._unknown.get(prefix):
+            return False
+        entry = self._cache.get(prefix)
+        if entry and entry.generation != principal_cache.generation(entry.principal.id):
+            self._cache.pop(prefix)
+            return None
+        return entry
+
+    def set(self, prefix: str, entry):
+        if entry:
+            self._cache.set(prefix, entry)
+        else:
+            self._unknown.set(prefix, True)
+
+    def invalidate(self, prefix: str):
+        self._cache.pop(prefix)
+        self._unknown.pop(prefix)
+
+    def mark_used(self, key_id: int):
+        """Note that a key was used, written to the table by the next sync."""
+        self._used[key_id] = datetime.utcnow()
+
+    def sync(self):
+        """Drop keys revoked since the last sync and record when keys were last used
+
+        This commits, so it runs in its own app context rather than on a request's session.
+        """
+        # Overlap the previous sync so revocations committed out of order are not missed
+        since = self._synced_until - timedelta(seconds=self.sync_seconds)
+        until = datetime.utcnow()
+        for prefix, in db.session.query(ApiKey.prefix).filter(ApiKey.revoked_utc >= since):
+            self.invalidate(prefix)
+        self._synced_until = until
+        used, self._used = self._used, {}
+        for key_id, last_used_utc in used.items():
+            ApiKey.query.filter(ApiKey.id == key_id).update({ApiKey.last_used_utc: last_used_utc},
+                                                            synchronize_session=False)
+        db.session.commit()
+
+    def sync_in_background(self):
+        """Start a sync when one is due, called after each authentication."""
+        if self._pid != os.getpid():
+            # A forked worker syncs on its own, the parent's lock may have been held at the fork
+            self._pid = os.getpid()
+            self._used = {}
+            self._syncing = threading.Lock()
+        if time.monotonic() - self._synced_at < self.sync_seconds or not self._syncing.acquire(blocking=False):
+            return
+        self._synced_at = time.monotonic()
+        app = current_app._get_current_object()
+
+        def run():
+            try:
+                with app.app_context():
+                    self.sync()
+            except Exception as e:
+                logger.error(f"Failed to sync the API key cache: {e}")
+            finally:
+                self._syncing.release()
+
+        threading.Thread(target=run, name='api-key-sync', daemon=True).start()
+
+    def clear(self):
+        self._cache.clear()
+        self._unknown.clear()
+        self._used = {}
+
+
+api_key_cache = ApiKeyCache()
+
+
+def _load_api_key(prefix: str):
+    # Read before the query, the owner's id is only known after it
+    latest = principal_cache.latest()
+    row = _principal_query(ApiKey.id, ApiKey.key_hash, ApiKey.scopes, ApiKey.rate_limit,
+                           ApiKey.rate_limit_window, ApiKey.expires_utc).join(
+                               ApiKey, ApiKey.user_id == User.id).filter(
+                                   ApiKey.prefix == prefix, ApiKey.revoked_utc.is_(None)).first()
+    if row is None:
+        return False
+    # An owner invalidated while the query ran gets an older generation, so the entry is reloaded
+    generation = min(principal_cache.generation(row[0]), latest)
+    key_id, key_hash, scopes, rate_limit, rate_limit_window, expires_utc = row[6:]
+    owner = _principal_from_row(row)
+    config = current_app.config
+    return ApiKeyEntry(id=key_id,
+                       key_hash=key_hash,
+                       principal=owner._replace(permissions=owner.permissions & scopes),
+                       rate_limit=rate_limit or config['API_KEY_RATE_LIMIT'],
+                       rate_limit_window=rate_limit_window or config['API_KEY_RATE_LIMIT_WINDOW'],
+                       expires_at=expires_utc.replace(tzinfo=timezone.utc).timestamp() if expires_utc else None,
+                       generation=generation)
+
+
+def authenticate_api_key(api_key: str) -> tuple[bool, str, ApiKeyEntry]:
+    """Authenticate an API key, from cache where possible
+
+    A cached key costs one SHA-256 and a dict lookup. A cache miss loads the key and its
+    owner's principal with one query on the indexed prefix. Nothing is written here, when the
+    key was last used is recorded by the cache's background sync.
+
+    Args:
+        api_key (str): The key presented by the client
+
+    Returns:
+        bool: whether or not the key is valid
+        str: a message indicating the result of the authentication
+        ApiKeyEntry: the key, whose `principal` is its owner limited to the key's scopes, or None
+    """
+    prefix = api_key_prefix(api_key)
+    if prefix is None:
+        return False, 'API key is invalid', None
+
+    entry = api_key_cache.get(prefix)
+    if entry is None:
+        try:
+            entry = _load_api_key(prefix)
+        except Exception as e:
+            logger.error(f"Unexpected Error trying to load an API key: {e}")
+            db.session.rollback()
+            return False, 'Unexpected error occurred', None
+        api_key_cache.set(prefix, entry)
+    api_key_cache.sync_in_background()
+
+    if not entry or not hmac.compare_digest(hash_api_key(api_key), entry.key_hash):
+        return False, 'API key is invalid', None
+    if entry.expires_at is not None and entry.expires_at <= datetime.now(timezone.utc).timestamp():
+        return False, 'API key has expired', None
+    api_key_cache.mark_used(entry.id)
+    return True, 'Success', entry
+
+
+def create_api_key(principal: Principal, name: str = None, scopes: list = None, rate_limit: int = None,
+                   rate_limit_window: int = None, expires_in_seconds: int = None) -> tuple[bool, str, dict]:
+    """Create an API key for a user
+
+    Args:
+        principal (Principal): The user the key acts as
+        name (str, optional): A label for the key. Defaults to None.
+        scopes (list, optional): Scope names from `API_KEY_SCOPES`. Defaults to `['general']`.
+        rate_limit (int, optional): Requests allowed per window. Defaults to `API_KEY_RATE_LIMIT`.
+        rate_limit_window (int, optional): The window in seconds. Defaults to `API_KEY_RATE_LIMIT_WINDOW`.
+        expires_in_seconds (int, optional): The key's lifetime. Defaults to None, never expiring.
+
+    Returns:
+        bool: whether or not the key was created
+        str: a message indicating the result of the creation
+        dict: the key's details, including the key itself which is only ever returned here
+    """
+    try:
+        permissions = scopes_to_permissions(scopes if scopes is not None else ['general'])
+    except ValueError as e:
+        return False, str(e), {}
+    if not permissions:
+        return False, 'At least one scope is required', {}
+    if not principal.can(permissions):
+        return False, 'Scopes exceed your permissions', {}
+    for value in (rate_limit, rate_limit_window, expires_in_seconds):
+        if value is not None and (not isinstance(value, int) or value <= 0):
+            return False, 'Rate limits and expiry must be positive integers', {}
+
+    try:
+        prefix = secrets.token_hex(PREFIX_LENGTH // 2)
+        api_key = f"{API_KEY_MARKER}{prefix}_{secrets.token_urlsafe(32)}"
+        now = datetime.utcnow()
+        key = ApiKey(user_id=principal.id,
+                     name=(name or '')[:MAX_NAME_LENGTH] or None,
+                     prefix=prefix,
+                     key_hash=hash_api_key(api_key),
+                     scopes=permissions,
+                     rate_limit=rate_limit,
+                     rate_limit_window=rate_limit_window,
+                     created_utc=now,
+                     expires_utc=now + timedelta(seconds=expires_in_seconds) if expires_in_seconds else None)
+        db.session.add(key)
+        db.session.commit()
+        api_key_cache.invalidate(prefix)
+        logger.info(f"Created API key {prefix} for user {principal.id}")
+        return True, 'API key created', {"id": key.id, "prefix": prefix, "api_key": api_key,
+                                         "scopes": permissions_to_scopes(permissions)}
+    except Exception as e:
+        logger.error(f"Unexpected Error trying to create an API key: {e}")
+        db.session.rollback()
+        return False, 'Unexpected error occurred', {}
+
+
+def get_user_api_keys(user_id: int) -> tuple[bool, str, list]:
+    """Get a user's API keys that have not been revoked
+
+    Returns:
+        bool: whether or not the keys were successfully retrieved
+        str: a message indicating the result of the retrieval
+        list: the keys as dicts, without their hashes
+    """
+    try:
+        keys = serialize_many(ApiKey, ApiKey.query.filter(ApiKey.user_id == user_id,
+                                                          ApiKey.revoked_utc.is_(None)).order_by(
+                                                              ApiKey.created_utc.desc()).all())
+        for key in keys:
+            key['scopes'] = permissions_to_scopes(key['scopes'])
+        return True, 'Success', keys
+    except Exception as e:
+        logger.error(f"Unexpected Error trying to find API keys: {e}")
+        return False, 'Unexpected error occurred', []
+
+
+def revoke_api_key(key_id: int, user_id: int = None) -> tuple[bool, str]:
+    """Revoke an API key, optionally only if it belongs to `user_id`
+
+    Returns:
+        bool: whether or not a key was revoked
+        str: a message indicating the result of the revocation
+    """
+    try:
+        query = ApiKey.query.filter(ApiKey.id == key_id, ApiKey.revoked_utc.is_(None))
+        if user_id is not None:
+            query = query.filter(ApiKey.user_id == user_id)
+        key = query.first()
+        if key is None:
+            return False, 'API key does not exist'
+        key.revoked_utc = datetime.utcnow()
+        db.session.commit()
+        api_key_cache.invalidate(key.prefix)
+        logger.info(f"Revoked API key {key.prefix} of user {key.user_id}")
+        return True, 'API key revoked'
+    except Exception as e:
+        logger.error(f"Unexpected Error trying to revoke an API key: {e}")
+        db.session.rollback()
+        return False, 'Unexpected error occurred'
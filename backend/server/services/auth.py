@@ -1,59 +1,129 @@
 from loguru import logger
-from werkzeug.security import check_password_hash
 import jwt
 from datetime import datetime, timedelta
 from flask import current_app
-import os
+from uuid import uuid4
 
-from server.models.user import User, Role
+from server.extensions import db, password_hasher
+from server.models.user import User
+from server.services.principal import load_credentials, principal_from_user
+from server.services.revocation import revoke_token
+from server.services.session import create_session, session_is_active
+from server.types.principal import Principal
+from server.utils.passwords import PasswordHashingBusy
 
 
-def get_new_token(user: User) -> tuple[bool, str, str]:
+def get_new_token(user: User | Principal, session_id: int = None) -> tuple[bool, str, str]:
     
     if not user:
         logger.warning("User not provided")
         return False, "User not provided", ""
     
-    user_id = user.id
-    user_role = Role.query.filter_by(id=user.role_id).first().name
-    
-    # Get expiration time for the token from config.env
-    try:
-        expiration_time = int(os.getenv("TOKEN_EXPIRATION_TIME_SECONDS", 86400))
-    except Exception:
-        expiration_time = 86400
-        logger.error("Error getting expiration time from config.env, set to 86400 seconds")
+    # The token carries the permissions bitmask and auth version so it can be authorized from claims alone
+    principal = user if isinstance(user, Principal) else principal_from_user(user)
     
+    expiration_time = current_app.config["TOKEN_EXPIRATION_TIME_SECONDS"]
+
+    issued_at = datetime.utcnow()
+    claims = principal.to_claims()
+    claims["iat"] = issued_at
+    claims["jti"] = uuid4().hex
+    claims["exp"] = issued_at + timedelta(seconds=expiration_time)
+    if session_id is not None:
+        # The refresh token session the token was issued for
+        claims["sid"] = session_id
     token = jwt.encode(
-        {
-            "user_id": user_id,
-            "user_role": user_role,
-            "exp": datetime.utcnow() + timedelta(seconds=expiration_time)
-        },
+        claims,
         current_app.config["SECRET_KEY"],
         algorithm="HS256",
     )
     return True, "Token generated successfully", token
 
 
-def login_user(email: str, password: str) -> tuple[bool, str, str]:
+def login_user(email: str, password: str, device: str = None) -> tuple[bool, str, dict]:
+    """Check a user's credentials and issue an access token and a refresh token session
+
+    The user and their role are loaded with one query, and a password is always verified, a
+    missing user's against a dummy hash, so whether an email is registered cannot be told from
+    the response or its timing.
+
+    Args:
+        email (str): The user's email
+        password (str): The password to check
+        device (str, optional): The device logging in, kept with the session. Defaults to None.
+
+    Returns:
+        bool: whether or not the user was authorized
+        str: a message indicating the result
+        dict: the `user_token` and `refresh_token`, or an empty dict
+    """
     try:
-        print(email, password)
-        user = User.query.filter_by(email=email).first()
-        if user and check_password_hash(user.password_hash, password):
-            # Find the role name associated with the user
-            success, message, token = get_new_token(user)
-            logger.info(f"User {email} authorized successfully")
-            return success, message, token
-        elif not check_password_hash(user.password_hash, password):
-            logger.warning(
-                f"Authorization failed for user {email}: Password is invalid")
-            return False, 'Password is invalid', ''
-        else:
-            logger.warning(
-                f"Authorization failed for user {email}: User does not exist")
-            return False, 'User does not exist', ''
+        principal, password_hash = load_credentials(email)
+        valid = password_hasher.verify(password_hash or password_hasher.dummy_hash(), password)
+        if principal is None or not valid:
+            reason = "User does not exist" if principal is None else "Password is invalid"
+            logger.warning(f"Authorization failed for user {email}: {reason}")
+            return False, 'Invalid email or password', {}
+        if password_hasher.needs_rehash(password_hash):
+            rehash_password(principal.id, password)
+        success, message, session = create_session(principal, device)
+        if not success:
+            return False, message, {}
+        refresh_token, session_id = session
+        # The principal carries the role, so the token is issued without another query
+        success, message, token = get_new_token(principal, session_id=session_id)
+        if not success:
+            return False, message, {}
+        logger.info(f"User {email} authorized successfully")
+        return True, 'Token generated successfully', {"user_token": token, "refresh_token": refresh_token}
+    except PasswordHashingBusy as e:
+        logger.warning(f"Rejecting login for {email}, password hashing is saturated: {e}")
+        return False, 'Password hashing is currently unavailable', {}
     except Exception as e:
         logger.error(f"Unexpected Error: {e}")
-        return False, 'Unexpected error occurred', ''
+        return False, 'Unexpected error occurred', {}
+
 
+def rehash_password(user_id: int, password: str):
+    """Store a new hash of a user's verified password after the hashing parameters changed
+
+    The password is the same, so the auth version is not bumped and issued tokens stay valid.
+    Failing to rehash does not fail the login, it is retried on the next one.
+    """
+    try:
+        User.query.filter_by(id=user_id).update({User.password_hash: password_hasher.hash(password)},
+                                                synchronize_session=False)
+        db.session.commit()
+        logger.info(f"Rehashed password of user {user_id} with {password_hasher.algorithm}")
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Failed to rehash password of user {user_id}: {e}")
+
+
+def renew_token(principal: Principal, claims: dict) -> tuple[bool, str, str]:
+    """Exchange a valid access token for a new one, for clients that do not use refresh tokens yet
+
+    Only tokens issued for a session that is still active can be renewed, and the presented
+    token is revoked, so a copied token cannot be renewed past the end of its session.
+
+    Args:
+        principal (Principal): The token's user
+        claims (dict): The presented token's claims
+
+    Returns:
+        bool: whether or not a new token was issued
+        str: a message indicating the result of the renewal
+        str: the new access token, or an empty string
+    """
+    session_id = claims.get('sid')
+    try:
+        if session_id is None or not session_is_active(session_id):
+            return False, 'Session has ended', ''
+    except Exception as e:
+        logger.error(f"Unexpected Error trying to renew a token: {e}")
+        return False, 'Unexpected error occurred', ''
+    success, message, token = get_new_token(principal, session_id=session_id)
+    if not success:
+        return False, message, ''
+    revoke_token(claims)
+    return True, 'Token generated successfully', token
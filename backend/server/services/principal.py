@@ -0,0 +1,177 @@
+import threading
+from collections import OrderedDict
+
+from loguru import logger
+
+from server.extensions import db
+from server.models.user import Role, User
+from server.types.principal import Principal
+from server.utils.cache import TTLCache
+
+
+class PrincipalCache:
+    """Bounded LRU/TTL cache of principals keyed by `(user_id, token iat)`.
+
+    Invalidating a user bumps a per-user generation instead of scanning the cache, so
+    every cached token snapshot for that user is discarded on its next lookup. Generations
+    come from one increasing counter and are kept for at most `maxsize` users, a user
+    whose generation was dropped reads the highest dropped one, so a principal cached
+    before their last invalidation can never match again.
+
+    Invalidation is per worker. After a user is deleted, changes role or bumps their auth
+    version, other workers keep authorizing their cached principal for up to `ttl` seconds
+    (`PRINCIPAL_CACHE_TTL_SECONDS`), keep it short where that matters.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._maxsize = maxsize
+        self._generations = OrderedDict()
+        self._counter = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        config = app.config
+        maxsize = config.get('PRINCIPAL_CACHE_SIZE', 10000)
+        with self._lock:
+            self._cache = TTLCache(maxsize=maxsize,
+                                   ttl=config.get('PRINCIPAL_CACHE_TTL_SECONDS', 60.0))
+            self._maxsize = maxsize
+            self._generations.clear()
+
+    def get(self, user_id: int, issued_at) -> Principal:
+        entry = self._cache.get((user_id, issued_at))
+        if entry is None:
+            return None
+        generation, principal = entry
+        if generation != self.generation(user_id):
+            self._cache.pop((user_id, issued_at))
+            return None
+        return principal
+
+    def generation(self, user_id: int) -> int:
+        return self._generations.get(user_id, self._floor)
+
+    def latest(self) -> int:
+        """The newest generation given to any user, for loads that only learn the user id from their query."""
+        return self._counter
+
+    def set(self, user_id: int, issued_at, principal: Principal, generation: int):
+        self._cache.set((user_id, issued_at), (generation, principal))
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._counter += 1
+            self._generations[user_id] = self._counter
+            self._generations.move_to_end(user_id)
+            while len(self._generations) > self._maxsize:
+                # The oldest entry holds the lowest generation, so the floor only rises
+                self._floor = self._generations.popitem(last=False)[1]
+
+    def clear(self):
+        self._cache.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def _principal_query(*columns):
+    return db.session.query(User.id, User.email, User.role_id, Role.name,
+                            Role.permissions, User.auth_version, *columns).outerjoin(
+                                Role, User.role_id == Role.id)
+
+
+def _principal_from_row(row) -> Principal:
+    return Principal(id=row[0],
+                     email=row[1],
+                     role_id=row[2],
+                     role_name=row[3],
+                     permissions=row[4] or 0,
+                     version=row[5] or 0)
+
+
+def load_principal(user_id: int) -> Principal:
+    """Load a principal from the database with a single user and role query
+
+    Args:
+        user_id (int): The unique id of the user
+
+    Returns:
+        Principal: the principal, or None if the user does not exist
+    """
+    row = _principal_query().filter(User.id == user_id).first()
+    if row is None:
+        return None
+    return _principal_from_row(row)
+
+
+def load_credentials(email: str) -> tuple[Principal, str]:
+    """Load a user's principal and password hash by email with a single user and role query
+
+    Args:
+        email (str): The user's email, which is unique and indexed
+
+    Returns:
+        Principal: the principal, or None if the user does not exist
+        str: the password hash, or None if the user does not exist
+    """
+    row = _principal_query(User.password_hash).filter(User.email == email).first()
+    if row is None:
+        return None, None
+    return _principal_from_row(row), row[6]
+
+
+def principal_from_user(user: User) -> Principal:
+    """Snapshot a loaded user as a principal
+
+    Args:
+        user (User): The user object, its role is loaded if it is not already
+
+    Returns:
+        Principal: the principal for the user
+    """
+    role = user.role
+    return Principal(id=user.id,
+                     email=user.email,
+                     role_id=user.role_id,
+                     role_name=role.name if role is not None else None,
+                     permissions=(role.permissions or 0) if role is not None else 0,
+                     version=user.auth_version or 0)
+
+
+def get_principal(user_id: int, issued_at=None) -> tuple[bool, str, Principal]:
+    """Get the principal for an authenticated token, from cache where possible
+
+    Args:
+        user_id (int): The unique id of the user the token was issued to
+        issued_at (int, optional): The token's `iat` claim. Defaults to None.
+
+    Returns:
+        bool: whether or not the principal was successfully retrieved
+        str: a message indicating the result of the retrieval
+        Principal: the principal, or None if the user does not exist
+    """
+    principal = principal_cache.get(user_id, issued_at)
+    if principal is not None:
+        return True, 'Success', principal
+
+    try:
+        # Read the generation first so a concurrent invalidation is never overwritten
+        generation = principal_cache.generation(user_id)
+        principal = load_principal(user_id)
+        if principal is not None:
+            principal_cache.set(user_id, issued_at, principal, generation)
+        return True, 'Success', principal
+    except Exception as e:
+        logger.error(f"Unexpected Error trying to find principal: {e}")
+        return False, 'Unexpected error occurred', None
+
+
+def invalidate_principal(user_id: int):
+    """Discard every cached principal for a user after their record changes
+
+    Args:
+        user_id (int): The unique id of the user that changed
+    """
+    principal_cache.invalidate(user_id)
@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from loguru import logger
+from sqlalchemy.exc import IntegrityError
+
+from server.extensions import db
+from server.models.revoked_token import RevokedToken
+from server.utils.bloom_filter import BloomFilter
+
+
+class TokenRevocations:
+    """Per-worker Bloom filter over the revoked token table.
+
+    Almost every token checked is not revoked, and for those the filter answers without a
+    query. Only possible hits are confirmed against the table. The filter is topped up with
+    the newest revocations every `sync_seconds`, so a token revoked in another worker is
+    rejected here within that time, and revocations made in this worker are added straight
+    away. The filter is built by a background thread with its own session, when a worker
+    first checks a token and then every `rebuild_seconds`, which deletes expired revocations
+    and keeps both small. Until a worker's filter is built its checks query the table.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001, sync_seconds: float = 5.0,
+                 rebuild_seconds: float = 3600.0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_seconds = sync_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._filter = None
+        self._pid = None
+        self._synced_at = 0.0
+        self._synced_until = None
+        self._rebuilt_at = 0.0
+        self._sync_lock = threading.Lock()
+        self._rebuilding = threading.Lock()
+
+    def init_app(self, app):
+        config = app.config
+        self.capacity = config.get('REVOCATION_FILTER_CAPACITY', 100000)
+        self.error_rate = config.get('REVOCATION_FILTER_ERROR_RATE', 0.001)
+        self.sync_seconds = config.get('REVOCATION_SYNC_SECONDS', 5.0)
+        self.rebuild_seconds = config.get('REVOCATION_REBUILD_SECONDS', 3600.0)
+
+    def is_revoked(self, jti: str) -> bool:
+        """Whether a token id has been revoked, usually without a database lookup."""
+        self._refresh()
+        bloom = self._filter
+        if bloom is not None and jti not in bloom:
+            return False
+        return db.session.query(RevokedToken.id).filter(RevokedToken.jti == jti).first() is not None
+
+    def revoke(self, jti: str, user_id: int, expires_utc: datetime) -> bool:
+        """Revoke a token until it expires
+
+        Returns:
+            bool: False if the token was already revoked
+        """
+        db.session.add(RevokedToken(jti=jti, user_id=user_id, expires_utc=expires_utc))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return False
+        if self._filter is not None:
+            self._filter.add(jti)
+        return True
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._pid != os.getpid():
+            # A forked worker builds its own filter, the parent's locks may have been held at the fork
+            self._pid = os.getpid()
+            self._filter = None
+            self._sync_lock = threading.Lock()
+            self._rebuilding = threading.Lock()
+            self._rebuilt_at = 0.0
+        if self._filter is None:
+            # Retried every sync interval until a build succeeds
+            if now - self._rebuilt_at >= self.sync_seconds:
+                self.rebuild_in_background()
+            return
+        if now - self._rebuilt_at >= self.rebuild_seconds:
+            self.rebuild_in_background()
+        elif now - self._synced_at >= self.sync_seconds and self._sync_lock.acquire(blocking=False):
+            try:
+                self._sync()
+            finally:
+                self._sync_lock.release()
+
+    def _sync(self):
+        # Overlap the previous sync so revocations committed out of order are not missed
+        since = self._synced_until - timedelta(seconds=self.sync_seconds)
+        self._synced_at = time.monotonic()
+        self._synced_until = datetime.utcnow()
+        for jti, in db.session.query(RevokedToken.jti).filter(RevokedToken.revoked_utc >= since):
+            self._filter.add(jti)
+
+    def rebuild(self):
+        """Delete expired revocations and rebuild the filter from the rest
+
+        This commits, so it runs in its own app context rather than on a request's session.
+        """
+        now = datetime.utcnow()
+        deleted = RevokedToken.query.filter(RevokedToken.expires_utc < now).delete(synchronize_session=False)
+        db.session.commit()
+        jtis = [jti for jti, in db.session.query(RevokedToken.jti)]
+        bloom = BloomFilter(max(self.capacity, len(jtis) * 2), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        self._filter = bloom
+        self._pid = os.getpid()
+        self._synced_at = self._rebuilt_at = time.monotonic()
+        self._synced_until = now
+        if deleted:
+            logger.info("Compacted {} expired token revocations, {} remain", deleted, len(jtis))
+
+    def rebuild_in_background(self):
+        if not self._rebuilding.acquire(blocking=False):
+            return
+        # Not retried by the next request while this one runs
+        self._rebuilt_at = time.monotonic()
+        app = current_app._get_current_object()
+
+        def run():
+            try:
+                with app.app_context():
+                    self.rebuild()
+            except Exception as e:
+                logger.error(f"Failed to rebuild the token revocation filter: {e}")
+            finally:
+                self._rebuilding.release()
+
+        threading.Thread(target=run, name='token-revocation-rebuild', daemon=True).start()
+
+    def clear(self):
+        """Start from an empty filter, for when the table has been emptied."""
+        self._filter = BloomFilter(self.capacity, self.error_rate)
+        self._pid = os.getpid()
+        self._synced_at = self._rebuilt_at = time.monotonic()
+        self._synced_until = datetime.utcnow()
+
+
+token_revocations = TokenRevocations()
+
+
+def is_token_revoked(claims: dict) -> bool:
+    """Whether a decoded token has been revoked, tokens issued without a `jti` cannot be."""
+    jti = claims.get('jti')
+    return jti is not None and token_revocations.is_revoked(jti)
+
+
+def revoke_token(claims: dict) -> tuple[bool, str]:
+    """Revoke a decoded token until it expires
+
+    Args:
+        claims (dict): The token's claims, with its `jti`, `user_id` and `exp`
+
+    Returns:
+        bool: whether or not the token was revoked
+        str: a message indicating the result of the revocation
+    """
+    if 'jti' not in claims or 'exp' not in claims:
+        return False, 'Token cannot be revoked'
+    try:
+        expires_utc = datetime.utcfromtimestamp(claims['exp'])
+        if not token_revocations.revoke(claims['jti'], claims.get('user_id'), expires_utc):
+            return True, 'Token was already revoked'
+        logger.info(f"Revoked token {claims['jti']} of user {claims.get('user_id')}")
+        return True, 'Token revoked'
+    except Exception as e:
+        logger.error(f"Unexpected Error trying to revoke a token: {e}")
+        db.session.rollback()
+        return False, 'Unexpected error occurred'
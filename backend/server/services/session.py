@@ -0,0 +1,217 @@
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+
+from flask import current_app
+from loguru import logger
+from sqlalchemy import func
+
+from server.extensions import db
+from server.models.user import Role, User
+from server.models.user_session import UserSession
+from server.services.principal import invalidate_principal
+from server.types.principal import Principal
+from server.utils.serializer import serialize_many
+
+MAX_DEVICE_LENGTH = 128
+
+
+def hash_refresh_token(refresh_token: str) -> str:
+    """Refresh tokens are 256 random bits, so a fast hash is enough to make a leaked table useless."""
+    return hashlib.sha256(refresh_token.encode('utf-8')).hexdigest()
+
+
+def _new_refresh_token() -> tuple[str, str]:
+    refresh_token = secrets.token_urlsafe(32)
+    return refresh_token, hash_refresh_token(refresh_token)
+
+
+def _expires_utc(now: datetime) -> datetime:
+    return now + timedelta(seconds=current_app.config['REFRESH_TOKEN_EXPIRATION_SECONDS'])
+
+
+def create_session(principal: Principal, device: str = None) -> tuple[bool, str, tuple[str, int]]:
+    """Start a refresh token session for a user on a device
+
+    Args:
+        principal (Principal): The user logging in
+        device (str, optional): A description of the device, such as its user agent. Defaults to None.
+
+    Returns:
+        bool: whether or not the session was created
+        str: a message indicating the result of the creation
+        tuple[str, int]: the refresh token, which is only ever returned here and by
+            `rotate_session`, and the session's id, or None
+    """
+    try:
+        refresh_token, token_hash = _new_refresh_token()
+        now = datetime.utcnow()
+        session = UserSession(user_id=principal.id,
+                              token_hash=token_hash,
+                              device=(device or '')[:MAX_DEVICE_LENGTH] or None,
+                              auth_version=principal.version,
+                              created_utc=now,
+                              last_used_utc=now,
+                              expires_utc=_expires_utc(now))
+        db.session.add(session)
+        # Read before the commit expires it, so the id costs no second query
+        db.session.flush()
+        session_id = session.id
+        db.session.commit()
+        return True, 'Session created', (refresh_token, session_id)
+    except Exception as e:
+        logger.error(f"Unexpected Error trying to create a session: {e}")
+        db.session.rollback()
+        return False, 'Unexpected error occurred', None
+
+
+def rotate_session(refresh_token: str) -> tuple[bool, str, tuple[Principal, str, int]]:
+    """Exchange a refresh token for the user's principal and the session's next refresh token
+
+    The session and its user's principal are loaded with one query on the indexed token
+    hash. Each refresh token works once, presenting a replaced one again revokes its session
+    since the token must have been copied. Sessions end when the user's auth version changes.
+
+    Args:
+        refresh_token (str): The refresh token
+
+    Returns:
+        bool: whether or not the session was rotated
+        str: a message indicating the result of the rotation
+        tuple[Principal, str, int]: the principal, the new refresh token and the session's id, or None
+    """
+    try:
+        token_hash = hash_refresh_token(refresh_token)
+        now = datetime.utcnow()
+        row = db.session.query(UserSession.id, UserSession.auth_version, User.id, User.email,
+                               User.role_id, Role.name, Role.permissions, User.auth_version).join(
+                                   User, UserSession.user_id == User.id).outerjoin(
+                                       Role, User.role_id == Role.id).filter(
+                                           UserSession.token_hash == token_hash,
+                                           UserSession.revoked_utc.is_(None),
+                                           UserSession.expires_utc > now).first()
+        if row is None:
+            reused = UserSession.query.filter(UserSession.previous_token_hash == token_hash,
+                                              UserSession.revoked_utc.is_(None)).update(
+                                                  {UserSession.revoked_utc: now}, synchronize_session=False)
+            if reused:
+                db.session.commit()
+                logger.warning("A replaced refresh token was used again, its session has been revoked")
+            return False, 'Refresh token is invalid', None
+
+        session_id, session_version = row[0], row[1] or 0
+        principal = Principal(id=row[2], email=row[3], role_id=row[4], role_name=row[5],
+                              permissions=row[6] or 0, version=row[7] or 0)
+        if session_version != principal.version:
+            revoke_session(session_id)
+            return False, 'Refresh token has been superseded', None
+
+        new_token, new_hash = _new_refresh_token()
+        # Only the request holding the current token can rotate it
+        rotated = UserSession.query.filter(UserSession.id == session_id,
+                                           UserSession.token_hash == token_hash).update({
+                                               UserSession.token_hash: new_hash,
+                                               UserSession.previous_token_hash: token_hash,
+                                               UserSession.last_used_utc: now,
+                                               UserSession.expires_utc: _expires_utc(now),
+                                           }, synchronize_session=False)
+        db.session.commit()
+        if not rotated:
+            return False, 'Refresh token is invalid', None
+        return True, 'Session refreshed', (principal, new_token, session_id)
+    except Exception as e:
+        logger.error(f"Unexpected Error trying to refresh a session: {e}")
+        db.session.rollback()
+        return False, 'Unexpected error occurred', None
+
+
+def session_is_active(session_id: int) -> bool:
+    """Whether a session has not been revoked or expired, with one lookup on its primary key."""
+    return db.session.query(UserSession.id).filter(UserSession.id == session_id,
+                                                   UserSession.revoked_utc.is_(None),
+                                                   UserSession.expires_utc > datetime.utcnow()).first() is not None
+
+
+def get_user_sessions(user_id: int) -> tuple[bool, str, list]:
+    """Get a user's active sessions, one per device they are logged in on
+
+    Returns:
+        bool: whether or not the sessions were successfully retrieved
+        str: a message indicating the result of the retrieval
+        list: the sessions as dicts, without their token hashes
+    """
+    try:
+        sessions = UserSession.query.filter(UserSession.user_id == user_id,
+                                            UserSession.revoked_utc.is_(None),
+                                            UserSession.expires_utc > datetime.utcnow()).order_by(
+                                                UserSession.last_used_utc.desc()).all()
+        return True, 'Success', serialize_many(UserSession, sessions)
+    except Exception as e:
+        logger.error(f"Unexpected Error trying to find sessions: {e}")
+        return False, 'Unexpected error occurred', []
+
+
+def revoke_session(session_id: int, user_id: int = None) -> tuple[bool, str]:
+    """End one session, optionally only if it belongs to `user_id`
+
+    Returns:
+        bool: whether or not a session was revoked
+        str: a message indicating the result of the revocation
+    """
+    try:
+        query = UserSession.query.filter(UserSession.id == session_id, UserSession.revoked_utc.is_(None))
+        if user_id is not None:
+            query = query.filter(UserSession.user_id == user_id)
+        revoked = query.update({UserSession.revoked_utc: datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        if not revoked:
+            return False, 'Session does not exist'
+        return True, 'Session revoked'
+    except Exception as e:
+        logger.error(f"Unexpected Error trying to revoke a session: {e}")
+        db.session.rollback()
+        return False, 'Unexpected error occurred'
+
+
+def revoke_session_by_token(refresh_token: str) -> tuple[bool, str]:
+    """End the session a refresh token belongs to, used on logout."""
+    try:
+        revoked = UserSession.query.filter(UserSession.token_hash == hash_refresh_token(refresh_token),
+                                           UserSession.revoked_utc.is_(None)).update(
+                                               {UserSession.revoked_utc: datetime.utcnow()},
+                                               synchronize_session=False)
+        db.session.commit()
+        if not revoked:
+            return False, 'Session does not exist'
+        return True, 'Session revoked'
+    except Exception as e:
+        logger.error(f"Unexpected Error trying to revoke a session: {e}")
+        db.session.rollback()
+        return False, 'Unexpected error occurred'
+
+
+def revoke_user_sessions(user_id: int) -> tuple[bool, str, int]:
+    """End every session of a user with one update on the indexed user id
+
+    The user's auth version is bumped too, so access tokens already issued are superseded.
+
+    Returns:
+        bool: whether or not the sessions were revoked
+        str: a message indicating the result of the revocation
+        int: how many sessions were revoked
+    """
+    try:
+        revoked = UserSession.query.filter(UserSession.user_id == user_id,
+                                           UserSession.revoked_utc.is_(None)).update(
+                                               {UserSession.revoked_utc: datetime.utcnow()},
+                                               synchronize_session=False)
+        User.query.filter(User.id == user_id).update(
+            {User.auth_version: func.coalesce(User.auth_version, 0) + 1}, synchronize_session=False)
+        db.session.commit()
+        invalidate_principal(user_id)
+        logger.info(f"Revoked {revoked} sessions of user {user_id}")
+        return True, 'Sessions revoked', revoked
+    except Exception as e:
+        logger.error(f"Unexpected Error trying to revoke sessions: {e}")
+        db.session.rollback()
+        return False, 'Unexpected error occurred', 0
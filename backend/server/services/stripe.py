@@ -1,21 +1,18 @@
 from loguru import logger
 
-from server.integrations.stripe import StripeIntegration
+from server.integrations.stripe import get_stripe_integration
+from server.utils.circuit_breaker import CircuitOpenError
+from server.services.stripe_catalogue import stripe_catalogue
+from server.utils.fast_json import dumps_bytes
 
 
 def get_products() -> tuple[bool, str, list]:
     try:
-        stripe = StripeIntegration()
-        success, message, products = stripe.fetch_products() 
-        for product in products:
-            product['display_price'] = stripe.fetch_price(product['default_price'])
-        
-        # Removing recurring payment type products (those are services)
-        filtered_products = []
-        for product in products:
-            if product['display_price']['type'] == 'one_time' and product['active'] is True:
-                filtered_products.append(product)
-        return success, message, filtered_products
+        # Served from the in-memory catalogue rather than crawling Stripe per request
+        success, message, catalogue = stripe_catalogue.get()
+        if not success:
+            return False, message, []
+        return True, 'successfully obtained products', catalogue.products
     except Exception as e:
         logger.error(f"Unexpected Error trying to find products: {e}")
         return False, 'Unexpected error occurred', []
@@ -23,30 +20,54 @@ def get_products() -> tuple[bool, str, list]:
 
 def get_services() -> tuple[bool, str, list]:
     try:
-        stripe = StripeIntegration()
-        success, message, services = stripe.fetch_products() 
-        for service in services:
-            service['display_price'] = stripe.fetch_price(service['default_price'])
-        
-        # Removing recurring payment type products (those are services)
-        filtered_services = []
-        for service in services:
-            if service['display_price']['type'] == 'recurring' and service['active'] is True:
-                filtered_services.append(service)
-        return success, message, filtered_services
+        success, message, catalogue = stripe_catalogue.get()
+        if not success:
+            return False, message, []
+        return True, 'successfully obtained services', catalogue.services
     except Exception as e:
         logger.error(f"Unexpected Error trying to find services: {e}")
         return False, 'Unexpected error occurred', []
-    
+
+
+def get_catalogue_payload(collection: str) -> tuple[bool, str, bytes]:
+    """Get the `products` or `services` response payload as encoded JSON
+
+    The payload is encoded once per catalogue snapshot and shared by every request until
+    the catalogue is refreshed.
+
+    Args:
+        collection (str): `products` or `services`
+
+    Returns:
+        bool: whether or not the payload was successfully retrieved
+        str: a message indicating the result of the retrieval
+        bytes: the encoded `{"<collection>": [...]}` object
+    """
+    try:
+        success, message, catalogue = stripe_catalogue.get()
+        if not success:
+            return False, message, b''
+        payload = catalogue.encoded.get(collection)
+        if payload is None:
+            payload = catalogue.encoded[collection] = dumps_bytes(
+                {collection: getattr(catalogue, collection)})
+        return True, f'successfully obtained {collection}', payload
+    except Exception as e:
+        logger.error(f"Unexpected Error trying to find {collection}: {e}")
+        return False, 'Unexpected error occurred', b''
+
 
 def get_session_by_id(session_id) -> tuple[bool, str, dict]:
     try:
-        stripe = StripeIntegration()
+        stripe = get_stripe_integration()
         session = stripe.fetch_session_by_id(session_id)
         if session:
             return True, "Successfully fetched session", session
         else:
             return False, "Session not found", {}
+    except CircuitOpenError:
+        logger.warning("Stripe circuit is open, not fetching checkout session")
+        return False, 'Stripe is currently unavailable', {}
     except Exception as e:
         logger.error(f"Unexpected Error trying to get a checkout session: {e}")
         return False, 'Unexpected error occurred', {}
@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+from loguru import logger
+
+from server.integrations.stripe import get_stripe_integration
+
+# `encoded` holds each collection's response payload once it has been encoded
+CatalogueSnapshot = namedtuple('CatalogueSnapshot',
+                               ['products', 'services', 'fetched_at', 'encoded'])
+
+
+def partition_catalogue(products: list) -> CatalogueSnapshot:
+    """Split products into one-time products and recurring services
+
+    Args:
+        products (list): Products with their default price expanded
+
+    Returns:
+        CatalogueSnapshot: the partitioned catalogue
+    """
+    one_time, recurring = [], []
+    for product in products:
+        price = product.get('default_price')
+        if not isinstance(price, dict) or product.get('active') is not True:
+            continue
+        # Keep the response shape the endpoints have always returned
+        product['display_price'] = price
+        product['default_price'] = price.get('id')
+        if price.get('type') == 'one_time':
+            one_time.append(product)
+        elif price.get('type') == 'recurring':
+            recurring.append(product)
+    return CatalogueSnapshot(one_time, recurring, time.time(), {})
+
+
+class StripeCatalogue:
+    """In-memory snapshot of the Stripe catalogue served with stale-while-revalidate.
+
+    A snapshot younger than `fresh_seconds` is served as is. Up to `stale_seconds` it is
+    still served while a background refresh runs. Older than that the caller refreshes
+    synchronously, falling back to the stale snapshot if Stripe fails. A periodic
+    refresher thread keeps the snapshot warm when `refresh_seconds` is set.
+    """
+
+    def __init__(self, fresh_seconds: float = 60.0, stale_seconds: float = 3600.0,
+                 refresh_seconds: float = 300.0):
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.refresh_seconds = refresh_seconds
+        self._snapshot = None
+        self._last_error = 'Unexpected error occurred'
+        self._refresh_lock = threading.Lock()
+        self._refresher_pid = None
+
+    def init_app(self, app):
+        config = app.config
+        self.fresh_seconds = config.get('STRIPE_CATALOGUE_FRESH_SECONDS', 60.0)
+        self.stale_seconds = config.get('STRIPE_CATALOGUE_STALE_SECONDS', 3600.0)
+        self.refresh_seconds = config.get('STRIPE_CATALOGUE_REFRESH_SECONDS', 300.0)
+
+    def get(self) -> tuple[bool, str, CatalogueSnapshot]:
+        """Return the current catalogue snapshot, refreshing it if needed
+
+        Returns:
+            bool: whether or not a catalogue is available
+            str: a message indicating the result
+            CatalogueSnapshot: the catalogue, or None if it could not be fetched
+        """
+        self._ensure_refresher()
+        snapshot = self._snapshot
+        if snapshot is not None:
+            age = time.time() - snapshot.fetched_at
+            if age < self.fresh_seconds:
+                return True, 'Success', snapshot
+            if age < self.stale_seconds:
+                self.refresh_in_background()
+                return True, 'Success', snapshot
+
+        # Past stale the snapshot is still served if Stripe is failing or its circuit is open
+        self.refresh(wait=True)
+        if self._snapshot is None:
+            return False, self._last_error, None
+        return True, 'Success', self._snapshot
+
+    def refresh(self, wait: bool = False) -> bool:
+        """Fetch the catalogue from Stripe and swap in the new snapshot
+
+        Args:
+            wait (bool, optional): Wait for a refresh already in progress instead of
+                returning straight away. Defaults to False.
+
+        Returns:
+            bool: whether or not this call refreshed the catalogue
+        """
+        if not self._refresh_lock.acquire(blocking=wait):
+            return False
+        try:
+            # Another caller may have refreshed while this one waited for the lock
+            if wait and self._snapshot is not None and \
+                    time.time() - self._snapshot.fetched_at < self.fresh_seconds:
+                return False
+            success, message, products = get_stripe_integration().fetch_products_with_prices()
+            if not success:
+                logger.error(f"Failed to refresh Stripe catalogue: {message}")
+                self._last_error = message
+                return False
+            self._snapshot = partition_catalogue(products)
+            logger.info(
+                f"Stripe catalogue refreshed with {len(self._snapshot.products)} products "
+                f"and {len(self._snapshot.services)} services")
+            return True
+        except Exception as e:
+            logger.error(f"Unexpected Error trying to refresh Stripe catalogue: {e}")
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def refresh_in_background(self):
+        if self._refresh_lock.locked():
+            return
+        threading.Thread(target=self.refresh,
+                         name='stripe-catalogue-refresh',
+                         daemon=True).start()
+
+    def _ensure_refresher(self):
+        # Threads do not survive a fork, so each worker starts its own refresher
+        if not self.refresh_seconds or self._refresher_pid == os.getpid():
+            return
+        self._refresher_pid = os.getpid()
+        threading.Thread(target=self._refresh_periodically,
+                         name='stripe-catalogue-refresher',
+                         daemon=True).start()
+
+    def _refresh_periodically(self):
+        while True:
+            time.sleep(self.refresh_seconds)
+            self.refresh()
+
+    def clear(self):
+        self._snapshot = None
+
+
+stripe_catalogue = StripeCatalogue()
@@ -2,8 +2,11 @@ from loguru import logger
 from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 
-from server.extensions import db
-from server.models.user import User
+from server.extensions import db, password_hasher
+from server.models.user import Role, User
+from server.services.principal import invalidate_principal
+from server.utils.passwords import PasswordHashingBusy
+from server.utils.serializer import get_serializer, serialize_many
 
 
 def create_user(user_dict: dict) -> tuple[bool, str]:
@@ -21,9 +24,9 @@ def create_user(user_dict: dict) -> tuple[bool, str]:
             first_name=user_dict.get("first_name"),
             last_name=user_dict.get("last_name"),
             email=user_dict.get("email"),
-            # Set the password using the password setter
         )
-        user.password = user_dict.get("password")
+        # Hashed through the pool, so a saturated pool rejects the request instead of queueing it
+        user.set_password_hash(password_hasher.hash(user_dict.get("password")))
 
         # Add the user to the session and commit
         db.session.add(user)
@@ -40,6 +43,11 @@ def create_user(user_dict: dict) -> tuple[bool, str]:
             return False, 'Integrity Error: User with that email already exists'
         return False, 'Integrity Error: Could not create user'
 
+    except PasswordHashingBusy as e:
+        logger.warning(f"Rejecting new user, password hashing is saturated: {e}")
+        db.session.rollback()
+        return False, 'Password hashing is currently unavailable'
+
     except Exception as e:
         logger.error(f"Unexpected Error: {e}")
         db.session.rollback()
@@ -61,6 +69,71 @@ def get_users() -> tuple[bool, str, list[User]]:
         logger.error(f"Unexpected Error trying to find users: {e}")
         return False, 'Unexpected error occurred', []
 
+
+def get_users_page(limit: int, cursor: int = None) -> tuple[bool, str, dict]:
+    """Get a page of users ordered by id, with their role name, using keyset pagination
+
+    Only the serialized columns are selected, in a single query joined to the role,
+    so no user objects are loaded.
+
+    Args:
+        limit (int): The maximum number of users to return
+        cursor (int, optional): Return users with an id greater than this. Defaults to None.
+
+    Returns:
+        bool: whether or not the users were successfully retrieved
+        str: a message indicating the result of the retrieval
+        dict: the `users` on the page and the `next_cursor`, which is None on the last page
+    """
+    try:
+        query = db.session.query(*User.public_columns(),
+                                 Role.name.label('role_name')).outerjoin(
+                                     Role, User.role_id == Role.id)
+        if cursor is not None:
+            query = query.filter(User.id > cursor)
+        # Fetch one extra row to know whether there is another page
+        rows = query.order_by(User.id).limit(limit + 1).all()
+
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        users = serialize_many(User, rows[:limit], extra=('role_name',))
+        return True, 'Success', {"users": users, "next_cursor": next_cursor}
+    except Exception as e:
+        logger.error(f"Unexpected Error trying to find users: {e}")
+        return False, 'Unexpected error occurred', {}
+
+
+def iter_users(cursor: int = None, batch_size: int = 500) -> tuple[bool, str, object]:
+    """Lazily iterate users ordered by id, with their role name, from a server-side cursor
+
+    The query runs when iteration starts and rows are fetched `batch_size` at a time,
+    so the caller must iterate inside the request (or app) context.
+
+    Args:
+        cursor (int, optional): Iterate users with an id greater than this. Defaults to None.
+        batch_size (int, optional): The number of rows fetched per round trip. Defaults to 500.
+
+    Returns:
+        bool: whether or not the iterator was created
+        str: a message indicating the result
+        generator: yields a dict per user
+    """
+    query = db.session.query(*User.public_columns(),
+                             Role.name.label('role_name')).outerjoin(
+                                 Role, User.role_id == Role.id)
+    if cursor is not None:
+        query = query.filter(User.id > cursor)
+    query = query.order_by(User.id).execution_options(
+        stream_results=True).yield_per(batch_size)
+
+    serializer = get_serializer(User, extra=('role_name',))
+
+    def rows():
+        for row in query:
+            yield serializer(row)
+
+    return True, 'Success', rows()
+
+
 def get_user_by_id(user_id: int) -> tuple[bool, str, User]:
     """Get a user by their unique id
 
@@ -96,9 +169,12 @@ def update_user(user: User, user_dict: dict) -> tuple[bool, str, User]:
         # Update the user with the new data
         for key, value in user_dict.items():
             setattr(user, key, value)
+        if 'role_id' in user_dict:
+            user.bump_auth_version()
 
         # Commit the changes to the database
         db.session.commit()
+        invalidate_principal(user.id)
 
         logger.info(f"User {user.email} updated in database")
         return True, 'User updated successfully', user
@@ -136,9 +212,12 @@ def update_user_by_id(user_id: int, user_dict: dict) -> tuple[bool, str, User]:
         # Update the user with the new data
         for key, value in user_dict.items():
             setattr(user, key, value)
+        if 'role_id' in user_dict:
+            user.bump_auth_version()
 
         # Commit the changes to the database
         db.session.commit()
+        invalidate_principal(user.id)
 
         logger.info(f"User {user.email} updated in database")
         return True, 'User updated successfully', user
@@ -168,8 +247,10 @@ def delete_user(user: User) -> tuple[bool, str]:
         str: a message indicating the result of the deletion
     """
     try:
+        user_id = user.id
         db.session.delete(user)
         db.session.commit()
+        invalidate_principal(user_id)
 
         logger.info(f"User {user.email} deleted from database")
         return True, 'User deleted successfully'
@@ -197,6 +278,7 @@ def delete_user_by_id(user_id: int) -> tuple[bool, str]:
 
         db.session.delete(user)
         db.session.commit()
+        invalidate_principal(user_id)
 
         logger.info(f"User {user.email} deleted from database")
         return True, 'User deleted successfully'
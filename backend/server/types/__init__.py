@@ -0,0 +1 @@
+from server.types.principal import *  # noqa
@@ -0,0 +1,47 @@
+from typing import NamedTuple
+
+from server.models.user import Permission
+
+
+class Principal(NamedTuple):
+    """Immutable snapshot of an authenticated user.
+
+    Carries only what authorization needs, so it can be cached and shared between
+    requests without holding an ORM object or its session.
+    """
+    id: int
+    email: str
+    role_id: int
+    role_name: str
+    permissions: int
+    version: int = 0
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> 'Principal':
+        """Build a principal from the claims of a token issued by `get_new_token`."""
+        return cls(id=claims['user_id'],
+                   email=claims.get('email'),
+                   role_id=claims.get('role_id'),
+                   role_name=claims.get('user_role'),
+                   permissions=claims['perms'],
+                   version=claims['ver'])
+
+    def to_claims(self) -> dict:
+        """Return the claims that let a token be authorized without a database lookup."""
+        return {
+            "user_id": self.id,
+            "email": self.email,
+            "role_id": self.role_id,
+            "user_role": self.role_name,
+            "perms": self.permissions,
+            "ver": self.version
+        }
+
+    def can(self, permissions: int) -> bool:
+        return (self.permissions & permissions) == permissions
+
+    def is_admin(self) -> bool:
+        return self.can(Permission.ADMINISTER)
+
+    def is_user(self) -> bool:
+        return self.can(Permission.GENERAL)
@@ -0,0 +1,42 @@
+# Standard Imports
+import hashlib
+import math
+
+# Third Party Imports
+
+# Local Imports
+
+
+class BloomFilter:
+    """Fixed size set membership test with no false negatives.
+
+    `key in bloom` is False for every key never added, and True for added keys and a
+    fraction `error_rate` of the others, so a miss can skip the exact lookup entirely.
+
+    Args:
+        capacity (int): How many keys the filter is sized for
+        error_rate (float, optional): The false positive rate at capacity. Defaults to 0.001.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        # Double hashing derives every position from two hashes
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
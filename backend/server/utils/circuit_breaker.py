@@ -0,0 +1,76 @@
+# Standard Imports
+import threading
+import time
+
+# Third Party Imports
+from loguru import logger
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency while its circuit is open."""
+
+
+class CircuitBreaker:
+    """Fail fast while a dependency is unhealthy.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls are rejected
+    for `recovery_seconds`. Then a single trial call is let through (half open): success
+    closes the circuit, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def before_call(self):
+        """Raise `CircuitOpenError` if the call should not be attempted."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_seconds:
+                    raise CircuitOpenError(f"{self.name} circuit is open")
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                raise CircuitOpenError(f"{self.name} circuit is half open")
+            self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"{self.name} circuit closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(
+                        f"{self.name} circuit opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
@@ -0,0 +1,118 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from flasgger import LazyJSONEncoder
+from flask import Response, current_app
+from loguru import logger
+
+from server.utils.global_helper_functions import datetime_to_isoformat_zulu
+from server.utils.timing import phase
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+JSON_BACKENDS = ('orjson', 'stdlib')
+_backend = 'orjson' if orjson is not None else 'stdlib'
+
+
+def _default(obj):
+    """Encode the types the standard encoders do not, the same way for every backend."""
+    if isinstance(obj, datetime):
+        return datetime_to_isoformat_zulu(obj)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, (UUID, Decimal)):
+        return str(obj)
+    if hasattr(obj, '__html__'):
+        # Flasgger's LazyString and markupsafe strings
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def set_json_backend(name: str) -> str:
+    """Select the JSON backend used by `dumps_bytes`
+
+    Args:
+        name (str): `orjson`, `stdlib` or `auto`, which prefers orjson when it is installed
+
+    Returns:
+        str: the backend in use, which is `stdlib` if orjson was asked for but is not installed
+    """
+    global _backend
+    if name == 'auto':
+        name = 'orjson'
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"Unknown JSON backend '{name}', expected one of {JSON_BACKENDS}")
+    if name == 'orjson' and orjson is None:
+        logger.warning("orjson is not installed, falling back to the standard library JSON encoder")
+        name = 'stdlib'
+    _backend = name
+    return _backend
+
+
+def get_json_backend() -> str:
+    return _backend
+
+
+def dumps_bytes(obj, indent: bool = False) -> bytes:
+    """Encode an object to compact UTF-8 JSON with the selected backend
+
+    Args:
+        obj: The object to encode
+        indent (bool, optional): Pretty print with an indent of 2. Defaults to False.
+
+    Returns:
+        bytes: the encoded JSON
+    """
+    if _backend == 'orjson':
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    if indent:
+        return json.dumps(obj, default=_default, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, default=_default, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def json_response(obj, status: int = 200) -> Response:
+    """Build a JSON response like `jsonify`, encoded with the fast backend
+
+    Responses are only pretty printed in debug mode or when `JSONIFY_PRETTYPRINT_REGULAR` is set.
+
+    Args:
+        obj: The object to encode
+        status (int, optional): The HTTP status code. Defaults to 200.
+
+    Returns:
+        Response: the JSON response
+    """
+    indent = current_app.debug or current_app.config['JSONIFY_PRETTYPRINT_REGULAR']
+    with phase("serialize"):
+        body = dumps_bytes(obj, indent=indent)
+    return Response(body + b'\n' if indent else body,
+                    status=status,
+                    mimetype=current_app.config['JSONIFY_MIMETYPE'])
+
+
+class FastJSONEncoder(LazyJSONEncoder):
+    """App-wide `json_encoder` that encodes datetimes, UUIDs and decimals like `dumps_bytes`.
+
+    It still extends flasgger's `LazyJSONEncoder`, so `jsonify` and the Swagger spec keep working.
+    """
+
+    def default(self, obj):
+        try:
+            return _default(obj)
+        except TypeError:
+            return super().default(obj)
+
+
+def init_json(app):
+    """Install the fast JSON encoder on the app and select the configured backend."""
+    app.json_encoder = FastJSONEncoder
+    set_json_backend(app.config.get('JSON_BACKEND', 'auto'))
@@ -6,6 +6,8 @@ def datetime_to_isoformat_zulu(dt_object) -> str:
     """
     Convert a datetime object to an ISO 8601 formatted string with 'Z' designation for UTC.
 
+    Naive datetimes are treated as UTC, as all the `*_utc` columns are stored that way.
+
     Args:
         dt_object (datetime): The datetime object to convert.
 
@@ -13,7 +15,10 @@ def datetime_to_isoformat_zulu(dt_object) -> str:
         str: An ISO 8601 formatted string representing the datetime in UTC.
     """
     # Ensure the datetime object is in UTC
-    dt_object = dt_object.astimezone(timezone.utc)
+    if dt_object.tzinfo is None:
+        return dt_object.isoformat(timespec='milliseconds') + 'Z'
+    if dt_object.utcoffset():
+        dt_object = dt_object.astimezone(timezone.utc)
 
     # Convert to ISO format and append 'Z' for UTC designation
     iso_format_str = dt_object.isoformat(timespec='milliseconds').replace(
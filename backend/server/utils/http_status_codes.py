@@ -1,6 +1,9 @@
-from flask import jsonify
+from flask import Response, current_app
 from loguru import logger
 
+from server.utils.fast_json import dumps_bytes, json_response
+from server.utils.timing import phase
+
 HTTP_STATUS_CODES = {
     # 1xx: Informational
     100: {
@@ -254,61 +257,80 @@ HTTP_STATUS_CODES = {
 }
 
 
-def handle_status_code(code: int, data: dict = None) -> jsonify:
-    """Return a response object with the appropriate status code and message
+UNKNOWN_STATUS = {"status": "error", "message": "Unknown error"}
+
+# Each status code's encoded envelope without its closing brace, built on first use
+_envelope_prefixes = {}
+
+
+def envelope_prefix(code: int) -> bytes:
+    """Return the encoded `status_code`, `message` and `status` envelope of a status code,
+    left open so a `data` member can follow
 
     Args:
         code (int): The HTTP status code
-        data (dict, optional): A dict of additional information. Defaults to None.
 
     Returns:
-        json: A json response object
+        bytes: e.g. `{"status_code":200,"message":"OK","status":"success"`
     """
-    status_info = HTTP_STATUS_CODES.get(code, {
-        "status": "error",
-        "message": "Unknown error"
-    })
-
-    # Initialize the response dictionary
-    response_dict = {
-        "status_code": code,
-        "message": status_info["message"],
-        "status": status_info["status"]
-    }
-
-    # Add data to the response dictionary if provided
-    if data is not None and isinstance(data, dict):
-        response_dict["data"] = data
-    elif data is not None and not isinstance(data, dict):
-        code = 500
-        logger.error(
-            f'{code} API Error: data provided must be a dictionary or None')
-        # Update status_info for the new code
-        status_info = HTTP_STATUS_CODES.get(code, {
-            "status": "error",
-            "message": "Unknown error"
-        })
-        response_dict.update({
+    prefix = _envelope_prefixes.get(code)
+    if prefix is None:
+        status_info = HTTP_STATUS_CODES.get(code, UNKNOWN_STATUS)
+        prefix = _envelope_prefixes[code] = dumps_bytes({
             "status_code": code,
             "message": status_info["message"],
             "status": status_info["status"]
-        })
+        })[:-1]
+    return prefix
 
-    # Log the message based on the status code
-    if 400 <= code <= 599:
-        logger.error(f'{code} API Error: {status_info["message"]}')
-    else:
-        logger.info(f'{code} API Status: {status_info["message"]}')
 
+def _envelope_response(code: int, body: bytes) -> Response:
+    return Response(body, status=code, mimetype=current_app.config['JSONIFY_MIMETYPE'])
+
+
+def handle_status_code(code: int, data: dict = None) -> Response:
+    """Return a response object with the appropriate status code and message
+
+    Only `data` is encoded per call, the rest of the envelope is precomputed per status code.
+    Responses are logged by the response logger, not here.
+
+    Args:
+        code (int): The HTTP status code
+        data (dict, optional): A dict of additional information. Defaults to None.
+
+    Returns:
+        Response: A json response object
+    """
+    if data is not None and not isinstance(data, dict):
+        logger.error('{} API Error: data provided must be a dictionary or None', code)
+        code, data = 500, None
+
+    if current_app.debug or current_app.config['JSONIFY_PRETTYPRINT_REGULAR']:
+        status_info = HTTP_STATUS_CODES.get(code, UNKNOWN_STATUS)
+        response_dict = {"status_code": code, "message": status_info["message"], "status": status_info["status"]}
+        if data is not None:
+            response_dict["data"] = data
+        return json_response(response_dict, status=code)
+
+    if data is None:
+        return _envelope_response(code, envelope_prefix(code) + b'}')
     try:
-        response = jsonify(response_dict)
-        response.status_code = code  # Set the correct status code
+        with phase("serialize"):
+            body = dumps_bytes(data)
     except Exception as e:
-        logger.error(f"Error creating response: {e}")
-        response = jsonify({
-            "status_code": 500,
-            "message": "Internal Server Error",
-            "status": "error"
-        })
-        response.status_code = 500
-    return response
+        logger.error("Error creating response: {}", e)
+        return _envelope_response(500, envelope_prefix(500) + b'}')
+    return _envelope_response(code, b''.join((envelope_prefix(code), b',"data":', body, b'}')))
+
+
+def raw_status_code(code: int, data: bytes) -> Response:
+    """Like `handle_status_code`, for handlers whose `data` is already encoded JSON
+
+    Args:
+        code (int): The HTTP status code
+        data (bytes): An encoded JSON object, e.g. a cached catalogue payload
+
+    Returns:
+        Response: A json response object, never pretty printed
+    """
+    return _envelope_response(code, b''.join((envelope_prefix(code), b',"data":', data, b'}')))
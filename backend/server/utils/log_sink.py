@@ -0,0 +1,276 @@
+# Standard Imports
+import gzip
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no fcntl
+    fcntl = None
+
+# Third Party Imports
+
+# Local Imports
+
+# Record fields copied into every JSON line when they are bound or set by the request context
+CONTEXT_FIELDS = ('request_id', 'method', 'path', 'endpoint', 'status', 'latency_ms', 'timings')
+
+
+def format_json_line(record: dict) -> str:
+    """Render a loguru record as a single JSON line
+
+    Args:
+        record (dict): The loguru record
+
+    Returns:
+        str: the JSON line, ending in a newline
+    """
+    line = {
+        "time": record["time"].isoformat(timespec='milliseconds'),
+        "level": record["level"].name,
+        "message": record["message"],
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+    }
+    extra = record["extra"]
+    for field in CONTEXT_FIELDS:
+        if field in extra:
+            line[field] = extra[field]
+    exception = record["exception"]
+    if exception is not None:
+        line["exception"] = ''.join(
+            traceback.format_exception(exception.type, exception.value, exception.traceback))
+    return json.dumps(line, default=str, ensure_ascii=False) + '\n'
+
+
+class RotatingFileWriter:
+    """Append to a file shared by every worker, rotating it once it passes `max_bytes`.
+
+    Only one worker rotates the file at a time, holding a lock file, and only if nobody
+    rotated it first. The others notice the file was replaced by its inode within
+    `check_interval` seconds and reopen it. Rotated files are left `grace_seconds` for those
+    late writes, then gzipped on a background thread, and only the newest `backup_count`
+    are kept. Within a worker only the sink's writer thread writes, so there is no locking.
+    """
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int = 10, compress: bool = True,
+                 check_interval: float = 1.0, grace_seconds: float = 5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.check_interval = check_interval
+        self.grace_seconds = grace_seconds
+        directory, name = os.path.split(path)
+        os.makedirs(directory, exist_ok=True)
+        # Hidden so it is never taken for a rotated file
+        self._lock_path = os.path.join(directory, f".{name}.lock")
+        self._rotations = 0
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, 'a', encoding='utf-8')
+        stat = os.fstat(self._file.fileno())
+        self._inode = (stat.st_dev, stat.st_ino)
+        self._size = stat.st_size
+        self._checked_at = time.monotonic()
+
+    def _current_inode(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None, 0
+        return (stat.st_dev, stat.st_ino), stat.st_size
+
+    def write(self, text: str):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._check()
+        if self.max_bytes and self._size >= self.max_bytes:
+            self.rotate()
+        self._file.write(text)
+        self._size += len(text.encode('utf-8'))
+
+    def _check(self):
+        """Reopen the file if another worker rotated it, and count their writes in its size."""
+        self._file.flush()
+        inode, size = self._current_inode()
+        if inode != self._inode:
+            self._file.close()
+            self._open()
+        else:
+            self._size = size
+            self._checked_at = time.monotonic()
+
+    def flush(self):
+        self._file.flush()
+
+    @contextmanager
+    def _rotation_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def rotate(self):
+        with self._rotation_lock():
+            self._file.flush()
+            inode, size = self._current_inode()
+            # Another worker may have rotated the file while this one waited for the lock
+            rotated = None
+            if inode == self._inode and size >= self.max_bytes:
+                self._rotations += 1
+                rotated = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}.{os.getpid()}.{self._rotations}"
+                os.replace(self.path, rotated)
+            self._file.close()
+            self._open()
+        if rotated is None:
+            return
+        if self.compress:
+            threading.Thread(target=self._compress_and_prune, args=(rotated, ),
+                             name='log-compress', daemon=True).start()
+        else:
+            self._prune()
+
+    def _compress_and_prune(self, rotated: str):
+        # Other workers append to the rotated file until they next check its inode
+        time.sleep(self.grace_seconds)
+        try:
+            with open(rotated, 'rb') as source, gzip.open(rotated + '.gz', 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(rotated)
+        except OSError as e:
+            sys.stderr.write(f"Failed to compress rotated log {rotated}: {e}\n")
+        self._prune()
+
+    def _prune(self):
+        directory, name = os.path.split(self.path)
+        backups = sorted(
+            (entry for entry in os.listdir(directory)
+             if entry.startswith(name + '.') and (not self.compress or entry.endswith('.gz'))),
+            key=lambda entry: os.path.getmtime(os.path.join(directory, entry)))
+        for entry in backups[:max(len(backups) - self.backup_count, 0)]:
+            try:
+                os.remove(os.path.join(directory, entry))
+            except OSError:
+                pass
+
+    def close(self):
+        self._file.close()
+
+
+class AsyncLogSink:
+    """Non-blocking loguru sink backed by a bounded ring buffer.
+
+    `write` only appends the record to the buffer, so logging never waits on a formatter,
+    a disk or a pipe. A background thread formats and writes the records in batches. When
+    the buffer is full new records are dropped and counted, and the writer reports how many
+    were dropped. The writer is restarted in each forked worker.
+
+    Args:
+        writer: An object with `write(str)` and `flush()`, such as `RotatingFileWriter` or a stream
+        formatter (callable): Renders a loguru record to text. Defaults to `format_json_line`.
+        capacity (int, optional): The most records buffered. Defaults to 10000.
+        flush_interval (float, optional): The longest a record waits to be written. Defaults to 0.5.
+    """
+
+    def __init__(self, writer, formatter=format_json_line, capacity: int = 10000,
+                 flush_interval: float = 0.5):
+        self.writer = writer
+        self.formatter = formatter
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._accepted = 0
+        self._flushed = 0
+        self._reported_dropped = 0
+        self._buffer = deque()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._pid = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def write(self, message):
+        if self._pid != os.getpid():
+            self._start()
+        if len(self._buffer) >= self.capacity:
+            self.dropped += 1
+            return
+        self._buffer.append(message.record)
+        self._accepted += 1
+        if not self._wake.is_set():
+            self._wake.set()
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # A forked worker inherits the parent's buffer, but not the thread draining it
+            self._buffer.clear()
+            self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        if not self._buffer and self.dropped == self._reported_dropped:
+            return
+        try:
+            while self._buffer:
+                record = self._buffer.popleft()
+                self.writer.write(self.formatter(record))
+                self.written += 1
+            dropped = self.dropped
+            if dropped != self._reported_dropped:
+                self.writer.write(json.dumps({
+                    "time": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                    "level": "WARNING",
+                    "message": f"Log buffer full, dropped {dropped - self._reported_dropped} messages",
+                    "dropped_total": dropped
+                }) + '\n')
+                self._reported_dropped = dropped
+            self.writer.flush()
+            self._flushed = self.written
+        except Exception as e:
+            sys.stderr.write(f"Failed to write log records: {e}\n")
+
+    def wait_until_empty(self, timeout: float = 1.0) -> bool:
+        """Block until everything buffered so far has been written and flushed, for tests and shutdown."""
+        target = self._accepted
+        deadline = time.monotonic() + timeout
+        self._wake.set()
+        while self._flushed < target and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return self._flushed >= target
+
+    def stats(self) -> dict:
+        return {"buffered": len(self._buffer), "written": self.written, "dropped": self.dropped}
+
+    def stop(self):
+        """Called by loguru when the sink is removed, writes out what is buffered."""
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=2)
+        if isinstance(self.writer, RotatingFileWriter):
+            self.writer.close()
@@ -3,10 +3,20 @@ import os
 import sys
 
 # Third Party Imports
+from flask import g, has_request_context, request
 from loguru import logger
 
 # Local Imports
 from server.config import ServerConfig, root_project_dir
+from server.utils.log_sink import AsyncLogSink, RotatingFileWriter
+
+
+def add_request_context(record):
+    """Loguru patcher adding the current request's id and endpoint to every record."""
+    if has_request_context():
+        extra = record["extra"]
+        extra.setdefault("request_id", g.get("request_id"))
+        extra.setdefault("endpoint", request.endpoint)
 
 
 def setup_logger():
@@ -15,9 +25,11 @@ def setup_logger():
     environment = os.getenv("FLASK_CONFIG", "production")
     diagnose = False if environment == "production" else True
     logging_level = os.getenv("LOGGING_LEVEL", "INFO")
+    log_format = ServerConfig.LOG_FORMAT or ('json' if environment == "production" else 'text')
 
-    # Remove the default handler
+    # Remove the existing handlers, which stops and drains any async sinks
     logger.remove()
+    logger.configure(patcher=add_request_context)
 
     # Configure Loguru logger
     logger_format = (
@@ -25,22 +37,23 @@ def setup_logger():
         "<level>{level: <8}</level> | "
         "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
         "<level>{message}</level>")
-    logger.add(sys.stderr,
-               colorize=True,
-               diagnose=diagnose,
-               format=logger_format,
-               level=logging_level)
-
-    # Check if directory exists
-    if not os.path.exists(f"{root_project_dir}/data/server/logs"):
-        os.makedirs(f"{root_project_dir}/data/server/logs")
-
-    # Add a log file
-    logger.add(
-        f"{root_project_dir}/data/server/logs/server.log",
-        diagnose=diagnose,
-        retention="10 days",
-        enqueue=True,
-        #compression="zip",
-        format=logger_format,
-        level="INFO")
+    if log_format == 'json':
+        # Structured lines written by a background thread so requests never wait on stderr
+        logger.add(AsyncLogSink(sys.stderr, capacity=ServerConfig.LOG_BUFFER_SIZE),
+                   format="{message}",
+                   level=logging_level)
+    else:
+        logger.add(sys.stderr,
+                   colorize=True,
+                   diagnose=diagnose,
+                   format=logger_format,
+                   level=logging_level)
+
+    # Add a log file of JSON lines, rotated by size and compressed in the background
+    writer = RotatingFileWriter(f"{root_project_dir}/data/server/logs/server.log",
+                                max_bytes=ServerConfig.LOG_FILE_MAX_BYTES,
+                                backup_count=ServerConfig.LOG_FILE_BACKUP_COUNT,
+                                compress=ServerConfig.LOG_FILE_COMPRESS)
+    logger.add(AsyncLogSink(writer, capacity=ServerConfig.LOG_BUFFER_SIZE),
+               format="{message}",
+               level="INFO")
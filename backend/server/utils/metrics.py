@@ -0,0 +1,527 @@
+# Standard Imports
+import glob
+import hmac
+import ipaddress
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no fcntl
+    fcntl = None
+
+# Third Party Imports
+from flask import g, request
+from loguru import logger
+
+# Local Imports
+from server.config import root_project_dir
+
+# Request latency buckets in seconds, fine enough around typical API latencies for p50 and p99
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+
+####################################################################################
+#
+#         Value Stores
+#
+####################################################################################
+
+
+class MemoryValues:
+    """Series values held in this process only, for a single worker or for tests."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, key: str, amount: float = 1.0):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, key: str, value: float):
+        self._values[key] = value
+
+    def collect(self) -> list:
+        """Return a `(pid, {key: value})` pair per worker."""
+        return [(os.getpid(), dict(self._values))]
+
+    def merge_dead_workers(self, keep) -> int:
+        return 0
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class MmapValues:
+    """Series values in a memory mapped file per worker process, read together by any worker.
+
+    Only its own process writes each file, so recording never takes a cross-process lock.
+    Entries are appended as `(key_length, key, value)` and the value is updated in place.
+    The length is written last, so a reader stops at an entry that is still being written.
+    Files left by workers that have exited are folded into `metrics_archive.db` and removed.
+    """
+
+    name = 'mmap'
+    archive_name = 'metrics_archive.db'
+    _length = struct.Struct('<I')
+    _value = struct.Struct('<d')
+    _initial_size = 1024 * 1024
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._pid = None
+        self._map = None
+        self._offsets = {}
+        self._used = 0
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics_{pid}.db")
+
+    def _open(self):
+        # Each forked worker starts its own file, the parent's stays for its own totals
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(self._path(os.getpid()), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            size = max(os.fstat(fd).st_size, self._initial_size)
+            os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._offsets = {}
+        self._used = 0
+        for key, offset, value in self._read(self._map):
+            self._offsets[key] = offset
+            self._used = offset + self._value.size
+        self._pid = os.getpid()
+
+    @classmethod
+    def _read(cls, buf):
+        position = 0
+        while position + cls._length.size <= len(buf):
+            (length, ) = cls._length.unpack_from(buf, position)
+            if length == 0:
+                break
+            key_start = position + cls._length.size
+            offset = cls._value_offset(key_start + length)
+            if offset + cls._value.size > len(buf):
+                break
+            key = bytes(buf[key_start:key_start + length]).decode('utf-8')
+            (value, ) = cls._value.unpack_from(buf, offset)
+            yield key, offset, value
+            position = offset + cls._value.size
+
+    @staticmethod
+    def _value_offset(end: int) -> int:
+        # Values are 8 byte aligned so they are written in a single store
+        return (end + 7) & ~7
+
+    def _offset(self, key: str) -> int:
+        offset = self._offsets.get(key)
+        if offset is not None:
+            return offset
+        encoded = key.encode('utf-8')
+        key_start = self._used + self._length.size
+        offset = self._value_offset(key_start + len(encoded))
+        if offset + self._value.size > len(self._map):
+            self._grow(offset + self._value.size)
+        self._map[key_start:key_start + len(encoded)] = encoded
+        self._value.pack_into(self._map, offset, 0.0)
+        self._length.pack_into(self._map, self._used, len(encoded))
+        self._offsets[key] = offset
+        self._used = offset + self._value.size
+        return offset
+
+    def _grow(self, needed: int):
+        size = len(self._map)
+        while size < needed + self._length.size:
+            size *= 2
+        self._map.resize(size)
+
+    def inc(self, key: str, amount: float = 1.0):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            offset = self._offset(key)
+            (value, ) = self._value.unpack_from(self._map, offset)
+            self._value.pack_into(self._map, offset, value + amount)
+
+    def set(self, key: str, value: float):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            self._value.pack_into(self._map, self._offset(key), value)
+
+    def collect(self) -> list:
+        """Return a `(pid, {key: value})` pair per worker file in the directory.
+
+        The archive of exited workers is returned with a pid of None.
+        """
+        workers = []
+        for path in glob.glob(os.path.join(self.directory, 'metrics_*.db')):
+            try:
+                pid = self._file_pid(path)
+                values = self._read_file(path)
+            except (OSError, ValueError):
+                continue
+            workers.append((pid, values))
+        return workers
+
+    def _file_pid(self, path: str):
+        name = os.path.basename(path)
+        if name == self.archive_name:
+            return None
+        return int(name[len('metrics_'):-len('.db')])
+
+    @classmethod
+    def _read_file(cls, path: str) -> dict:
+        with open(path, 'rb') as file:
+            buf = file.read()
+        return {key: value for key, offset, value in cls._read(buf)}
+
+    @classmethod
+    def _encode(cls, values: dict) -> bytes:
+        buf = bytearray()
+        for key, value in values.items():
+            encoded = key.encode('utf-8')
+            buf += cls._length.pack(len(encoded)) + encoded
+            buf += bytes(cls._value_offset(len(buf)) - len(buf))
+            buf += cls._value.pack(value)
+        return bytes(buf)
+
+    def merge_dead_workers(self, keep) -> int:
+        """Fold the files of workers that have exited into the archive and remove them
+
+        Totals stay the same while the directory stops growing with every restarted worker.
+        Merges hold a lock file so two workers never fold the same file twice.
+
+        Args:
+            keep (callable): Whether a series outlives its worker, gauges do not
+
+        Returns:
+            int: how many worker files were merged
+        """
+        if fcntl is None or not os.path.isdir(self.directory):
+            return 0
+        with open(os.path.join(self.directory, '.metrics.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                dead = []
+                for path in glob.glob(os.path.join(self.directory, 'metrics_*.db')):
+                    try:
+                        pid = self._file_pid(path)
+                    except ValueError:
+                        continue
+                    if pid is not None and pid != os.getpid() and not _pid_alive(pid):
+                        dead.append(path)
+                if not dead:
+                    return 0
+
+                archive_path = os.path.join(self.directory, self.archive_name)
+                archive = self._read_file(archive_path) if os.path.exists(archive_path) else {}
+                for path in dead:
+                    for key, value in self._read_file(path).items():
+                        if keep(key):
+                            archive[key] = archive.get(key, 0.0) + value
+                temporary_path = f"{archive_path}.tmp"
+                with open(temporary_path, 'wb') as file:
+                    file.write(self._encode(archive))
+                os.replace(temporary_path, archive_path)
+                for path in dead:
+                    os.remove(path)
+                logger.info(f"Merged the metrics of {len(dead)} exited workers")
+                return len(dead)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def clear(self):
+        with self._lock:
+            for path in glob.glob(os.path.join(self.directory, 'metrics_*.db')):
+                os.remove(path)
+            self._pid = None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+####################################################################################
+#
+#         Metrics
+#
+####################################################################################
+
+
+def _series(name: str, labels: tuple, values: tuple) -> str:
+    if not labels:
+        return name
+    pairs = ','.join(f'{label}="{_escape(value)}"' for label, value in zip(labels, values))
+    return f"{name}{{{pairs}}}"
+
+
+def _series_with(name: str, labels: str) -> str:
+    return f"{name}{{{labels}}}" if labels else name
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name: str, help_text: str, labels: tuple = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        # Rendered series names are cached, so recording does no string formatting
+        self._keys = {}
+
+    def _key(self, values: tuple) -> str:
+        key = self._keys.get(values)
+        if key is None:
+            key = self._keys[values] = _series(self.name, self.labels, values)
+        return key
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *values, amount: float = 1.0):
+        self.registry.values.inc(self._key(values), amount)
+
+
+class Gauge(Metric):
+    """A gauge summed over the live workers, e.g. requests in flight."""
+
+    kind = 'gauge'
+
+    def inc(self, *values, amount: float = 1.0):
+        self.registry.values.inc(self._key(values), amount)
+
+    def dec(self, *values, amount: float = 1.0):
+        self.registry.values.inc(self._key(values), -amount)
+
+    def set(self, *values, value: float):
+        self.registry.values.set(self._key(values), value)
+
+
+class Histogram(Metric):
+    """Fixed bucket histogram, stored as a count per bucket and made cumulative when rendered."""
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name: str, help_text: str, labels: tuple = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(registry, name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'), )
+
+    def _keys_for(self, values: tuple) -> tuple:
+        keys = self._keys.get(values)
+        if keys is None:
+            labels = self.labels + ('le', )
+            keys = self._keys[values] = (
+                tuple(_series(f"{self.name}_bucket", labels, values + (_format_bound(bound), ))
+                      for bound in self.buckets),
+                _series(f"{self.name}_sum", self.labels, values),
+                _series(f"{self.name}_count", self.labels, values),
+            )
+        return keys
+
+    def observe(self, value: float, *values):
+        buckets, sum_key, count_key = self._keys_for(values)
+        store = self.registry.values
+        store.inc(buckets[bisect_left(self.buckets, value)])
+        store.inc(sum_key, value)
+        store.inc(count_key)
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+####################################################################################
+#
+#         Registry
+#
+####################################################################################
+
+
+class MetricsRegistry:
+    """In-process metrics registry rendered in the Prometheus text format.
+
+    Values live in a store shared by every worker on the host when `METRICS_STORAGE` is
+    `mmap`, so any worker can serve the totals for all of them. Request count, latency and
+    in-flight requests are recorded per blueprint, endpoint and status by request hooks.
+    """
+
+    def __init__(self):
+        self.values = MemoryValues()
+        self.metrics = {}
+        self.enabled = False
+        self.token = None
+        self.allowed_networks = ()
+        self.requests = self.counter('http_requests_total', 'HTTP requests handled',
+                                     ('blueprint', 'endpoint', 'method', 'status'))
+        self.latency = self.histogram('http_request_duration_seconds',
+                                      'HTTP request latency in seconds',
+                                      ('blueprint', 'endpoint', 'status'))
+        self.in_flight = self.gauge('http_requests_in_flight', 'HTTP requests being handled')
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter(self, name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: tuple = ()) -> Gauge:
+        return self._register(Gauge(self, name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, help_text, labels, buckets))
+
+    def _register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        if not self.enabled:
+            return
+        self.token = app.config.get('METRICS_TOKEN') or None
+        self.allowed_networks = tuple(
+            ipaddress.ip_network(network.strip(), strict=False)
+            for network in (app.config.get('METRICS_ALLOWED_IPS') or '').split(',') if network.strip())
+        if app.config.get('METRICS_STORAGE', MemoryValues.name) == MmapValues.name:
+            directory = app.config.get('METRICS_DIR') or \
+                os.path.join(root_project_dir, 'data', 'server', 'metrics')
+            self.values = MmapValues(directory)
+            self.values.merge_dead_workers(self._outlives_worker)
+        else:
+            self.values = MemoryValues()
+        app.before_request(self._start_request)
+        app.after_request(self._record_request)
+        app.teardown_request(self._end_request)
+        logger.info(f"Metrics using {self.values.name} storage")
+
+    def allows(self, remote_addr: str, token: str = None) -> bool:
+        """Whether a scrape may read the metrics, by `METRICS_TOKEN` or from `METRICS_ALLOWED_IPS`
+
+        Args:
+            remote_addr (str): The client's address
+            token (str, optional): The bearer token the client sent. Defaults to None.
+
+        Returns:
+            bool: whether or not the metrics may be served
+        """
+        if self.token and token and hmac.compare_digest(token.encode('utf-8'), self.token.encode('utf-8')):
+            return True
+        try:
+            address = ipaddress.ip_address(remote_addr or '')
+        except ValueError:
+            return False
+        return any(address in network for network in self.allowed_networks)
+
+    def _outlives_worker(self, key: str) -> bool:
+        metric = self.metrics.get(key.split('{', 1)[0])
+        return metric is None or metric.kind != 'gauge'
+
+    def _start_request(self):
+        g.metrics_start = time.perf_counter()
+        self.in_flight.inc()
+
+    def _record_request(self, response):
+        if 'metrics_start' in g:
+            # Unmatched paths share one label so scanners cannot blow up the series count
+            endpoint = request.endpoint or '<unmatched>'
+            blueprint = request.blueprint or ''
+            status = response.status_code
+            self.requests.inc(blueprint, endpoint, request.method, status)
+            self.latency.observe(time.perf_counter() - g.metrics_start, blueprint, endpoint, status)
+        return response
+
+    def _end_request(self, exception=None):
+        if 'metrics_start' in g:
+            self.in_flight.dec()
+
+    def render(self) -> str:
+        """Render every metric, summed across workers, in the Prometheus text format."""
+        self.values.merge_dead_workers(self._outlives_worker)
+        totals, live_totals = {}, {}
+        for pid, values in self.values.collect():
+            alive = pid is not None and (pid == os.getpid() or _pid_alive(pid))
+            for key, value in values.items():
+                totals[key] = totals.get(key, 0.0) + value
+                if alive:
+                    live_totals[key] = live_totals.get(key, 0.0) + value
+
+        families = {}
+        for key in totals:
+            name = key.split('{', 1)[0]
+            for suffix in ('_bucket', '_sum', '_count'):
+                if name.endswith(suffix) and name[:-len(suffix)] in self.metrics:
+                    name = name[:-len(suffix)]
+                    break
+            families.setdefault(name, []).append(key)
+
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            # Gauges from workers that have exited no longer count
+            source = live_totals if metric.kind == 'gauge' else totals
+            keys = families.get(name, [])
+            if metric.kind == 'histogram':
+                samples = self._histogram_samples(metric, keys, source)
+            else:
+                samples = [(key, source.get(key, 0.0)) for key in sorted(keys)]
+            lines.extend(f"{key} {_format_value(value)}" for key, value in samples)
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _histogram_samples(metric: Histogram, keys: list, source: dict) -> list:
+        """Order a histogram's series and render every bucket cumulatively, as Prometheus expects."""
+        name = metric.name
+        series = {}
+        for key in keys:
+            labels = key.split('{', 1)[1][:-1] if '{' in key else ''
+            if key.startswith(f"{name}_bucket"):
+                labels, _, bound = labels.rpartition('le="')
+                parts = series.setdefault(labels.rstrip(','), {})
+                parts[float(bound[:-1].replace('+Inf', 'inf'))] = source.get(key, 0.0)
+            else:
+                part = key[len(name) + 1:].split('{', 1)[0]
+                series.setdefault(labels, {})[part] = source.get(key, 0.0)
+
+        samples = []
+        for labels in sorted(series):
+            parts = series[labels]
+            prefix = f"{labels}," if labels else ''
+            running = 0.0
+            # Only buckets that were hit are stored, the rest are filled in here
+            for bound in metric.buckets:
+                running += parts.get(bound, 0.0)
+                samples.append((f'{name}_bucket{{{prefix}le="{_format_bound(bound)}"}}', running))
+            for part in ('sum', 'count'):
+                samples.append((_series_with(f"{name}_{part}", labels), parts.get(part, 0.0)))
+        return samples
+
+    def clear(self):
+        self.values.clear()
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
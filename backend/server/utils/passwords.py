@@ -0,0 +1,240 @@
+# Standard Imports
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+# Third Party Imports
+from loguru import logger
+from werkzeug.security import check_password_hash
+
+try:
+    import argon2
+except ImportError:  # pragma: no cover - argon2-cffi is optional
+    argon2 = None
+
+# Local Imports
+
+PASSWORD_HASH_ALGORITHMS = ('pbkdf2', 'scrypt', 'argon2')
+SALT_CHARS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+# Keeps scrypt hashes inside the 128 character `password_hash` column
+SCRYPT_KEY_LENGTH = 32
+
+
+class PasswordHashingBusy(Exception):
+    """Raised instead of queueing a hash when the hashing pool is saturated."""
+
+
+def _salt(length: int = 16) -> str:
+    return ''.join(secrets.choice(SALT_CHARS) for _ in range(length))
+
+
+def _argon2_hasher(params: dict):
+    return argon2.PasswordHasher(time_cost=params['time_cost'],
+                                 memory_cost=params['memory_cost'],
+                                 parallelism=params['parallelism'])
+
+
+def hash_password(password: str, algorithm: str, params: dict, salt: str) -> str:
+    """Hash a password, run in the hashing pool's worker processes
+
+    pbkdf2 hashes use Werkzeug's `pbkdf2:sha256:<iterations>$salt$hash` format, so they
+    are interchangeable with `generate_password_hash`.
+
+    Args:
+        password (str): The password to hash
+        algorithm (str): `pbkdf2`, `scrypt` or `argon2`
+        params (dict): The algorithm's cost parameters
+        salt (str): The salt, argon2 generates its own
+
+    Returns:
+        str: The encoded hash, including the algorithm and its parameters
+    """
+    secret = password.encode('utf-8')
+    if algorithm == 'pbkdf2':
+        iterations = params['iterations']
+        digest = hashlib.pbkdf2_hmac('sha256', secret, salt.encode('utf-8'), iterations)
+        return f"pbkdf2:sha256:{iterations}${salt}${digest.hex()}"
+    if algorithm == 'scrypt':
+        n, r, p = params['n'], params['r'], params['p']
+        digest = hashlib.scrypt(secret, salt=salt.encode('utf-8'), n=n, r=r, p=p,
+                                maxmem=132 * n * r * p, dklen=SCRYPT_KEY_LENGTH)
+        return f"scrypt:{n}:{r}:{p}${salt}${digest.hex()}"
+    if algorithm == 'argon2':
+        return _argon2_hasher(params).hash(password)
+    raise ValueError(f"Unknown password hash algorithm '{algorithm}'")
+
+
+def verify_password_hash(password_hash: str, password: str) -> bool:
+    """Check a password against a hash from `hash_password` or Werkzeug, in constant time
+
+    Args:
+        password_hash (str): The stored hash
+        password (str): The password to check
+
+    Returns:
+        bool: whether or not the password matches
+    """
+    if not password_hash:
+        return False
+    if password_hash.startswith('$argon2'):
+        if argon2 is None:
+            return False
+        try:
+            return argon2.PasswordHasher().verify(password_hash, password)
+        except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
+            return False
+    if password_hash.startswith('scrypt:'):
+        try:
+            method, salt, expected = password_hash.split('$', 2)
+            n, r, p = (int(value) for value in method.split(':')[1:])
+        except ValueError:
+            return False
+        digest = hashlib.scrypt(password.encode('utf-8'), salt=salt.encode('utf-8'), n=n, r=r, p=p,
+                                maxmem=132 * n * r * p, dklen=len(expected) // 2)
+        return hmac.compare_digest(digest.hex(), expected)
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords in a bounded process pool with admission control.
+
+    Hashing is deliberately slow, so running it on the request threads lets a burst of
+    logins starve every other endpoint. With `PASSWORD_HASH_WORKERS` set, hashes run in
+    that many worker processes instead and at most `PASSWORD_HASH_MAX_PENDING` may be
+    queued or running, beyond that `PasswordHashingBusy` is raised straight away so the
+    request can be answered with a 503. With no workers hashes run inline.
+
+    The pool is created lazily in each process, so a preloading fork does not share it.
+    """
+
+    def __init__(self):
+        self.algorithm = 'pbkdf2'
+        self.params = {'iterations': 150000}
+        self.workers = 0
+        self.max_pending = 0
+        self.timeout = 10.0
+        self._pool = None
+        self._pool_pid = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._dummy_hash = None
+
+    def init_app(self, app):
+        config = app.config
+        algorithm = config.get('PASSWORD_HASH_ALGORITHM', 'pbkdf2')
+        if algorithm not in PASSWORD_HASH_ALGORITHMS:
+            raise ValueError(f"Unknown password hash algorithm '{algorithm}', expected one of {PASSWORD_HASH_ALGORITHMS}")
+        if algorithm == 'argon2' and argon2 is None:
+            logger.warning("argon2-cffi is not installed, hashing passwords with scrypt instead")
+            algorithm = 'scrypt'
+        self.algorithm = algorithm
+        if algorithm == 'pbkdf2':
+            self.params = {'iterations': config.get('PASSWORD_PBKDF2_ITERATIONS', 150000)}
+        elif algorithm == 'scrypt':
+            self.params = {'n': config.get('PASSWORD_SCRYPT_N', 32768),
+                           'r': config.get('PASSWORD_SCRYPT_R', 8),
+                           'p': config.get('PASSWORD_SCRYPT_P', 1)}
+        else:
+            self.params = {'time_cost': config.get('PASSWORD_ARGON2_TIME_COST', 3),
+                           'memory_cost': config.get('PASSWORD_ARGON2_MEMORY_COST', 65536),
+                           'parallelism': config.get('PASSWORD_ARGON2_PARALLELISM', 4)}
+        workers = config.get('PASSWORD_HASH_WORKERS', 0)
+        if workers < 0:
+            # The host's CPUs shared between the web workers, each of which has its own pool
+            workers = max(1, (os.cpu_count() or 1) // max(1, config.get('WEB_CONCURRENCY', 1)))
+        self.workers = workers
+        self.max_pending = config.get('PASSWORD_HASH_MAX_PENDING') or self.workers * 4
+        self.timeout = config.get('PASSWORD_HASH_TIMEOUT_SECONDS', 10.0)
+        # Made here so logins for unknown users never hash on the request thread
+        self._dummy_hash = self.hash_inline(secrets.token_urlsafe(16))
+        self.shutdown()
+
+    @property
+    def method(self) -> str:
+        """The prefix hashes made with the current algorithm and parameters start with."""
+        if self.algorithm == 'pbkdf2':
+            return f"pbkdf2:sha256:{self.params['iterations']}"
+        if self.algorithm == 'scrypt':
+            return f"scrypt:{self.params['n']}:{self.params['r']}:{self.params['p']}"
+        return '$argon2'
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured algorithm
+
+        Raises:
+            PasswordHashingBusy: The pool is saturated
+        """
+        return self._run(hash_password, password, self.algorithm, self.params, _salt())
+
+    def hash_inline(self, password: str) -> str:
+        """Hash a password on the calling thread, for scripts and set-up rather than requests."""
+        return hash_password(password, self.algorithm, self.params, _salt())
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        """Check a password against its stored hash
+
+        Raises:
+            PasswordHashingBusy: The pool is saturated
+        """
+        return self._run(verify_password_hash, password_hash, password)
+
+    def dummy_hash(self) -> str:
+        """A hash of a random password with the configured parameters, for verifying against when
+        a user does not exist so that costs as much as a wrong password."""
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash(secrets.token_urlsafe(16))
+        return self._dummy_hash
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Whether a hash was made with another algorithm or other parameters than configured."""
+        if self.algorithm == 'argon2':
+            return not password_hash.startswith('$argon2') or \
+                _argon2_hasher(self.params).check_needs_rehash(password_hash)
+        return password_hash.split('$', 1)[0] != self.method
+
+    def pending(self) -> int:
+        return self._pending
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHashingBusy(f"{self._pending} password hashes are already pending")
+            self._pending += 1
+            try:
+                future = self._executor().submit(fn, *args)
+            except BrokenProcessPool:
+                self._pending -= 1
+                self._pool = None
+                raise PasswordHashingBusy("The password hashing pool is broken, restarting it")
+        # Released when the hash finishes, even if this request stops waiting for it
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise PasswordHashingBusy(f"Password hash took over {self.timeout} seconds")
+        except BrokenProcessPool:
+            with self._lock:
+                self._pool = None
+            raise PasswordHashingBusy("The password hashing pool is broken, restarting it")
+
+    def shutdown(self):
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.shutdown(wait=False)
+        self._pool = None
@@ -0,0 +1,148 @@
+# Standard Imports
+import threading
+import time
+
+# Third Party Imports
+from flask import current_app, g, has_request_context, request
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Local Imports
+
+_listening = False
+# Called with (endpoint, QueryStats) when a request finishes, used by the pytest query budget plugin
+_request_listeners = []
+_thread_stats = threading.local()
+
+
+class QueryStats:
+    """The queries run by one request, or one `count_queries` block.
+
+    Statements are grouped by their SQL text. The same statement run several times with
+    different parameters is the usual sign of an N+1: a query per row of an earlier result.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = {}
+
+    def record(self, statement: str, parameters, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        executions = self.statements.get(statement)
+        if executions is None:
+            executions = self.statements[statement] = [0, set(), 0.0]
+        executions[0] += 1
+        executions[2] += seconds
+        try:
+            executions[1].add(repr(parameters))
+        except Exception:
+            pass
+
+    def repeated(self, threshold: int) -> list:
+        """Return `(statement, executions)` for statements run at least `threshold` times
+        with differing parameters, most executed first."""
+        return sorted(((statement, executions) for statement, (executions, parameters, seconds)
+                       in self.statements.items()
+                       if executions >= threshold and len(parameters) > 1),
+                      key=lambda item: -item[1])
+
+    def slowest(self, limit: int) -> list:
+        """Return `(statement, executions, seconds)` for the `limit` statements that took longest in total."""
+        return sorted(((statement, executions, seconds) for statement, (executions, parameters, seconds)
+                       in self.statements.items()),
+                      key=lambda item: -item[2])[:limit]
+
+
+class count_queries:
+    """Count the queries run on this thread inside the block, in or out of a request.
+
+    Example:
+        with count_queries() as stats:
+            get_users()
+        assert stats.count == 1
+    """
+
+    def __enter__(self) -> QueryStats:
+        self.stats = QueryStats()
+        self._previous = getattr(_thread_stats, 'stats', None)
+        _thread_stats.stats = self.stats
+        return self.stats
+
+    def __exit__(self, *exc_info):
+        _thread_stats.stats = self._previous
+
+
+def _current_stats() -> list:
+    stats = []
+    block = getattr(_thread_stats, 'stats', None)
+    if block is not None:
+        stats.append(block)
+    if has_request_context():
+        request_stats = g.get('query_stats')
+        if request_stats is None:
+            request_stats = g.query_stats = QueryStats()
+        stats.append(request_stats)
+    return stats
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_counter_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get('query_counter_start')
+    seconds = time.perf_counter() - start_times.pop() if start_times else 0.0
+    for stats in _current_stats():
+        stats.record(statement, parameters, seconds)
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    start_times = connection.info.get('query_counter_start') if connection is not None else None
+    if start_times:
+        start_times.pop()
+
+
+def _report_request(response):
+    stats = g.get('query_stats')
+    if stats is None:
+        return response
+    endpoint = request.endpoint or '<unmatched>'
+    config = current_app.config
+
+    threshold = config.get('QUERY_N_PLUS_ONE_THRESHOLD', 5)
+    for statement, executions in stats.repeated(threshold) if threshold else ():
+        logger.warning("Probable N+1 query on {}: {} executions of {}", endpoint, executions,
+                       ' '.join(statement.split()))
+    budget = config.get('QUERY_BUDGET_WARNING', 0)
+    if budget and stats.count > budget:
+        logger.warning("{} ran {} queries, over the budget of {}", endpoint, stats.count, budget)
+
+    for listener in _request_listeners:
+        listener(endpoint, stats)
+    return response
+
+
+def init_query_counter(app):
+    """Count the queries of every request and log probable N+1 patterns when it finishes
+
+    Database time in the Server-Timing header comes from these counts too.
+    """
+    global _listening
+    if not _listening:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+        _listening = True
+    app.after_request(_report_request)
+
+
+def add_request_listener(listener):
+    _request_listeners.append(listener)
+
+
+def remove_request_listener(listener):
+    _request_listeners.remove(listener)
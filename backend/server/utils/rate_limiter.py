@@ -0,0 +1,431 @@
+# Standard Imports
+import hashlib
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# Third Party Imports
+from flask import g
+from loguru import logger
+
+# Local Imports
+from server.config import root_project_dir
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no fcntl
+    fcntl = None
+
+RateLimitResult = namedtuple(
+    'RateLimitResult',
+    ['allowed', 'limit', 'remaining', 'reset_after', 'retry_after'])
+
+
+####################################################################################
+#
+#         Algorithms
+#
+####################################################################################
+
+
+class TokenBucket:
+    """Token bucket that holds `capacity` tokens and refills them evenly over `window` seconds.
+
+    State is stored as `(tokens, last_refill, 0.0)` so every algorithm shares the same
+    three float slot layout in the storage backends.
+    """
+
+    name = 'token_bucket'
+
+    def __init__(self, capacity: int, window: float):
+        self.limit = int(capacity)
+        self.window = float(window)
+        self.ttl = self.window
+        self._rate = self.limit / self.window
+
+    def hit(self, state: tuple, now: float) -> tuple[tuple, RateLimitResult]:
+        """Consume a token if one is available.
+
+        Args:
+            state (tuple): The stored state for the key, or None if there is none
+            now (float): The current unix time in seconds
+
+        Returns:
+            tuple: the new state to store
+            RateLimitResult: the outcome of the check
+        """
+        if state is None:
+            tokens, last = float(self.limit), now
+        else:
+            tokens, last = state[0], state[1]
+            tokens = min(float(self.limit), tokens + (now - last) * self._rate)
+
+        if tokens >= 1.0:
+            tokens -= 1.0
+            allowed, retry_after = True, 0.0
+        else:
+            allowed, retry_after = False, (1.0 - tokens) / self._rate
+
+        reset_after = (self.limit - tokens) / self._rate
+        result = RateLimitResult(allowed, self.limit, int(tokens), reset_after,
+                                 retry_after)
+        return (tokens, now, 0.0), result
+
+
+class SlidingWindow:
+    """Sliding window counter that approximates a true sliding log in constant space.
+
+    The previous fixed window's count is weighted by how much of it still overlaps the
+    sliding window. State is stored as `(window_start, current_count, previous_count)`.
+    """
+
+    name = 'sliding_window'
+
+    def __init__(self, limit: int, window: float):
+        self.limit = int(limit)
+        self.window = float(window)
+        self.ttl = self.window * 2
+
+    def hit(self, state: tuple, now: float) -> tuple[tuple, RateLimitResult]:
+        """Count a request against the window if it is within the limit.
+
+        Args:
+            state (tuple): The stored state for the key, or None if there is none
+            now (float): The current unix time in seconds
+
+        Returns:
+            tuple: the new state to store
+            RateLimitResult: the outcome of the check
+        """
+        window = self.window
+        start = now - (now % window)
+        current, previous = 0.0, 0.0
+        if state is not None:
+            stored_start = state[0]
+            if stored_start == start:
+                current, previous = state[1], state[2]
+            elif start - stored_start == window:
+                previous = state[1]
+
+        elapsed = now - start
+        weight = (window - elapsed) / window
+        estimated = previous * weight + current
+        reset_after = window - elapsed
+
+        if estimated + 1 <= self.limit:
+            current += 1
+            allowed, retry_after = True, 0.0
+            estimated += 1
+        else:
+            allowed = False
+            if previous > 0 and current + 1 <= self.limit:
+                # Time until enough of the previous window has slid out
+                needed = window * (1 - (self.limit - current - 1) / previous)
+                retry_after = max(0.0, needed - elapsed)
+            else:
+                retry_after = reset_after
+
+        remaining = max(0, int(self.limit - estimated))
+        result = RateLimitResult(allowed, self.limit, remaining, reset_after,
+                                 retry_after)
+        return (start, current, previous), result
+
+
+ALGORITHMS = {
+    TokenBucket.name: TokenBucket,
+    SlidingWindow.name: SlidingWindow,
+}
+
+
+####################################################################################
+#
+#         Storage Backends
+#
+####################################################################################
+
+
+class MemoryStorage:
+    """Bounded, thread-safe, in-process storage. Only visible to the current worker."""
+
+    name = 'memory'
+
+    def __init__(self, max_keys: int = 65536):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def apply(self, key: str, algorithm, now: float) -> RateLimitResult:
+        with self._lock:
+            entry = self._entries.get(key)
+            state = entry[1] if entry is not None and entry[0] > now else None
+            new_state, result = algorithm.hit(state, now)
+            self._entries[key] = (now + algorithm.ttl, new_state)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SharedMemoryStorage:
+    """Fixed size hash table in a memory mapped file shared by every worker process.
+
+    Each slot is `(key_hash, expires, state_0, state_1, state_2)`. Keys are placed by a
+    stable hash with a short linear probe, so a check touches a bounded number of slots.
+    When the probe is full, the slot closest to expiry is evicted.
+    """
+
+    name = 'shared_memory'
+    _slot = struct.Struct('<Qdddd')
+    _probe = 8
+
+    def __init__(self, path: str, slots: int = 65536):
+        if fcntl is None:
+            raise RuntimeError('Shared memory rate limiting requires fcntl')
+        self.path = path
+        self.slots = slots
+        self._size = self._slot.size * slots
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+
+    def _open(self):
+        # Memory maps and file locks must be re-opened after a fork
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size != self._size:
+                os.ftruncate(fd, self._size)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._fd = fd
+        self._map = mmap.mmap(fd, self._size)
+        self._pid = os.getpid()
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        # Zero marks an empty slot, so never hand it out as a key hash
+        return int.from_bytes(digest, 'little') or 1
+
+    def apply(self, key: str, algorithm, now: float) -> RateLimitResult:
+        key_hash = self._hash(key)
+        slot = self._slot
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            buf = self._map
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                target, state, oldest = None, None, None
+                for probe in range(self._probe):
+                    offset = ((key_hash + probe) % self.slots) * slot.size
+                    stored_hash, expires, s0, s1, s2 = slot.unpack_from(buf, offset)
+                    if stored_hash == key_hash:
+                        target = offset
+                        state = (s0, s1, s2) if expires > now else None
+                        break
+                    if target is None and (stored_hash == 0 or expires <= now):
+                        target = offset
+                    if oldest is None or expires < oldest[0]:
+                        oldest = (expires, offset)
+                if target is None:
+                    target = oldest[1]
+
+                new_state, result = algorithm.hit(state, now)
+                slot.pack_into(buf, target, key_hash, now + algorithm.ttl,
+                               *new_state)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return result
+
+    def reset(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                self._map[:] = bytes(self._size)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class SQLiteStorage:
+    """SQLite backed storage, a local stand-in for a shared store such as Redis."""
+
+    name = 'sqlite'
+    _purge_every = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._operations = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path,
+                                         timeout=5,
+                                         isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limits ('
+                'key TEXT PRIMARY KEY, expires REAL, s0 REAL, s1 REAL, s2 REAL)')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS ix_rate_limits_expires '
+                'ON rate_limits (expires)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def apply(self, key: str, algorithm, now: float) -> RateLimitResult:
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT expires, s0, s1, s2 FROM rate_limits WHERE key = ?',
+                (key, )).fetchone()
+            state = row[1:] if row is not None and row[0] > now else None
+            new_state, result = algorithm.hit(state, now)
+            connection.execute(
+                'INSERT OR REPLACE INTO rate_limits VALUES (?, ?, ?, ?, ?)',
+                (key, now + algorithm.ttl, *new_state))
+            self._operations += 1
+            if self._operations % self._purge_every == 0:
+                connection.execute('DELETE FROM rate_limits WHERE expires <= ?',
+                                   (now, ))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return result
+
+    def reset(self):
+        self._connection().execute('DELETE FROM rate_limits')
+
+
+def create_storage(name: str, path: str = None, max_keys: int = 65536):
+    """Build a rate limit storage backend by name.
+
+    Args:
+        name (str): One of `memory`, `shared_memory` or `sqlite`
+        path (str, optional): File path for the shared memory and sqlite backends
+        max_keys (int, optional): Maximum number of keys held by the memory based backends
+
+    Returns:
+        The storage backend instance
+    """
+    data_dir = os.path.join(root_project_dir, 'data', 'server')
+    if name == SharedMemoryStorage.name:
+        if fcntl is None:
+            logger.warning(
+                'Shared memory rate limiting is unavailable on this platform, using memory'
+            )
+            return MemoryStorage(max_keys=max_keys)
+        return SharedMemoryStorage(path or os.path.join(data_dir,
+                                                        'rate_limit.shm'),
+                                   slots=max_keys)
+    if name == SQLiteStorage.name:
+        return SQLiteStorage(path or os.path.join(data_dir, 'rate_limit.sqlite'))
+    if name != MemoryStorage.name:
+        logger.warning(
+            f"Unknown rate limit storage '{name}', falling back to memory")
+    return MemoryStorage(max_keys=max_keys)
+
+
+####################################################################################
+#
+#         Rate Limiter
+#
+####################################################################################
+
+
+class RateLimiter:
+    """Rate limiting engine used by the `rate_limit` decorator.
+
+    Configured from the app config in `init_app`, like the other extensions.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.strategy = SlidingWindow.name
+        self.storage = MemoryStorage()
+        self._algorithms = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+        self.strategy = app.config.get('RATE_LIMIT_STRATEGY', SlidingWindow.name)
+        if self.strategy not in ALGORITHMS:
+            logger.warning(
+                f"Unknown rate limit strategy '{self.strategy}', using {SlidingWindow.name}"
+            )
+            self.strategy = SlidingWindow.name
+        self.storage = create_storage(app.config.get('RATE_LIMIT_STORAGE',
+                                                     MemoryStorage.name),
+                                      path=app.config.get('RATE_LIMIT_STORAGE_PATH'),
+                                      max_keys=app.config.get(
+                                          'RATE_LIMIT_MAX_KEYS', 65536))
+        self._algorithms = {}
+        app.after_request(self.inject_headers)
+        logger.info(
+            f"Rate limiter using {self.strategy} with {self.storage.name} storage")
+
+    def algorithm(self, max_requests: int, time_window: float, strategy: str = None):
+        """Return the shared algorithm instance for a limit, creating it once."""
+        spec = (strategy or self.strategy, max_requests, time_window)
+        algorithm = self._algorithms.get(spec)
+        if algorithm is None:
+            algorithm = ALGORITHMS[spec[0]](max_requests, time_window)
+            self._algorithms[spec] = algorithm
+        return algorithm
+
+    def hit(self,
+            key: str,
+            max_requests: int,
+            time_window: float,
+            strategy: str = None) -> RateLimitResult:
+        """Record a request for `key` and return whether it is allowed.
+
+        Args:
+            key (str): The identity being limited, e.g. endpoint and client address
+            max_requests (int): The maximum amount of requests allowed in the window
+            time_window (float): The window in seconds
+            strategy (str, optional): Override the configured algorithm. Defaults to None.
+
+        Returns:
+            RateLimitResult: the outcome of the check
+        """
+        algorithm = self.algorithm(max_requests, time_window, strategy)
+        return self.storage.apply(key, algorithm, time.time())
+
+    @staticmethod
+    def inject_headers(response):
+        """Add `X-RateLimit-*` headers, and `Retry-After` when limited, to the response."""
+        result = g.get('rate_limit_result')
+        if result is None:
+            return response
+        headers = response.headers
+        headers['X-RateLimit-Limit'] = str(result.limit)
+        headers['X-RateLimit-Remaining'] = str(result.remaining)
+        headers['X-RateLimit-Reset'] = str(int(result.reset_after + 0.999))
+        if not result.allowed:
+            headers['Retry-After'] = str(int(result.retry_after + 0.999) or 1)
+        return response
@@ -0,0 +1,107 @@
+from datetime import datetime
+from operator import attrgetter
+from threading import Lock
+
+from server.utils.global_helper_functions import datetime_to_isoformat_zulu
+from server.utils.timing import phase
+
+# One compiled serializer per (model, include_sensitive, extra fields)
+_serializers = {}
+_serializers_lock = Lock()
+
+
+class ModelSerializer:
+    """Precompiled extraction of a fixed set of model fields into a dict.
+
+    The field names, the getter and which fields hold datetimes are worked out once from
+    the model's table, so serializing a row is a single attribute fetch per field. Rows can
+    be model instances or query `Row` tuples selecting the same (or labelled) columns.
+    """
+
+    def __init__(self, model, include_sensitive: bool = False, extra: tuple = ()):
+        sensitive = () if include_sensitive else getattr(model, 'SENSITIVE_COLUMNS', ())
+        columns = [column for column in model.__table__.columns if column.name not in sensitive]
+
+        self.fields = tuple(column.name for column in columns) + tuple(extra)
+        self._datetime_fields = tuple(
+            column.name for column in columns if _is_datetime(column.type))
+        self._getter = attrgetter(*self.fields)
+        self._single = len(self.fields) == 1
+
+    def __call__(self, row) -> dict:
+        """Serialize one row.
+
+        Args:
+            row: A model instance or a query row exposing the serializer's fields
+
+        Returns:
+            dict: The row's fields, with datetimes as ISO 8601 UTC strings
+        """
+        values = self._getter(row)
+        model_dict = dict(zip(self.fields, (values,) if self._single else values))
+        for name in self._datetime_fields:
+            value = model_dict[name]
+            if value is not None:
+                model_dict[name] = datetime_to_isoformat_zulu(value)
+        return model_dict
+
+    def many(self, rows) -> list:
+        """Serialize a list of rows.
+
+        Args:
+            rows (iterable): Model instances or query rows
+
+        Returns:
+            list: A dict per row
+        """
+        with phase("serialize"):
+            return [self(row) for row in rows]
+
+
+def _is_datetime(column_type) -> bool:
+    try:
+        return issubclass(column_type.python_type, datetime)
+    except NotImplementedError:
+        return False
+
+
+def get_serializer(model, include_sensitive: bool = False, extra: tuple = ()) -> ModelSerializer:
+    """Return the compiled serializer for a model, compiling it on first use.
+
+    Args:
+        model: The SQLAlchemy model class
+        include_sensitive (bool, optional): Include the model's `SENSITIVE_COLUMNS`. Defaults to False.
+        extra (tuple, optional): Extra attribute names to serialize, such as labelled
+            columns from a join. Defaults to ().
+
+    Returns:
+        ModelSerializer: the serializer
+    """
+    key = (model, include_sensitive, tuple(extra))
+    serializer = _serializers.get(key)
+    if serializer is None:
+        with _serializers_lock:
+            serializer = _serializers.get(key)
+            if serializer is None:
+                serializer = _serializers[key] = ModelSerializer(model, include_sensitive, extra)
+    return serializer
+
+
+def serialize(row, include_sensitive: bool = False) -> dict:
+    """Serialize a single model instance with its model's compiled serializer."""
+    return get_serializer(type(row), include_sensitive)(row)
+
+
+def serialize_many(model, rows, include_sensitive: bool = False, extra: tuple = ()) -> list:
+    """Serialize a list of model instances or query rows of one model.
+
+    Args:
+        model: The SQLAlchemy model class the rows come from
+        rows (iterable): Model instances or query `Row` tuples
+        include_sensitive (bool, optional): Include the model's `SENSITIVE_COLUMNS`. Defaults to False.
+        extra (tuple, optional): Extra attribute names to serialize. Defaults to ().
+
+    Returns:
+        list: A dict per row
+    """
+    return get_serializer(model, include_sensitive, extra).many(rows)
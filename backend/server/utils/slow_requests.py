@@ -0,0 +1,193 @@
+# Standard Imports
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+
+# Third Party Imports
+from flask import current_app, g, request
+from loguru import logger
+
+# Local Imports
+from server.config import root_project_dir
+from server.utils.log_sink import RotatingFileWriter
+from server.utils.timing import request_timings
+
+# Parameters whose names contain any of these are never written to the journal
+REDACTED_PARAMETERS = ('password', 'token', 'secret', 'key', 'authorization', 'card', 'cvc')
+REDACTED = '[redacted]'
+MAX_PARAMETER_LENGTH = 200
+
+
+def redact_parameters(parameters) -> dict:
+    """Copy request parameters for the journal, hiding secrets and truncating long values
+
+    Args:
+        parameters: A mapping of parameter names to values, e.g. `request.args`
+
+    Returns:
+        dict: The parameters with sensitive values replaced by `[redacted]`
+    """
+    redacted = {}
+    for name, value in parameters.items():
+        if any(word in str(name).lower() for word in REDACTED_PARAMETERS):
+            redacted[name] = REDACTED
+        else:
+            redacted[name] = _redact_value(value)
+    return redacted
+
+
+def _redact_value(value):
+    # Objects nested in lists are redacted too, e.g. `{"creds": [{"password": ...}]}`
+    if isinstance(value, dict):
+        return redact_parameters(value)
+    if isinstance(value, (list, tuple)):
+        return [_redact_value(item) for item in value]
+    value = value if isinstance(value, (int, float, bool, type(None))) else str(value)
+    if isinstance(value, str) and len(value) > MAX_PARAMETER_LENGTH:
+        value = value[:MAX_PARAMETER_LENGTH] + '... [Truncated]'
+    return value
+
+
+class SlowRequestJournal:
+    """Bounded on-disk journal of slow requests, one JSON object per line.
+
+    The journal is rotated at `max_bytes` keeping `backup_count` older files, so it never
+    grows past roughly `max_bytes * (backup_count + 1)`. Writes from the request threads of
+    one worker are serialized, and each entry is one append so workers sharing the file do
+    not interleave lines.
+
+    Args:
+        path (str): The journal file
+        max_bytes (int): The size at which the journal is rotated
+        backup_count (int, optional): How many rotated journals are kept. Defaults to 5.
+    """
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int = 5):
+        self.path = path
+        self.writer = RotatingFileWriter(path, max_bytes, backup_count=backup_count, compress=False)
+        self._lock = threading.Lock()
+
+    def record(self, entry: dict):
+        line = json.dumps(entry, default=str, ensure_ascii=False) + '\n'
+        with self._lock:
+            self.writer.write(line)
+            self.writer.flush()
+
+
+def read_journal(path: str, limit: int = 20, endpoint: str = None, min_ms: float = 0) -> list:
+    """Read the newest entries of a slow request journal, including its rotated files
+
+    Args:
+        path (str): The journal file
+        limit (int, optional): The most entries returned. Defaults to 20.
+        endpoint (str, optional): Only return entries for this endpoint. Defaults to None.
+        min_ms (float, optional): Only return entries at least this slow. Defaults to 0.
+
+    Returns:
+        list: The matching entries, newest first
+    """
+    files = sorted(glob.glob(glob.escape(path) + '.*'), key=os.path.getmtime)
+    if os.path.exists(path):
+        files.append(path)
+
+    entries = []
+    for file_path in reversed(files):
+        opener = gzip.open if file_path.endswith('.gz') else open
+        with opener(file_path, 'rt', encoding='utf-8') as file:
+            lines = file.readlines()
+        for line in reversed(lines):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if endpoint and entry.get('endpoint') != endpoint:
+                continue
+            if entry.get('duration_ms', 0) < min_ms:
+                continue
+            entries.append(entry)
+            if len(entries) >= limit:
+                return entries
+    return entries
+
+
+def journal_path(app) -> str:
+    return app.config.get('SLOW_REQUEST_JOURNAL_PATH') or \
+        os.path.join(root_project_dir, 'data', 'server', 'slow_requests', 'journal.jsonl')
+
+
+def get_slow_request_journal(app) -> SlowRequestJournal:
+    journal = app.extensions.get('slow_request_journal')
+    if journal is None:
+        journal = app.extensions['slow_request_journal'] = SlowRequestJournal(
+            journal_path(app),
+            app.config.get('SLOW_REQUEST_JOURNAL_MAX_BYTES', 5 * 1024 * 1024),
+            app.config.get('SLOW_REQUEST_JOURNAL_FILES', 5))
+    return journal
+
+
+def _request_parameters() -> dict:
+    parameters = {}
+    if request.view_args:
+        parameters['path'] = redact_parameters(request.view_args)
+    if request.args:
+        parameters['query'] = redact_parameters(request.args)
+    body = request.get_json(silent=True) if request.is_json else None
+    if isinstance(body, (dict, list)):
+        parameters['body'] = _redact_value(body)
+    return parameters
+
+
+def _capture_slow_request(response):
+    threshold = current_app.config.get('SLOW_REQUEST_MS', 0)
+    if not threshold or 'start_time' not in g:
+        return response
+    duration_ms = round((time.time() - g.start_time) * 1000, 2)
+    if duration_ms < threshold:
+        return response
+
+    config = current_app.config
+    query_stats = g.get('query_stats')
+    statements = query_stats.slowest(config.get('SLOW_REQUEST_MAX_STATEMENTS', 20)) if query_stats else []
+    entry = {
+        "time": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "request_id": g.get('request_id'),
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "duration_ms": duration_ms,
+        "parameters": _request_parameters(),
+        "timings": {name: duration for name, (duration, count) in request_timings().items()},
+        "queries": {
+            "count": query_stats.count if query_stats else 0,
+            "statements": [{
+                "statement": ' '.join(statement.split()),
+                "executions": executions,
+                "duration_ms": round(seconds * 1000, 2),
+            } for statement, executions, seconds in statements],
+        },
+        "stripe_calls": [{"call": call, "duration_ms": duration}
+                         for call, duration in (g.get('calls') or {}).get('stripe', [])],
+        "pid": os.getpid(),
+    }
+    try:
+        get_slow_request_journal(current_app).record(entry)
+    except OSError as e:
+        logger.error("Failed to write the slow request journal: {}", e)
+    logger.warning("Slow request {} {} took {}ms, recorded in the slow request journal",
+                   request.method, request.path, duration_ms)
+    return response
+
+
+def init_slow_requests(app):
+    """Record requests slower than `SLOW_REQUEST_MS` in the slow request journal
+
+    Call before `init_timing` so the view and database timings are complete when a request
+    is captured.
+    """
+    if not app.config.get('SLOW_REQUEST_MS'):
+        return
+    app.after_request(_capture_slow_request)
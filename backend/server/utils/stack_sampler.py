@@ -0,0 +1,181 @@
+# Standard Imports
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+# Third Party Imports
+from loguru import logger
+
+# Local Imports
+
+
+def folded_stack(frame, limit: int = 128) -> str:
+    """Render a frame's call stack in the collapsed format used by flamegraph tools
+
+    Args:
+        frame: The innermost frame
+        limit (int, optional): The most frames kept, innermost first. Defaults to 128.
+
+    Returns:
+        str: `outer;...;inner`, each frame as `module:function:line`
+    """
+    frames = []
+    while frame is not None and len(frames) < limit:
+        code = frame.f_code
+        frames.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    frames.reverse()
+    return ';'.join(frames)
+
+
+class StackSampler:
+    """Samples thread stacks from a background thread and counts them as folded stacks.
+
+    Only the sampled threads' frames are read, at `interval` seconds apart, so the cost is
+    proportional to the sampling rate rather than to the work being profiled.
+
+    Args:
+        interval (float): Seconds between samples
+        thread_id (int, optional): Sample only this thread. Defaults to every other thread.
+    """
+
+    def __init__(self, interval: float, thread_id: int = None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.samples = Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        """Stop sampling and return the folded stacks with how often each was seen."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.samples
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            self.sample(own_id)
+
+    def sample(self, own_id: int = None):
+        frames = sys._current_frames()
+        if self.thread_id is not None:
+            frame = frames.get(self.thread_id)
+            if frame is not None:
+                self.samples[folded_stack(frame)] += 1
+            return
+        for thread_id, frame in frames.items():
+            if thread_id != own_id and self.is_active(thread_id):
+                self.samples[folded_stack(frame)] += 1
+
+    def is_active(self, thread_id: int) -> bool:
+        """Whether a thread's stack is counted in this sample, every thread by default."""
+        return True
+
+
+def write_folded(samples: Counter, path: str):
+    """Write folded stack counts as `stack count` lines, heaviest first."""
+    with open(path, 'w', encoding='utf-8') as file:
+        for stack, count in samples.most_common():
+            file.write(f"{stack} {count}\n")
+
+
+def _thread_cpu_ticks(native_id: int) -> int:
+    """Return the user and system CPU ticks a thread of this process has used, from `/proc`."""
+    with open(f"/proc/self/task/{native_id}/stat", 'rb') as file:
+        # Fields after the parenthesised command name, starting at the state
+        fields = file.read().rsplit(b')', 1)[1].split()
+    return int(fields[11]) + int(fields[12])
+
+
+class ContinuousProfiler(StackSampler):
+    """Always-on sampling profiler aggregating each worker's folded stacks over rolling windows.
+
+    Threads are only counted when they used CPU since the previous sample, so threads blocked
+    on a socket, a lock or the database do not bury the code that is actually burning CPU. On
+    platforms without `/proc` every thread is counted, giving a wall-clock profile instead.
+    The sampler is started lazily in each worker, so it survives a preloading fork.
+    """
+
+    def __init__(self):
+        super().__init__(interval=1 / 19)
+        self.enabled = False
+        self.window_seconds = 60.0
+        self.windows = deque(maxlen=10)
+        self.cpu_only = os.path.isdir('/proc/self/task')
+        self._cpu_ticks = {}
+        self._native_ids = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROFILER_ENABLED', False)
+        if not self.enabled:
+            return
+        self.interval = 1 / app.config.get('PROFILER_HZ', 19)
+        self.window_seconds = app.config.get('PROFILER_WINDOW_SECONDS', 60)
+        self.windows = deque(maxlen=app.config.get('PROFILER_WINDOWS', 10))
+        app.before_request(self._ensure_running)
+
+    def _ensure_running(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A forked worker inherits the parent's windows, but not the sampling thread
+            self.windows.clear()
+            self._cpu_ticks.clear()
+            self.start()
+            self._pid = os.getpid()
+        logger.info("Continuous profiler sampling at {} Hz", round(1 / self.interval, 1))
+
+    def sample(self, own_id: int = None):
+        now = time.time()
+        self._native_ids = {thread.ident: thread.native_id for thread in threading.enumerate()}
+        with self._lock:
+            if not self.windows or now - self.windows[-1][0] >= self.window_seconds:
+                self.windows.append((now, Counter()))
+            self.samples = self.windows[-1][1]
+            super().sample(own_id)
+        for thread_id in self._cpu_ticks.keys() - self._native_ids.keys():
+            del self._cpu_ticks[thread_id]
+
+    def is_active(self, thread_id: int) -> bool:
+        if not self.cpu_only:
+            return True
+        native_id = self._native_ids.get(thread_id)
+        if native_id is None:
+            return False
+        try:
+            ticks = _thread_cpu_ticks(native_id)
+        except (OSError, IndexError, ValueError):
+            return False
+        previous = self._cpu_ticks.get(thread_id)
+        self._cpu_ticks[thread_id] = ticks
+        return previous is not None and ticks > previous
+
+    def folded(self, seconds: float = None) -> Counter:
+        """Return the stacks sampled in this worker over the last `seconds`, or every window
+
+        Args:
+            seconds (float, optional): How far back to look, rounded out to whole windows. Defaults to None.
+
+        Returns:
+            Counter: Folded stacks mapped to how many samples saw them
+        """
+        since = time.time() - seconds - self.window_seconds if seconds else 0
+        total = Counter()
+        with self._lock:
+            for start, samples in self.windows:
+                if start >= since:
+                    total.update(samples)
+        return total
@@ -0,0 +1,88 @@
+# Standard Imports
+import zlib
+
+# Third Party Imports
+from flask import Response, request, stream_with_context
+from loguru import logger
+
+# Local Imports
+from server.utils.fast_json import dumps_bytes
+from server.utils.http_status_codes import envelope_prefix
+
+# Rows are buffered into chunks of roughly this size before being written out
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def wants_stream(request_args) -> bool:
+    """Return whether the `stream` query parameter asks for a streamed response."""
+    return request_args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def _encode_envelope(code: int, key: str, rows, trailer, encode):
+    # Open the envelope and the collection, leaving both unterminated
+    yield envelope_prefix(code) + b',"data":{' + encode(key) + b':['
+
+    buffer, size, first = [], 0, True
+    for row in rows:
+        item = encode(row)
+        buffer.append(item if first else b',' + item)
+        size += len(item) + 1
+        first = False
+        if size >= STREAM_CHUNK_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+    tail = b']'
+    for name, value in (trailer or {}).items():
+        tail += b',' + encode(name) + b':' + encode(value)
+    yield tail + b'}}'
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_status_code(code: int, key: str, rows, trailer: dict = None) -> Response:
+    """Return a streamed response with the standard status code envelope
+
+    The body is `{"status_code", "message", "status", "data": {key: [rows...], **trailer}}`,
+    the same as `handle_status_code`, but rows are encoded and written as they are
+    produced so memory stays flat however many rows there are. The response is gzipped
+    here when the client accepts it, because buffering compression would defeat streaming.
+
+    Args:
+        code (int): The HTTP status code
+        key (str): The name of the collection inside `data`
+        rows (iterable): The rows of the collection, consumed lazily
+        trailer (dict, optional): Extra `data` fields written after the rows. Defaults to None.
+
+    Returns:
+        Response: a streamed response object
+    """
+    def generate():
+        try:
+            for chunk in _encode_envelope(code, key, rows, trailer, dumps_bytes):
+                yield chunk
+        except Exception as e:
+            # The status line is already sent, so the only way to signal failure is to cut the stream
+            logger.error(f"Error streaming {key} response: {e}")
+            raise
+
+    body = generate()
+    headers = {}
+    if 'gzip' in request.headers.get('Accept-Encoding', '').lower():
+        body = _gzip(body)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+
+    return Response(stream_with_context(body),
+                    status=code,
+                    headers=headers,
+                    mimetype='application/json')
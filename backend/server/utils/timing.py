@@ -0,0 +1,179 @@
+# Standard Imports
+import threading
+import time
+from contextlib import contextmanager
+
+# Third Party Imports
+from flask import g, has_request_context
+
+# Local Imports
+
+# Phases in the order they are reported in the Server-Timing header
+PHASE_DESCRIPTIONS = {
+    "auth": "Authentication",
+    "db": "Database",
+    "stripe": "Stripe",
+    "serialize": "Serialization",
+    "app": "View",
+    "middleware": "Middleware",
+    "total": "Total",
+}
+
+
+# Set while `record_phases` runs a function on a thread without the request context
+_recording = threading.local()
+
+
+def _phase_store(key: str) -> dict:
+    recorded = getattr(_recording, 'phases', None)
+    if recorded is not None:
+        return recorded[key]
+    if not has_request_context():
+        return None
+    store = g.get(key)
+    if store is None:
+        store = {}
+        setattr(g, key, store)
+    return store
+
+
+def add_timing(name: str, seconds: float, count: int = 1):
+    """Add time spent in a phase of the current request, outside a request it is ignored
+
+    Args:
+        name (str): The phase, e.g. `db`
+        seconds (float): The time spent
+        count (int, optional): How many operations the time covers. Defaults to 1.
+    """
+    timings = _phase_store('timings')
+    if timings is None:
+        return
+    total, operations = timings.get(name, (0.0, 0))
+    timings[name] = (total + seconds, operations + count)
+
+
+# The most calls kept per phase of a request, for the slow request journal
+MAX_CALLS_PER_PHASE = 50
+
+
+def add_call(name: str, detail: str, seconds: float):
+    """Keep one call made in a phase of the current request, e.g. which Stripe API was called"""
+    calls = _phase_store('calls')
+    if calls is None:
+        return
+    phase_calls = calls.setdefault(name, [])
+    if len(phase_calls) < MAX_CALLS_PER_PHASE:
+        phase_calls.append((detail, round(seconds * 1000, 2)))
+
+
+def record_phases(fn, *args, **kwargs) -> tuple:
+    """Run `fn` on a pool thread, which has no request context, keeping the phases it times
+
+    Returns:
+        tuple: the result of `fn` and its recorded phases, for `merge_phases` on the request's thread
+    """
+    recorded = _recording.phases = {'timings': {}, 'calls': {}}
+    try:
+        return fn(*args, **kwargs), recorded
+    finally:
+        _recording.phases = None
+
+
+def merge_phases(recorded: list, seconds: float):
+    """Add phases recorded by `record_phases` on concurrent threads to the current request
+
+    The threads ran side by side, so each phase counts at most the `seconds` the batch
+    took rather than the sum of its overlapping calls.
+
+    Args:
+        recorded (list): The recorded phases of each thread
+        seconds (float): How long the batch took on the request's thread
+    """
+    totals = {}
+    for phases in recorded:
+        for name, (duration, count) in phases['timings'].items():
+            total, operations = totals.get(name, (0.0, 0))
+            totals[name] = (total + duration, operations + count)
+        for name, phase_calls in phases['calls'].items():
+            for detail, duration_ms in phase_calls:
+                add_call(name, detail, duration_ms / 1000)
+    for name, (duration, count) in totals.items():
+        add_timing(name, min(duration, seconds), count=count)
+
+
+@contextmanager
+def phase(name: str, detail: str = None):
+    """Time the enclosed block as part of a phase of the current request
+
+    Args:
+        name (str): The phase, e.g. `stripe`
+        detail (str, optional): Keep the block as a call of the phase under this name. Defaults to None.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        add_timing(name, seconds)
+        if detail is not None:
+            add_call(name, detail, seconds)
+
+
+def _start_view():
+    g.view_start = time.perf_counter()
+
+
+def _end_view(response):
+    if 'view_start' in g:
+        add_timing("app", time.perf_counter() - g.view_start, count=0)
+    return response
+
+
+def init_timing(app):
+    """Collect per-phase request timings, call once the other hooks are registered
+
+    The view phase starts after every other `before_request` hook and ends before every other
+    `after_request` hook, so the time outside it is middleware. Database time comes from the
+    request's query counter.
+    """
+    app.before_request(_start_view)
+    app.after_request(_end_view)
+
+
+def request_timings() -> dict:
+    """Return the current request's phases in milliseconds, with the middleware and total time
+
+    Returns:
+        dict: the phase name mapped to its duration in milliseconds and operation count
+    """
+    timings = dict(g.get('timings') or {})
+    query_stats = g.get('query_stats')
+    if query_stats is not None:
+        timings["db"] = (query_stats.seconds, query_stats.count)
+    if 'start_time' in g:
+        total = time.time() - g.start_time
+        timings["total"] = (total, 0)
+        if "app" in timings:
+            timings["middleware"] = (max(total - timings["app"][0], 0.0), 0)
+    return {
+        name: (round(timings[name][0] * 1000, 2), timings[name][1])
+        for name in PHASE_DESCRIPTIONS if name in timings
+    }
+
+
+def server_timing_header(timings: dict) -> str:
+    """Format request timings as a `Server-Timing` header value
+
+    Args:
+        timings (dict): Phase durations in milliseconds from `request_timings`
+
+    Returns:
+        str: e.g. `db;dur=1.52;desc="Database (3)", total;dur=4.1;desc="Total"`
+    """
+    metrics = []
+    for name, (duration, count) in timings.items():
+        description = PHASE_DESCRIPTIONS[name]
+        if count > 1:
+            description = f"{description} ({count})"
+        metrics.append(f'{name};dur={duration};desc="{description}"')
+    return ', '.join(metrics)
@@ -3,22 +3,31 @@ import DatabaseDynamicTable, { SortConfig } from './DatabaseDynamicTable';
 import { User } from '@/types/user';
 import { useFetchData } from '@/services/serverAPI';
 
+// The largest page the endpoint allows
+const USERS_PAGE_SIZE = 1000;
+
 const DatabaseUsersTable = () => {
   const [users, setUsers] = useState<User[]>([]);
   const [sortConfig, setSortConfig] = useState<SortConfig>({ key: null, direction: 'ascending' });
   const fetchData = useFetchData();
 
 
-  // Fetch data from API user all endpoint
+  // Fetch every page from the API user all endpoint, following its next_cursor
   const handleFetchedUsers = async () => {
     try {
-      const response = await fetchData('/api/v1/user/all', 'GET');
-      const result = await response.json();
-      if (result.data && Array.isArray(result.data.users)) {
-        setUsers(result.data.users);
-      } else {
-        throw new Error('Unexpected data format');
-      }
+      const allUsers: User[] = [];
+      let cursor: number | null = null;
+      do {
+        const query: string = cursor === null ? `?limit=${USERS_PAGE_SIZE}` : `?limit=${USERS_PAGE_SIZE}&cursor=${cursor}`;
+        const response = await fetchData(`/api/v1/user/all${query}`, 'GET');
+        const result = await response.json();
+        if (!result.data || !Array.isArray(result.data.users)) {
+          throw new Error('Unexpected data format');
+        }
+        allUsers.push(...result.data.users);
+        cursor = result.data.next_cursor ?? null;
+      } while (cursor !== null);
+      setUsers(allUsers);
     } catch (error) {
       console.error('There was a problem with the fetch operation:', error);
     }
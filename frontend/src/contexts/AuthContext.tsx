@@ -6,13 +6,14 @@ import { parse } from 'path';
 
 interface User {
     token: string;
+    refresh_token: string | null;
     user_id: number;
     role: 'Administrator' | 'User' | null;
 }
 
 interface AuthContextType {
     user: User | null;
-    login: (token: string, user_id: number, role: 'Administrator' | 'User') => void;
+    login: (token: string, refresh_token: string, user_id: number, role: 'Administrator' | 'User') => void;
     logout: () => void;
     parseJwt: (token: string) => any;
     isAuthenticated: (role: 'Administrator' | 'User') => Promise<boolean>;
@@ -23,11 +24,26 @@ const AuthContext = createContext<AuthContextType | undefined>(undefined);
 export const AuthProvider = ({ children }: { children: ReactNode }) => {
     const [user, setUser] = useLocalStorage<User | null>('user', null);
 
-    const login = (token: string, user_id: number, role: 'Administrator' | 'User') => {
-        setUser({ token: token, user_id: user_id, role: role });
+    // Access tokens are refreshed this long before they expire
+    const REFRESH_MARGIN_MS = 60 * 1000;
+
+    const login = (token: string, refresh_token: string, user_id: number, role: 'Administrator' | 'User') => {
+        setUser({ token: token, refresh_token: refresh_token, user_id: user_id, role: role });
     };
 
     const logout = () => {
+        if (user && user.token) {
+            // End the session on the server too, so its refresh token stops working
+            const API_URL = process.env.NEXT_PUBLIC_API_URL;
+            fetch(`${API_URL}/api/v1/auth/logout`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    Authorization: `Bearer ${user.token}`,
+                },
+                body: JSON.stringify({ refresh_token: user.refresh_token }),
+            }).catch((error) => console.error('Logout error:', error));
+        }
         // Here we just need to pass null to setUser to remove the user from localStorage
         setUser(null);
         console.log('User Logged out');
@@ -56,24 +72,26 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
             return;
         }
 
-        if (sessionStorage.getItem('tokenRefreshed')) {
-            console.log('Token already refreshed')
-            return;
+        // Another tab may have rotated the refresh token already, a replaced one ends the session
+        const stored = window.localStorage.getItem('user');
+        const latest: User | null = stored ? JSON.parse(stored) : null;
+        if (latest && latest.token !== user.token) {
+            setUser(latest);
+            return true;
         }
 
-        sessionStorage.setItem('tokenRefreshed', 'true');
-
-        if (!user || !user.token) {
-            console.log('User not found or token not found, authentication failed')
+        if (!user.refresh_token) {
+            console.log('No refresh token found, logging in again')
+            setUser(null);
             return false;
         }
-        // Call the API for Administrator role authentication
         const API_URL = process.env.NEXT_PUBLIC_API_URL;
         const response = await fetch(`${API_URL}/api/v1/auth/refresh`, {
-            method: 'GET',
+            method: 'POST',
             headers: {
-                Authorization: `Bearer ${user.token}`,
+                'Content-Type': 'application/json',
             },
+            body: JSON.stringify({ refresh_token: user.refresh_token }),
         })
         console.log('Refresh response:', response)
         if (response.ok) {
@@ -81,12 +99,12 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
             const user_role = decodeUserRole(data.data.user_token);
             const user_id = decodeUserId(data.data.user_token);
             console.log('User ID', user_id, 'User Role:', user_role)
-            setUser({ token: data.data.user_token, user_id: user_id, role: user_role })
+            setUser({ token: data.data.user_token, refresh_token: data.data.refresh_token, user_id: user_id, role: user_role })
             console.log('Refresh successful')
             return true;
         } else {
             console.log('Refreshed failed')
-            logout();
+            setUser(null);
         }
     };
 
@@ -143,8 +161,14 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
     };
 
     useEffect(() => {
-        refreshToken();
-    }, []);
+        if (!user || !user.token) {
+            return;
+        }
+        // Refresh shortly before the access token expires, straight away if it already has
+        const expiresAt = parseJwt(user.token).exp * 1000;
+        const timer = setTimeout(refreshToken, Math.max(0, expiresAt - Date.now() - REFRESH_MARGIN_MS));
+        return () => clearTimeout(timer);
+    }, [user?.token]);
 
     return (
         <AuthContext.Provider value={{ user, login, logout, parseJwt, isAuthenticated }}>
@@ -160,7 +184,7 @@ export const useAuth = () => {
         // Return a default object that matches the shape of AuthContextType
         // to avoid breaking SSR with a missing context error.
         return {
-            user: { token: '', user_id: 0, role: null },
+            user: { token: '', refresh_token: null, user_id: 0, role: null },
             login: () => { },
             logout: () => { },
             parseJwt: () => { },
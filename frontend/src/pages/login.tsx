@@ -40,7 +40,7 @@ const LoginPage: React.FC = () => {
         const userRole = decodedToken.user_role;
         const userID = decodedToken.user_id;
 ``
-        login(data.data.user_token, userID, userRole); // Assuming the token and role are returned correctly
+        login(data.data.user_token, data.data.refresh_token, userID, userRole); // Assuming the token and role are returned correctly
         router.push('/'); // Redirect to the homepage or dashboard as needed
       } else {
         alert(`Login failed: ${data.message}`);
@@ -0,0 +1,48 @@
+"""Shared test configuration.
+
+Tests whose requests run more queries than their declared budget fail. Declare budgets
+per endpoint with a marker:
+
+    @pytest.mark.query_budget(**{"user.get_users": 2})
+    def test_get_users(self):
+        ...
+
+Any request to a budgeted endpoint that runs more queries fails the test, listing the
+statements it ran. `default` sets a budget for every other endpoint.
+"""
+import pytest
+
+from server.utils.query_counter import add_request_listener, remove_request_listener
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "query_budget(default=None, **endpoints): the most queries a single request to "
+        "each endpoint may run")
+
+
+@pytest.fixture(autouse=True)
+def query_budget(request):
+    marker = request.node.get_closest_marker('query_budget')
+    if marker is None:
+        yield None
+        return
+
+    budgets = dict(marker.kwargs)
+    default = budgets.pop('default', marker.args[0] if marker.args else None)
+    violations = []
+
+    def check(endpoint, stats):
+        budget = budgets.get(endpoint, default)
+        if budget is not None and stats.count > budget:
+            statements = '\n'.join(f"    {executions} x {' '.join(statement.split())}"
+                                   for statement, (executions, *_) in stats.statements.items())
+            violations.append(f"{endpoint} ran {stats.count} queries, over its budget of {budget}:\n{statements}")
+
+    add_request_listener(check)
+    try:
+        yield budgets
+    finally:
+        remove_request_listener(check)
+    if violations:
+        pytest.fail('\n'.join(violations), pytrace=False)
@@ -0,0 +1,87 @@
+import gzip
+import json
+
+import pytest
+
+from server import create_server, db
+from server.models.user import Role, User
+from server.services.auth import get_new_token
+from server.services.principal import principal_cache
+from server.services.revocation import token_revocations
+from server.utils.query_counter import count_queries
+
+
+@pytest.mark.query_budget(**{"user.get_users": 2})
+class TestGetUsers:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.client = self.app.test_client()
+        principal_cache.clear()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            Role.insert_roles()
+            admin = User(first_name="Admin", last_name="Account", email=self.app.config['ADMIN_EMAIL'], password="password")
+            db.session.add(admin)
+            for i in range(5):
+                db.session.add(User(first_name=f"User{i}", last_name="Test", email=f"user{i}@example.com", password="password"))
+            db.session.commit()
+            success, message, token = get_new_token(admin)
+            # Built once per worker, not part of any request's budget
+            token_revocations.rebuild()
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def test_pages_are_stable_and_complete(self):
+        # Act
+        first = self.client.get('/api/v1/user/all?limit=4', headers=self.headers).get_json()['data']
+        second = self.client.get(f"/api/v1/user/all?limit=4&cursor={first['next_cursor']}", headers=self.headers).get_json()['data']
+
+        # Assert
+        ids = [user['id'] for user in first['users'] + second['users']]
+        assert ids == sorted(ids) and len(ids) == 6
+        assert second['next_cursor'] is None
+        assert first['users'][0]['role_name'] == 'Administrator'
+        assert first['users'][1]['role_name'] == 'User'
+        assert 'password_hash' not in first['users'][0]
+
+    def test_page_is_a_single_query(self):
+        # Arrange
+        self.client.get('/api/v1/user/all', headers=self.headers)  # warm the principal cache
+
+        # Act
+        with count_queries() as stats:
+            response = self.client.get('/api/v1/user/all', headers=self.headers)
+
+        # Assert
+        assert response.status_code == 200
+        assert stats.count == 1
+
+    def test_invalid_limit_is_rejected(self):
+        # Act
+        response = self.client.get('/api/v1/user/all?limit=0', headers=self.headers)
+
+        # Assert
+        assert response.status_code == 400
+
+    def test_streamed_users_match_the_envelope(self):
+        # Act
+        response = self.client.get('/api/v1/user/all?stream=true&cursor=1', headers=self.headers)
+
+        # Assert
+        assert response.is_streamed
+        body = response.get_json()
+        assert body['status_code'] == 200 and body['status'] == 'success'
+        assert [user['email'] for user in body['data']['users']] == [f"user{i}@example.com" for i in range(5)]
+        assert body['data']['next_cursor'] is None
+        assert 'password_hash' not in body['data']['users'][0]
+
+    def test_streamed_users_are_gzipped_when_accepted(self):
+        # Act
+        response = self.client.get('/api/v1/user/all?stream=true',
+                                   headers={**self.headers, "Accept-Encoding": "gzip"})
+
+        # Assert
+        assert response.headers['Content-Encoding'] == 'gzip'
+        body = json.loads(gzip.decompress(response.get_data()))
+        assert len(body['data']['users']) == 6
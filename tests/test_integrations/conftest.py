@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import stripe
+
+from server.integrations.stripe import stripe_breaker, stripe_settings
+
+
+class FakeStripe:
+    """A local stand-in for the Stripe API so the integration can be exercised offline."""
+
+    def __init__(self, products, prices, latency=0.0):
+        self.products = products
+        self.prices = prices
+        self.latency = latency
+        self.fail_next = 0
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def record(self, path):
+        with self._lock:
+            self.requests.append(path)
+
+    def count(self, prefix):
+        return len([path for path in self.requests if path.startswith(prefix)])
+
+
+def make_handler(fake):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            fake.record(path)
+            time.sleep(fake.latency)
+            if fake.fail_next > 0:
+                fake.fail_next -= 1
+                return self.respond(500, {"error": {"type": "api_error", "message": "Stripe is degraded"}})
+            if path == '/v1/products':
+                body = {"object": "list", "url": "/v1/products", "has_more": False, "data": fake.products}
+                return self.respond(200, body)
+            if path.startswith('/v1/prices/'):
+                price = fake.prices.get(path.rsplit('/', 1)[1])
+                if price is None:
+                    return self.respond(404, {"error": {"type": "invalid_request_error", "message": "No such price"}})
+                return self.respond(200, price)
+            if path.startswith('/v1/checkout/sessions/'):
+                session_id = path.rsplit('/', 1)[1]
+                return self.respond(200, {"id": session_id, "object": "checkout.session", "customer_email": "test@example.com"})
+            return self.respond(404, {"error": {"type": "invalid_request_error", "message": "Unknown path"}})
+
+        def respond(self, code, body):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+@pytest.fixture
+def fake_stripe(monkeypatch):
+    prices = {
+        f"price_{i}": {"id": f"price_{i}", "object": "price", "type": "one_time" if i % 2 else "recurring", "unit_amount": 100 * i}
+        for i in range(8)
+    }
+    products = [
+        {"id": f"prod_{i}", "object": "product", "active": True, "default_price": f"price_{i}"}
+        for i in range(8)
+    ]
+    fake = FakeStripe(products, prices)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(fake))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setenv('STRIPE_SECRET_KEY', 'sk_test_fake')
+    monkeypatch.setattr(stripe, 'api_base', f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(stripe_settings, 'backoff_base_seconds', 0.01)
+    stripe_breaker.reset()
+    yield fake
+
+    stripe_breaker.reset()
+
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,225 @@
+import threading
+import time
+
+import pytest
+import stripe
+from flask import g
+
+from server import create_server
+from server.integrations.stripe import StripeIntegration, init_stripe, stripe_breaker, stripe_settings
+from server.services.stripe_catalogue import StripeCatalogue
+from server.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def run_concurrently(count, target):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(index):
+        barrier.wait()
+        results[index] = target()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestStripeIntegration:
+
+    def test_fetch_prices_runs_concurrently(self, fake_stripe):
+        # Arrange
+        fake_stripe.latency = 0.1
+        integration = StripeIntegration()
+        price_ids = list(fake_stripe.prices)
+
+        # Act
+        started = time.perf_counter()
+        for price_id in price_ids:
+            integration.fetch_price(price_id)
+        sequential = time.perf_counter() - started
+
+        started = time.perf_counter()
+        prices = integration.fetch_prices(price_ids)
+        concurrent = time.perf_counter() - started
+
+        # Assert
+        assert set(prices) == set(price_ids)
+        assert prices["price_3"]["unit_amount"] == 300
+        assert concurrent < sequential / 2
+
+    def test_concurrent_price_calls_reach_the_request_timings(self, fake_stripe):
+        # Arrange
+        fake_stripe.latency = 0.05
+        integration = StripeIntegration()
+        price_ids = list(fake_stripe.prices)
+        app = create_server('testing')
+
+        # Act
+        with app.test_request_context('/'):
+            started = time.perf_counter()
+            integration.fetch_prices(price_ids)
+            elapsed = time.perf_counter() - started
+            stripe_time, stripe_calls = g.timings["stripe"]
+            calls = g.calls["stripe"]
+
+        # Assert
+        assert stripe_calls == len(price_ids)
+        assert stripe_time <= elapsed
+        assert [call for call, duration in calls] == ["Price.retrieve"] * len(price_ids)
+
+    def test_product_crawls_are_named_in_the_request_timings(self, fake_stripe):
+        # Arrange
+        app = create_server('testing')
+
+        # Act
+        with app.test_request_context('/'):
+            StripeIntegration().fetch_products_with_prices()
+            calls = [call for call, duration in g.calls["stripe"]]
+
+        # Assert
+        assert calls[0] == "Product.list"
+        assert "<lambda>" not in calls
+
+    def test_products_are_fetched_with_missing_prices_filled_in(self, fake_stripe):
+        # Act
+        success, message, products = StripeIntegration().fetch_products_with_prices()
+
+        # Assert
+        assert success is True
+        assert len(products) == 8
+        assert all(isinstance(product["default_price"], dict) for product in products)
+        assert fake_stripe.count('/v1/products') == 1
+
+    def test_concurrent_product_crawls_are_coalesced(self, fake_stripe):
+        # Arrange
+        fake_stripe.latency = 0.2
+
+        # Act
+        results = run_concurrently(5, lambda: StripeIntegration().fetch_products())
+
+        # Assert
+        assert all(result[0] for result in results)
+        assert fake_stripe.count('/v1/products') == 1
+
+    def test_concurrent_session_lookups_are_coalesced(self, fake_stripe):
+        # Arrange
+        fake_stripe.latency = 0.2
+
+        # Act
+        results = run_concurrently(5, lambda: StripeIntegration().fetch_session_by_id("cs_test_1"))
+
+        # Assert
+        assert all(result["id"] == "cs_test_1" for result in results)
+        assert fake_stripe.count('/v1/checkout/sessions/') == 1
+
+    def test_missing_price_returns_none(self, fake_stripe):
+        # Act
+        price = StripeIntegration().fetch_price("price_missing")
+
+        # Assert
+        assert price is None
+
+    def test_transient_errors_are_retried(self, fake_stripe):
+        # Arrange
+        fake_stripe.fail_next = 2
+
+        # Act
+        session = StripeIntegration().fetch_session_by_id("cs_test_2")
+
+        # Assert
+        assert session["id"] == "cs_test_2"
+        assert fake_stripe.count('/v1/checkout/sessions/') == 3
+
+    def test_circuit_opens_and_fails_fast(self, fake_stripe, monkeypatch):
+        # Arrange
+        monkeypatch.setattr(stripe_breaker, 'failure_threshold', 2)
+        fake_stripe.fail_next = 100
+        integration = StripeIntegration()
+        for _ in range(2):
+            with pytest.raises(stripe.error.APIError):
+                integration.fetch_session_by_id("cs_test_3")
+        calls_before = len(fake_stripe.requests)
+
+        # Act
+        with pytest.raises(CircuitOpenError):
+            integration.fetch_session_by_id("cs_test_3")
+        success, message, products = integration.fetch_products()
+
+        # Assert
+        assert len(fake_stripe.requests) == calls_before
+        assert success is False
+        assert message == "Stripe is currently unavailable"
+
+    def test_unexpected_error_ends_the_half_open_trial(self, fake_stripe, monkeypatch):
+        # Arrange
+        monkeypatch.setattr(stripe_breaker, 'failure_threshold', 1)
+        monkeypatch.setattr(stripe_breaker, 'recovery_seconds', 0)
+        stripe_breaker.record_failure()
+        integration = StripeIntegration()
+
+        def broken():
+            raise ValueError("not a Stripe error")
+
+        # Act
+        with pytest.raises(ValueError):
+            integration._call(broken)
+        session = integration.fetch_session_by_id("cs_test_4")
+
+        # Assert
+        assert session["id"] == "cs_test_4"
+        assert stripe_breaker.state == CircuitBreaker.CLOSED
+
+
+class TestCircuitBreaker:
+
+    def test_half_open_trial_closes_on_success(self):
+        # Arrange
+        breaker = CircuitBreaker('test', failure_threshold=1, recovery_seconds=0)
+        breaker.record_failure()
+
+        # Act
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+
+        # Assert
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_open_circuit_rejects_until_recovery(self):
+        # Arrange
+        breaker = CircuitBreaker('test', failure_threshold=2, recovery_seconds=60)
+
+        # Act
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+
+        # Assert
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+
+class TestInitStripe:
+
+    def test_settings_come_from_the_app_config(self, monkeypatch):
+        # Arrange
+        app = create_server('testing')
+        app.config.update(STRIPE_MAX_RETRIES=5, STRIPE_BREAKER_FAILURES=9, STRIPE_CATALOGUE_FRESH_SECONDS=1)
+        # Restored after the test, like every attribute set through monkeypatch
+        monkeypatch.setattr(stripe_settings, 'max_retries', stripe_settings.max_retries)
+        monkeypatch.setattr(stripe_breaker, 'failure_threshold', stripe_breaker.failure_threshold)
+        catalogue = StripeCatalogue()
+
+        # Act
+        init_stripe(app)
+        catalogue.init_app(app)
+
+        # Assert
+        assert stripe_settings.max_retries == 5
+        assert stripe_breaker.failure_threshold == 9
+        assert catalogue.fresh_seconds == 1
@@ -0,0 +1,62 @@
+import pytest
+from flask import Response
+from loguru import logger
+
+from server import create_server
+from server.middlewares.api_logger import ResponseLogSampling, log_response, read_body_prefix
+
+
+class TestResponseLogging:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.messages = []
+        handler_id = logger.add(lambda message: self.messages.append(message.record['message']), level="INFO")
+        yield
+        logger.remove(handler_id)
+
+    def test_prefix_is_read_across_chunks(self):
+        # Arrange
+        response = Response([b'abc', b'defgh', b'ij'])
+
+        # Act
+        prefix, length = read_body_prefix(response, 6)
+
+        # Assert
+        assert prefix == b'abcdef'
+        assert length == 10
+
+    def test_body_is_truncated_without_buffering(self):
+        # Arrange
+        response = Response(b'x' * 2000)
+        self.app.config['RESPONSE_LOG_MAX_BYTES'] = 10
+
+        # Act
+        with self.app.test_request_context('/'):
+            log_response(response)
+
+        # Assert
+        assert f"Response: 200 OK, Data: {'x' * 10}... [Truncated]" in self.messages
+
+    def test_streamed_body_is_not_consumed(self):
+        # Arrange
+        response = Response(iter([b'streamed']))
+
+        # Act
+        with self.app.test_request_context('/'):
+            log_response(response)
+
+        # Assert
+        assert "Response: 200 OK [Streamed]" in self.messages
+        assert response.get_data() == b'streamed'
+
+    def test_sampling_rules_prefer_status_then_endpoint(self):
+        # Arrange
+        sampling = ResponseLogSampling(0.5, '5xx=1, 404=0, user.get_users=0.25, bad')
+
+        # Assert
+        assert sampling.rate(503, 'user.get_users') == 1
+        assert sampling.rate(404, 'user.get_users') == 0
+        assert sampling.rate(200, 'user.get_users') == 0.25
+        assert sampling.rate(200, 'auth.login') == 0.5
+        assert sampling.sampled(404, 'auth.login') is False
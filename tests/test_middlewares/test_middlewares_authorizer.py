@@ -0,0 +1,67 @@
+import pytest
+from unittest.mock import patch
+
+from server import create_server, db
+from server.models.user import Role, User
+from server.services.auth import get_new_token
+from server.services.principal import principal_cache
+from server.services.user import update_user_by_id
+
+
+class TestStatelessAuth:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.app.config['AUTH_STATELESS'] = True
+        self.client = self.app.test_client()
+        principal_cache.clear()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            Role.insert_roles()
+            test_user = User(first_name="Test", last_name="User", email="test@example.com", password="password")
+            db.session.add(test_user)
+            db.session.commit()
+            self.user_id = test_user.id
+            success, message, self.token = get_new_token(test_user)
+        self.headers = {"Authorization": f"Bearer {self.token}"}
+
+    def test_read_only_route_authorizes_from_claims(self):
+        # Act
+        with patch('server.middlewares.authorizer.get_principal') as mock_get_principal:
+            response = self.client.get('/api/v1/auth/user', headers=self.headers)
+
+        # Assert
+        assert response.status_code == 200
+        mock_get_principal.assert_not_called()
+
+    def test_claims_respect_permissions(self):
+        # Act
+        response = self.client.get('/api/v1/auth/admin', headers=self.headers)
+
+        # Assert
+        assert response.status_code == 403
+
+    def test_stale_claims_fall_back_to_database(self):
+        # Arrange
+        self.app.config['AUTH_STATELESS_MAX_STALENESS_SECONDS'] = -1
+
+        # Act
+        response = self.client.get('/api/v1/auth/user', headers=self.headers)
+
+        # Assert
+        assert response.status_code == 200
+
+    def test_role_change_supersedes_token_once_stale(self):
+        # Arrange
+        self.app.config['AUTH_STATELESS_MAX_STALENESS_SECONDS'] = -1
+        with self.app.app_context():
+            admin_role = Role.query.filter_by(name='Administrator').first()
+            update_user_by_id(self.user_id, {"role_id": admin_role.id})
+
+        # Act
+        response = self.client.get('/api/v1/auth/user', headers=self.headers)
+
+        # Assert
+        assert response.status_code == 401
+        assert response.get_json()['data']['error_info'] == "Token has been superseded!"
@@ -0,0 +1,71 @@
+import pytest
+
+from server import create_server
+from server.middlewares.cors import CORSMiddleware
+
+
+class TestCORSMiddleware:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.app.wsgi_app = CORSMiddleware(self.app.wsgi_app.app,
+                                           origins="http://localhost:3000, https://*.example.com")
+        self.client = self.app.test_client()
+
+    def test_preflight_is_answered_without_routing(self):
+        # Act
+        response = self.client.open('/api/v1/does-not-exist', method='OPTIONS', headers={
+            "Origin": "https://app.example.com",
+            "Access-Control-Request-Method": "POST"
+        })
+
+        # Assert
+        assert response.status_code == 204
+        assert response.headers['Access-Control-Allow-Origin'] == "https://app.example.com"
+        assert response.headers['Access-Control-Allow-Credentials'] == "true"
+        assert "PUT" in response.headers['Access-Control-Allow-Methods']
+        assert response.headers['Vary'] == "Origin"
+
+    def test_allowed_origin_is_echoed_once(self):
+        # Act
+        response = self.client.get('/', headers={"Origin": "http://localhost:3000"})
+
+        # Assert
+        assert response.headers.getlist('Access-Control-Allow-Origin') == ["http://localhost:3000"]
+        assert 'Origin' in response.headers['Vary']
+
+    @pytest.mark.parametrize('origin', ["https://example.com", "https://evil.com", "http://app.example.com"])
+    def test_other_origins_get_no_cors_headers(self, origin):
+        # Act
+        response = self.client.get('/', headers={"Origin": origin})
+
+        # Assert
+        assert 'Access-Control-Allow-Origin' not in response.headers
+        assert response.headers['Vary'] == "Origin"
+
+    def test_preflight_allows_api_key_and_profile_headers(self):
+        # Act
+        response = self.client.open('/api/v1/auth/user', method='OPTIONS', headers={
+            "Origin": "http://localhost:3000",
+            "Access-Control-Request-Method": "GET"
+        })
+
+        # Assert
+        allowed = response.headers['Access-Control-Allow-Headers'].split(',')
+        assert "X-API-Key" in allowed and "X-Profile" in allowed
+
+    @pytest.mark.parametrize('origins, origin, allowed', [
+        ("https://*.example.com", "https://app.example.com:8443", True),
+        ("https://*.example.com:8443", "https://app.example.com:8443", True),
+        ("https://*.example.com:8443", "https://app.example.com:9000", False),
+        ("https://*.example.com:8443", "https://app.example.com", False),
+    ])
+    def test_wildcard_origins_with_ports(self, origins, origin, allowed):
+        # Arrange
+        middleware = CORSMiddleware(None, origins=origins)
+
+        # Act
+        result = middleware.is_allowed(origin)
+
+        # Assert
+        assert result is allowed
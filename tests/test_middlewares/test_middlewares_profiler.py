@@ -0,0 +1,56 @@
+import pstats
+
+import pytest
+
+from server import create_server, db
+from server.config import TestingConfig
+from server.models.user import Role, User
+from server.services.auth import get_new_token
+from server.services.principal import principal_cache
+
+
+class TestProfiler:
+    @pytest.fixture(autouse=True)
+    def setUp(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(TestingConfig, 'PROFILING_ENABLED', True)
+        monkeypatch.setattr(TestingConfig, 'PROFILE_DIR', str(tmp_path))
+        self.profile_dir = tmp_path
+        self.app = create_server('testing')
+        self.client = self.app.test_client()
+        principal_cache.clear()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            Role.insert_roles()
+            admin = User(first_name="Admin", last_name="Account", email=self.app.config['ADMIN_EMAIL'], password="password")
+            user = User(first_name="User", last_name="Test", email="user@example.com", password="password")
+            db.session.add_all([admin, user])
+            db.session.commit()
+            self.admin_headers = {"Authorization": f"Bearer {get_new_token(admin)[2]}"}
+            self.user_headers = {"Authorization": f"Bearer {get_new_token(user)[2]}"}
+
+    def test_admin_request_is_profiled(self):
+        # Act
+        response = self.client.get('/api/v1/user/all', headers={**self.admin_headers, "X-Profile": "cprofile"})
+
+        # Assert
+        profile_id = response.headers['X-Profile-Id']
+        stats = pstats.Stats(str(self.profile_dir / f"{profile_id}.pstats"))
+        assert any(function == 'get_users_page' for _, _, function in stats.stats)
+
+    def test_sampling_profile_is_downloadable(self):
+        # Act
+        response = self.client.get('/api/v1/user/all?profile=sampling', headers=self.admin_headers)
+        download = self.client.get(f"/api/v1/server/profiles/{response.headers['X-Profile-Id']}", headers=self.admin_headers)
+
+        # Assert
+        assert download.status_code == 200
+        assert (self.profile_dir / f"{response.headers['X-Profile-Id']}.folded").exists()
+
+    def test_non_admin_request_is_not_profiled(self):
+        # Act
+        response = self.client.get('/api/v1/user/', headers={**self.user_headers, "X-Profile": "cprofile"})
+
+        # Assert
+        assert 'X-Profile-Id' not in response.headers
+        assert list(self.profile_dir.iterdir()) == []
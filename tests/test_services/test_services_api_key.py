@@ -0,0 +1,200 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from server import create_server, db
+from server.models.api_key import ApiKey
+from server.models.user import Role, User
+from server.services.api_key import api_key_cache, authenticate_api_key
+from server.services.auth import get_new_token
+from server.services.principal import principal_cache
+from server.services.revocation import token_revocations
+from server.utils.query_counter import count_queries
+
+
+class TestApiKeys:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.client = self.app.test_client()
+        principal_cache.clear()
+        api_key_cache.clear()
+        token_revocations.clear()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            Role.insert_roles()
+            admin = User(first_name="Admin", last_name="Account", email=self.app.config['ADMIN_EMAIL'], password="password")
+            user = User(first_name="User", last_name="Test", email="user@example.com", password="password")
+            db.session.add_all([admin, user])
+            db.session.commit()
+            self.admin_headers = {"Authorization": f"Bearer {get_new_token(admin)[2]}"}
+            self.user_headers = {"Authorization": f"Bearer {get_new_token(user)[2]}"}
+        yield
+        api_key_cache.clear()
+        token_revocations.clear()
+
+    def create_key(self, headers, **options):
+        response = self.client.post('/api/v1/auth/api-keys', json=options, headers=headers)
+        return response.status_code, response.get_json()['data']
+
+    def test_api_key_authenticates_as_its_owner(self):
+        # Arrange
+        _, data = self.create_key(self.user_headers, name="Integration")
+
+        # Act
+        response = self.client.get('/api/v1/auth/user', headers={"X-API-Key": data['api_key']})
+        wrong = self.client.get('/api/v1/auth/user', headers={"X-API-Key": data['api_key'][:-1] + "x"})
+
+        # Assert
+        assert response.status_code == 200
+        assert wrong.status_code == 401
+
+    def test_cached_keys_authenticate_without_a_query(self):
+        # Arrange
+        _, data = self.create_key(self.user_headers)
+
+        # Act
+        with self.app.app_context():
+            authenticate_api_key(data['api_key'])
+            with count_queries() as stats:
+                success, message, entry = authenticate_api_key(data['api_key'])
+
+        # Assert
+        assert success
+        assert stats.count == 0
+        assert entry.principal.email == "user@example.com"
+
+    def test_scopes_limit_the_owner_permissions(self):
+        # Arrange
+        _, general = self.create_key(self.admin_headers, scopes=["general"])
+        _, admin = self.create_key(self.admin_headers, scopes=["admin"])
+
+        # Act
+        general_response = self.client.get('/api/v1/auth/admin', headers={"X-API-Key": general['api_key']})
+        admin_response = self.client.get('/api/v1/auth/admin', headers={"X-API-Key": admin['api_key']})
+        user_code, _ = self.create_key(self.user_headers, scopes=["admin"])
+
+        # Assert
+        assert general_response.status_code == 403
+        assert admin_response.status_code == 200
+        assert user_code == 403
+
+    def test_revoked_key_is_rejected_at_once(self):
+        # Arrange
+        _, data = self.create_key(self.user_headers)
+        headers = {"X-API-Key": data['api_key']}
+        self.client.get('/api/v1/auth/user', headers=headers)
+
+        # Act
+        revoke = self.client.delete(f"/api/v1/auth/api-keys/{data['id']}", headers=self.user_headers)
+        after = self.client.get('/api/v1/auth/user', headers=headers)
+
+        # Assert
+        assert revoke.status_code == 200
+        assert after.status_code == 401
+
+    def test_keys_have_their_own_rate_limit(self):
+        # Arrange
+        _, data = self.create_key(self.user_headers, rate_limit=2, rate_limit_window=60)
+        headers = {"X-API-Key": data['api_key']}
+
+        # Act
+        statuses = [self.client.get('/api/v1/auth/user', headers=headers).status_code for _ in range(3)]
+
+        # Assert
+        assert statuses == [200, 200, 429]
+
+    def test_api_keys_cannot_manage_keys(self):
+        # Arrange
+        _, data = self.create_key(self.user_headers)
+
+        # Act
+        listed = self.client.get('/api/v1/auth/api-keys', headers=self.user_headers)
+        with_key = self.client.get('/api/v1/auth/api-keys', headers={"X-API-Key": data['api_key']})
+
+        # Assert
+        assert listed.status_code == 200
+        assert 'key_hash' not in listed.get_json()['data']['api_keys'][0]
+        assert listed.get_json()['data']['api_keys'][0]['scopes'] == ["general"]
+        assert with_key.status_code == 401
+
+    def test_unknown_prefixes_do_not_evict_real_keys(self):
+        # Arrange
+        self.app.config['API_KEY_UNKNOWN_CACHE_SIZE'] = 2
+        api_key_cache.init_app(self.app)
+        _, data = self.create_key(self.user_headers)
+
+        # Act
+        with self.app.app_context():
+            authenticate_api_key(data['api_key'])
+            for guess in range(20):
+                authenticate_api_key(f"sk_{guess:012x}_secret")
+            with count_queries() as stats:
+                success, message, entry = authenticate_api_key(data['api_key'])
+
+        # Assert
+        assert success
+        assert stats.count == 0
+
+    def test_authenticating_never_writes(self):
+        # Arrange
+        _, data = self.create_key(self.user_headers)
+
+        # Act
+        with self.app.app_context():
+            with count_queries() as stats:
+                success, message, entry = authenticate_api_key(data['api_key'])
+            before = ApiKey.query.get(data['id']).last_used_utc
+            api_key_cache.sync()
+            after = ApiKey.query.get(data['id']).last_used_utc
+
+        # Assert
+        assert success
+        assert stats.count == 1
+        assert before is None
+        assert after is not None
+
+    def test_keys_revoked_in_another_worker_are_synced(self):
+        # Arrange
+        _, data = self.create_key(self.user_headers)
+        with self.app.app_context():
+            authenticate_api_key(data['api_key'])
+            # Revoked as another worker would, without touching this worker's cache
+            ApiKey.query.filter(ApiKey.id == data['id']).update({ApiKey.revoked_utc: datetime.utcnow()})
+            db.session.commit()
+            before, _, _ = authenticate_api_key(data['api_key'])
+
+            # Act
+            api_key_cache.sync()
+            after, _, _ = authenticate_api_key(data['api_key'])
+
+        # Assert
+        assert (before, after) == (True, False)
+
+    def test_owner_invalidated_during_a_load_is_reloaded(self):
+        # Arrange
+        _, data = self.create_key(self.user_headers)
+        with self.app.app_context():
+            owner_id = User.query.filter_by(email="user@example.com").first().id
+
+            def invalidate_during_load(conn, cursor, statement, *args):
+                if 'api_keys' in statement:
+                    principal_cache.invalidate(owner_id)
+
+            event.listen(db.engine, 'after_cursor_execute', invalidate_during_load)
+            try:
+                authenticate_api_key(data['api_key'])
+            finally:
+                event.remove(db.engine, 'after_cursor_execute', invalidate_during_load)
+
+            # Act
+            with count_queries() as reload:
+                authenticate_api_key(data['api_key'])
+            with count_queries() as cached:
+                success, message, entry = authenticate_api_key(data['api_key'])
+
+        # Assert
+        assert success
+        assert (reload.count, cached.count) == (1, 0)
@@ -0,0 +1,97 @@
+import pytest
+
+from server import create_server, db
+from server.extensions import password_hasher
+from server.models.user import Role, User
+from server.services.auth import login_user
+from server.services.user import create_user
+from server.utils.query_counter import count_queries
+
+
+class TestLoginUser:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.app.config['PASSWORD_PBKDF2_ITERATIONS'] = 1000
+        password_hasher.init_app(self.app)
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            Role.insert_roles()
+            db.session.add(User(first_name="User", last_name="Test", email="user@example.com", password="hunter22"))
+            db.session.commit()
+        yield
+        self.app.config['PASSWORD_PBKDF2_ITERATIONS'] = 150000
+        password_hasher.init_app(self.app)
+
+    def test_login_rehashes_with_new_parameters(self):
+        # Arrange
+        self.app.config['PASSWORD_PBKDF2_ITERATIONS'] = 2000
+        password_hasher.init_app(self.app)
+
+        # Act
+        with self.app.app_context():
+            success, message, tokens = login_user("user@example.com", "hunter22")
+            user = User.query.filter_by(email="user@example.com").first()
+            password_hash, auth_version = user.password_hash, user.auth_version
+
+        # Assert
+        assert success and tokens["user_token"] and tokens["refresh_token"]
+        assert password_hash.startswith("pbkdf2:sha256:2000$")
+        assert auth_version == 1
+
+    def test_wrong_password_and_unknown_user_fail(self):
+        # Act
+        with self.app.app_context():
+            wrong_password = login_user("user@example.com", "hunter23")
+            unknown_user = login_user("nobody@example.com", "hunter22")
+
+        # Assert
+        assert wrong_password == unknown_user == (False, 'Invalid email or password', {})
+
+    def test_login_is_one_query_and_one_hash_either_way(self, monkeypatch):
+        # Arrange
+        verified = []
+        verify = password_hasher.verify
+        monkeypatch.setattr(password_hasher, 'verify', lambda *args: verified.append(args[0]) or verify(*args))
+
+        # Act
+        with self.app.app_context():
+            with count_queries() as known:
+                login_user("user@example.com", "hunter22")
+            with count_queries() as unknown:
+                login_user("nobody@example.com", "hunter22")
+
+        # Assert
+        # The known user's second statement inserts their session
+        assert (known.count, unknown.count) == (2, 1)
+        assert len(verified) == 2
+        assert verified[1] == password_hasher.dummy_hash()
+
+    def test_saturated_hashing_is_a_503(self, monkeypatch):
+        # Arrange
+        monkeypatch.setattr(password_hasher, 'workers', 1)
+        monkeypatch.setattr(password_hasher, 'max_pending', 0)
+
+        # Act
+        response = self.client.post('/api/v1/auth/login', json={"email": "user@example.com", "password": "hunter22"})
+
+        # Assert
+        assert response.status_code == 503
+
+    def test_only_the_service_layer_hashes_through_the_pool(self, monkeypatch):
+        # Arrange
+        monkeypatch.setattr(password_hasher, 'workers', 1)
+        monkeypatch.setattr(password_hasher, 'max_pending', 0)
+
+        # Act
+        with self.app.app_context():
+            user = User(first_name="Script", last_name="User", email="script@example.com", password="hunter22")
+            success, message = create_user({"first_name": "New", "last_name": "User",
+                                            "email": "new@example.com", "password": "hunter22"})
+
+        # Assert
+        assert user.password_hash.startswith("pbkdf2:sha256:1000$")
+        assert not success
+        assert message == 'Password hashing is currently unavailable'
@@ -0,0 +1,115 @@
+import pytest
+from unittest.mock import patch
+
+from server import create_server, db
+from server.models.user import Permission, Role, User
+from server.services.auth import get_new_token
+from server.services.principal import PrincipalCache, get_principal, principal_cache
+from server.types.principal import Principal
+from server.services.user import delete_user_by_id, update_user_by_id
+
+
+class TestGetPrincipal:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        principal_cache.clear()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            Role.insert_roles()
+            test_user = User(first_name="Test", last_name="User", email="test@example.com", password="password")
+            db.session.add(test_user)
+            db.session.commit()
+            self.user_id = test_user.id
+
+    def test_snapshot_contents(self):
+        with self.app.app_context():
+            # Act
+            success, message, principal = get_principal(self.user_id, issued_at=1)
+
+            # Assert
+            assert success is True
+            assert principal.email == "test@example.com"
+            assert principal.role_name == "User"
+            assert principal.permissions == Permission.GENERAL
+            assert principal.is_user() and not principal.is_admin()
+
+    def test_second_lookup_is_served_from_cache(self):
+        with self.app.app_context():
+            # Arrange
+            get_principal(self.user_id, issued_at=1)
+
+            # Act
+            with patch('server.services.principal.load_principal') as mock_load:
+                success, message, principal = get_principal(self.user_id, issued_at=1)
+
+            # Assert
+            assert principal.id == self.user_id
+            mock_load.assert_not_called()
+
+    def test_update_invalidates_cached_principal(self):
+        with self.app.app_context():
+            # Arrange
+            get_principal(self.user_id, issued_at=1)
+
+            # Act
+            update_user_by_id(self.user_id, {"email": "changed@example.com"})
+            success, message, principal = get_principal(self.user_id, issued_at=1)
+
+            # Assert
+            assert principal.email == "changed@example.com"
+
+    def test_delete_invalidates_cached_principal(self):
+        with self.app.app_context():
+            # Arrange
+            get_principal(self.user_id, issued_at=1)
+
+            # Act
+            delete_user_by_id(self.user_id)
+            success, message, principal = get_principal(self.user_id, issued_at=1)
+
+            # Assert
+            assert principal is None
+
+    def test_authorized_request_uses_principal(self):
+        with self.app.app_context():
+            # Arrange
+            success, message, principal = get_principal(self.user_id)
+            success, message, token = get_new_token(principal)
+            client = self.app.test_client()
+
+            # Act
+            response = client.get('/api/v1/auth/user', headers={"Authorization": f"Bearer {token}"})
+
+            # Assert
+            assert response.status_code == 200
+
+
+class TestPrincipalCache:
+    def test_generations_are_bounded_and_never_reused(self):
+        # Arrange
+        cache = PrincipalCache(maxsize=2, ttl=60)
+        principal = Principal(id=1, email="a@example.com", role_id=1, role_name="User", permissions=1)
+        cache.set(1, None, principal, cache.generation(1))
+
+        # Act
+        cache.invalidate(1)
+        cache.invalidate(2)
+        cache.invalidate(3)
+
+        # Assert
+        assert cache.get(1, None) is None
+        assert len(cache._generations) == 2
+
+    def test_sized_from_app_config(self):
+        # Arrange
+        app = create_server('testing')
+        app.config.update(PRINCIPAL_CACHE_SIZE=1, PRINCIPAL_CACHE_TTL_SECONDS=5)
+        cache = PrincipalCache()
+
+        # Act
+        cache.init_app(app)
+
+        # Assert
+        assert (cache._cache.maxsize, cache._cache.ttl) == (1, 5)
@@ -0,0 +1,117 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from server import create_server, db
+from server.models.revoked_token import RevokedToken
+from server.models.user import Role, User
+from server.services.auth import get_new_token
+from server.services.principal import principal_cache
+from server.services.revocation import token_revocations
+from server.utils.query_counter import count_queries
+
+
+class TestTokenRevocation:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.client = self.app.test_client()
+        principal_cache.clear()
+        token_revocations.clear()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            Role.insert_roles()
+            admin = User(first_name="Admin", last_name="Account", email=self.app.config['ADMIN_EMAIL'], password="password")
+            user = User(first_name="User", last_name="Test", email="user@example.com", password="password")
+            db.session.add_all([admin, user])
+            db.session.commit()
+            self.admin_headers = {"Authorization": f"Bearer {get_new_token(admin)[2]}"}
+            self.user_token = get_new_token(user)[2]
+        self.user_headers = {"Authorization": f"Bearer {self.user_token}"}
+        yield
+        token_revocations.clear()
+
+    def test_logged_out_token_is_rejected(self):
+        # Act
+        logout = self.client.post('/api/v1/auth/logout', headers=self.user_headers)
+        after = self.client.get('/api/v1/auth/user', headers=self.user_headers)
+
+        # Assert
+        assert logout.status_code == 200
+        assert after.status_code == 401
+        assert after.get_json()['data']['error_info'] == "Token has been revoked!"
+
+    def test_admin_can_revoke_a_token(self):
+        # Act
+        revoke = self.client.post('/api/v1/auth/revoke', json={"token": self.user_token}, headers=self.admin_headers)
+        after = self.client.get('/api/v1/auth/user', headers=self.user_headers)
+
+        # Assert
+        assert revoke.status_code == 200
+        assert after.status_code == 401
+
+    def test_tokens_not_revoked_are_checked_without_a_query(self):
+        # Arrange
+        self.client.get('/api/v1/auth/user', headers=self.user_headers)
+
+        # Act
+        with self.app.app_context(), count_queries() as stats:
+            revoked = token_revocations.is_revoked("0" * 32)
+
+        # Assert
+        assert revoked is False
+        assert stats.count == 0
+
+    def test_revocations_from_other_workers_are_synced(self):
+        # Arrange
+        with self.app.app_context():
+            token_revocations.rebuild()
+            db.session.add(RevokedToken(jti="a" * 32, expires_utc=datetime.utcnow() + timedelta(hours=1)))
+            db.session.commit()
+            before = token_revocations.is_revoked("a" * 32)
+
+            # Act
+            token_revocations._synced_at -= self.app.config['REVOCATION_SYNC_SECONDS']
+            after = token_revocations.is_revoked("a" * 32)
+
+        # Assert
+        assert (before, after) == (False, True)
+
+    def test_rebuild_compacts_expired_revocations(self):
+        # Arrange
+        with self.app.app_context():
+            db.session.add(RevokedToken(jti="b" * 32, expires_utc=datetime.utcnow() - timedelta(seconds=1)))
+            db.session.add(RevokedToken(jti="c" * 32, expires_utc=datetime.utcnow() + timedelta(hours=1)))
+            db.session.commit()
+
+            # Act
+            token_revocations.rebuild()
+            remaining = [jti for jti, in db.session.query(RevokedToken.jti)]
+
+        # Assert
+        assert remaining == ["c" * 32]
+
+    def test_new_workers_build_the_filter_off_the_request(self):
+        # Arrange
+        with self.app.app_context():
+            db.session.add(RevokedToken(jti="d" * 32, expires_utc=datetime.utcnow() - timedelta(seconds=1)))
+            db.session.add(RevokedToken(jti="e" * 32, expires_utc=datetime.utcnow() + timedelta(hours=1)))
+            db.session.commit()
+        token_revocations._filter, token_revocations._pid = None, None
+
+        # Act
+        with self.app.test_request_context(), count_queries() as stats:
+            revoked = token_revocations.is_revoked("e" * 32)
+        deadline = time.monotonic() + 5
+        while token_revocations._filter is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with self.app.app_context():
+            remaining = [jti for jti, in db.session.query(RevokedToken.jti)]
+
+        # Assert
+        assert revoked is True
+        assert stats.count == 1
+        assert "e" * 32 in token_revocations._filter
+        assert remaining == ["e" * 32]
@@ -0,0 +1,165 @@
+import pytest
+
+from server import create_server, db
+from server.models.user import Role, User
+from server.services.auth import get_new_token
+from server.services.principal import principal_cache
+from server.services.revocation import token_revocations
+from server.services.session import rotate_session
+
+
+class TestUserSessions:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.client = self.app.test_client()
+        principal_cache.clear()
+        token_revocations.clear()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            Role.insert_roles()
+            db.session.add(User(first_name="User", last_name="Test", email="user@example.com", password="password"))
+            db.session.commit()
+        yield
+        token_revocations.clear()
+
+    def login(self, device="Laptop"):
+        response = self.client.post('/api/v1/auth/login',
+                                    json={"email": "user@example.com", "password": "password", "device": device})
+        data = response.get_json()['data']
+        return {"Authorization": f"Bearer {data['user_token']}"}, data['refresh_token']
+
+    def test_refresh_rotates_the_refresh_token(self):
+        # Arrange
+        _, refresh_token = self.login()
+
+        # Act
+        response = self.client.post('/api/v1/auth/refresh', json={"refresh_token": refresh_token})
+        data = response.get_json()['data']
+        user = self.client.get('/api/v1/auth/user', headers={"Authorization": f"Bearer {data['user_token']}"})
+
+        # Assert
+        assert response.status_code == 200
+        assert data['refresh_token'] != refresh_token
+        assert user.status_code == 200
+
+    def test_reusing_a_replaced_refresh_token_revokes_the_session(self):
+        # Arrange
+        _, refresh_token = self.login()
+        rotated = self.client.post('/api/v1/auth/refresh', json={"refresh_token": refresh_token})
+        next_token = rotated.get_json()['data']['refresh_token']
+
+        # Act
+        reused = self.client.post('/api/v1/auth/refresh', json={"refresh_token": refresh_token})
+        after = self.client.post('/api/v1/auth/refresh', json={"refresh_token": next_token})
+
+        # Assert
+        assert reused.status_code == 401
+        assert after.status_code == 401
+
+    def test_sessions_are_listed_and_revoked_per_device(self):
+        # Arrange
+        headers, laptop_token = self.login("Laptop")
+        _, phone_token = self.login("Phone")
+
+        # Act
+        sessions = self.client.get('/api/v1/auth/sessions', headers=headers).get_json()['data']['sessions']
+        laptop = next(session for session in sessions if session['device'] == "Laptop")
+        revoke = self.client.delete(f"/api/v1/auth/sessions/{laptop['id']}", headers=headers)
+        laptop_refresh = self.client.post('/api/v1/auth/refresh', json={"refresh_token": laptop_token})
+        phone_refresh = self.client.post('/api/v1/auth/refresh', json={"refresh_token": phone_token})
+
+        # Assert
+        assert len(sessions) == 2
+        assert all('token_hash' not in session for session in sessions)
+        assert revoke.status_code == 200
+        assert laptop_refresh.status_code == 401
+        assert phone_refresh.status_code == 200
+
+    def test_logout_ends_the_session(self):
+        # Arrange
+        headers, refresh_token = self.login()
+
+        # Act
+        logout = self.client.post('/api/v1/auth/logout', json={"refresh_token": refresh_token}, headers=headers)
+        after = self.client.post('/api/v1/auth/refresh', json={"refresh_token": refresh_token})
+
+        # Assert
+        assert logout.status_code == 200
+        assert after.status_code == 401
+
+    def test_auth_version_change_ends_sessions(self):
+        # Arrange
+        _, refresh_token = self.login()
+        with self.app.app_context():
+            user = User.query.filter_by(email="user@example.com").first()
+            user.auth_version = (user.auth_version or 0) + 1
+            db.session.commit()
+
+        # Act
+        with self.app.app_context():
+            success, message, session = rotate_session(refresh_token)
+
+        # Assert
+        assert not success
+        assert message == 'Refresh token has been superseded'
+
+    def test_legacy_refresh_is_disabled_by_default(self):
+        # Arrange
+        headers, _ = self.login()
+
+        # Act
+        response = self.client.get('/api/v1/auth/refresh', headers=headers)
+
+        # Assert
+        assert response.status_code == 410
+
+    def test_legacy_refresh_revokes_the_token_and_honors_session_revocation(self):
+        # Arrange
+        self.app.config['LEGACY_TOKEN_REFRESH_ENABLED'] = True
+        headers, _ = self.login()
+
+        # Act
+        renewed = self.client.get('/api/v1/auth/refresh', headers=headers)
+        renewed_headers = {"Authorization": f"Bearer {renewed.get_json()['data']['user_token']}"}
+        reused = self.client.get('/api/v1/auth/refresh', headers=headers)
+        self.client.delete('/api/v1/auth/sessions', headers=renewed_headers)
+        after_logout = self.client.get('/api/v1/auth/refresh', headers=renewed_headers)
+
+        # Assert
+        assert renewed.status_code == 200
+        assert reused.status_code == 401
+        assert after_logout.status_code == 401
+
+    def test_legacy_refresh_needs_a_session(self):
+        # Arrange
+        self.app.config['LEGACY_TOKEN_REFRESH_ENABLED'] = True
+        headers, _ = self.login()
+        session_id = self.client.get('/api/v1/auth/sessions', headers=headers).get_json()['data']['sessions'][0]['id']
+        with self.app.app_context():
+            user = User.query.filter_by(email="user@example.com").first()
+            token = get_new_token(user)[2]
+
+        # Act
+        self.client.delete(f"/api/v1/auth/sessions/{session_id}", headers=headers)
+        revoked_session = self.client.get('/api/v1/auth/refresh', headers=headers)
+        sessionless = self.client.get('/api/v1/auth/refresh', headers={"Authorization": f"Bearer {token}"})
+
+        # Assert
+        assert revoked_session.get_json()['data']['error_info'] == 'Session has ended'
+        assert sessionless.status_code == 401
+
+    def test_revoking_all_sessions_supersedes_access_tokens(self):
+        # Arrange
+        headers, refresh_token = self.login()
+
+        # Act
+        revoke = self.client.delete('/api/v1/auth/sessions', headers=headers)
+        after = self.client.get('/api/v1/auth/user', headers=headers)
+        refresh = self.client.post('/api/v1/auth/refresh', json={"refresh_token": refresh_token})
+
+        # Assert
+        assert revoke.status_code == 200
+        assert after.status_code == 401
+        assert refresh.status_code == 401
@@ -0,0 +1,92 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from server.integrations.stripe import StripeIntegration
+from server.services.stripe import get_catalogue_payload, get_products, get_services
+from server.services.stripe_catalogue import StripeCatalogue, stripe_catalogue
+
+PRODUCTS = [
+    {"id": "prod_1", "active": True, "default_price": {"id": "price_1", "type": "one_time"}},
+    {"id": "prod_2", "active": True, "default_price": {"id": "price_2", "type": "recurring"}},
+    {"id": "prod_3", "active": False, "default_price": {"id": "price_3", "type": "one_time"}},
+    {"id": "prod_4", "active": True, "default_price": None},
+]
+
+
+def fake_fetch(self):
+    return True, "successfully obtained products", [dict(product) for product in PRODUCTS]
+
+
+class TestStripeCatalogue:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        stripe_catalogue.clear()
+        yield
+        stripe_catalogue.clear()
+
+    @patch('server.services.stripe_catalogue.get_stripe_integration', return_value=StripeIntegration.__new__(StripeIntegration))
+    def test_partitions_products_and_services_once(self, mock_get_integration):
+        # Act
+        with patch('server.integrations.stripe.StripeIntegration.fetch_products_with_prices',
+                   autospec=True, side_effect=fake_fetch) as mock_fetch:
+            products = get_products()[2]
+            services = get_services()[2]
+
+        # Assert
+        assert [p["id"] for p in products] == ["prod_1"]
+        assert [s["id"] for s in services] == ["prod_2"]
+        assert products[0]["default_price"] == "price_1"
+        assert products[0]["display_price"]["type"] == "one_time"
+        mock_fetch.assert_called_once()
+
+    @patch('server.services.stripe_catalogue.get_stripe_integration', return_value=StripeIntegration.__new__(StripeIntegration))
+    def test_payload_is_encoded_once_per_snapshot(self, mock_get_integration):
+        # Act
+        with patch('server.integrations.stripe.StripeIntegration.fetch_products_with_prices',
+                   autospec=True, side_effect=fake_fetch):
+            first = get_catalogue_payload("services")[2]
+            second = get_catalogue_payload("services")[2]
+
+        # Assert
+        assert first is second
+        assert first.startswith(b'{"services":[{"id":"prod_2"')
+
+    @patch('server.services.stripe_catalogue.get_stripe_integration', return_value=StripeIntegration.__new__(StripeIntegration))
+    def test_stale_snapshot_is_served_while_refreshing(self, mock_get_integration):
+        # Arrange
+        catalogue = StripeCatalogue(fresh_seconds=0, stale_seconds=60, refresh_seconds=0)
+        with patch('server.integrations.stripe.StripeIntegration.fetch_products_with_prices',
+                   autospec=True, side_effect=fake_fetch):
+            catalogue.get()
+        first = catalogue._snapshot
+
+        # Act
+        with patch('server.integrations.stripe.StripeIntegration.fetch_products_with_prices',
+                   autospec=True, side_effect=fake_fetch) as mock_fetch:
+            success, message, snapshot = catalogue.get()
+            deadline = time.time() + 2
+            while catalogue._snapshot is first and time.time() < deadline:
+                time.sleep(0.01)
+
+        # Assert
+        assert snapshot is first
+        mock_fetch.assert_called_once()
+
+    @patch('server.services.stripe_catalogue.get_stripe_integration', return_value=StripeIntegration.__new__(StripeIntegration))
+    def test_expired_snapshot_is_served_when_stripe_fails(self, mock_get_integration):
+        # Arrange
+        catalogue = StripeCatalogue(fresh_seconds=0, stale_seconds=0, refresh_seconds=0)
+        with patch('server.integrations.stripe.StripeIntegration.fetch_products_with_prices',
+                   autospec=True, side_effect=fake_fetch):
+            catalogue.get()
+
+        # Act
+        with patch('server.integrations.stripe.StripeIntegration.fetch_products_with_prices',
+                   return_value=(False, "Stripe error occurred", [])):
+            success, message, snapshot = catalogue.get()
+
+        # Assert
+        assert success is True
+        assert [p["id"] for p in snapshot.products] == ["prod_1"]
@@ -0,0 +1,30 @@
+from uuid import uuid4
+
+from server.utils.bloom_filter import BloomFilter
+
+
+class TestBloomFilter:
+    def test_added_keys_are_always_found(self):
+        # Arrange
+        bloom = BloomFilter(capacity=1000)
+        keys = [uuid4().hex for _ in range(1000)]
+
+        # Act
+        for key in keys:
+            bloom.add(key)
+
+        # Assert
+        assert all(key in bloom for key in keys)
+        assert bloom.count == 1000
+
+    def test_false_positive_rate_is_near_the_target(self):
+        # Arrange
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for _ in range(1000):
+            bloom.add(uuid4().hex)
+
+        # Act
+        false_positives = sum(uuid4().hex in bloom for _ in range(10000))
+
+        # Assert
+        assert false_positives < 300
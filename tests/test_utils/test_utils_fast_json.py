@@ -0,0 +1,68 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+
+from server import create_server
+from server.utils import fast_json
+from server.utils.http_status_codes import handle_status_code
+
+PAYLOAD = {
+    "naive": datetime(2024, 1, 2, 3, 4, 5, 678000),
+    "aware": datetime(2024, 1, 2, 13, 4, 5, tzinfo=timezone(timedelta(hours=10))),
+    "day": date(2024, 1, 2),
+    "uuid": UUID("12345678-1234-5678-1234-567812345678"),
+    "amount": Decimal("10.50"),
+    "name": "Zoë",
+}
+
+EXPECTED = {
+    "naive": "2024-01-02T03:04:05.678Z",
+    "aware": "2024-01-02T03:04:05.000Z",
+    "day": "2024-01-02",
+    "uuid": "12345678-1234-5678-1234-567812345678",
+    "amount": "10.50",
+    "name": "Zoë",
+}
+
+
+class TestFastJSON:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        previous = fast_json.get_json_backend()
+        yield
+        fast_json.set_json_backend(previous)
+
+    @pytest.mark.parametrize('backend', fast_json.JSON_BACKENDS)
+    def test_backends_encode_the_same(self, backend):
+        # Arrange
+        if fast_json.set_json_backend(backend) != backend:
+            pytest.skip(f"{backend} is not installed")
+
+        # Act
+        body = fast_json.dumps_bytes(PAYLOAD)
+
+        # Assert
+        assert json.loads(body) == EXPECTED
+        assert b' ' not in body.replace("Zoë".encode('utf-8'), b'')
+
+    def test_app_encoder_matches(self):
+        # Act
+        with self.app.app_context():
+            encoded = json.loads(json.dumps(PAYLOAD, cls=self.app.json_encoder))
+
+        # Assert
+        assert encoded == EXPECTED
+
+    def test_status_code_response_is_compact(self):
+        # Act
+        with self.app.app_context():
+            response = handle_status_code(201, data={"created": PAYLOAD["naive"]})
+
+        # Assert
+        assert response.status_code == 201
+        assert response.mimetype == 'application/json'
+        assert response.get_data() == b'{"status_code":201,"message":"Created","status":"success","data":{"created":"2024-01-02T03:04:05.678Z"}}'
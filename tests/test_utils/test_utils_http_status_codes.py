@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from server import create_server
+from server.utils.http_status_codes import handle_status_code, raw_status_code
+
+
+class TestHandleStatusCode:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+
+    def test_envelope_matches_the_full_response(self):
+        # Act
+        with self.app.app_context():
+            responses = [handle_status_code(code, data=data)
+                         for code, data in ((200, {"users": [1, 2]}), (404, None), (599, {"info": "x"}))]
+
+        # Assert
+        assert [json.loads(response.get_data()) for response in responses] == [
+            {"status_code": 200, "message": "OK", "status": "success", "data": {"users": [1, 2]}},
+            {"status_code": 404, "message": "API Endpoint Not Found", "status": "Client Error"},
+            {"status_code": 599, "message": "Unknown error", "status": "error", "data": {"info": "x"}},
+        ]
+        assert [response.status_code for response in responses] == [200, 404, 599]
+
+    def test_data_that_is_not_a_dict_is_a_server_error(self):
+        # Act
+        with self.app.app_context():
+            response = handle_status_code(200, data=["not", "a", "dict"])
+
+        # Assert
+        assert response.status_code == 500
+        assert json.loads(response.get_data()) == {"status_code": 500, "message": "Internal Server Error", "status": "server error"}
+
+    def test_raw_data_is_embedded_as_is(self):
+        # Act
+        with self.app.app_context():
+            response = raw_status_code(200, b'{"products":[]}')
+
+        # Assert
+        assert response.mimetype == 'application/json'
+        assert response.get_data() == b'{"status_code":200,"message":"OK","status":"success","data":{"products":[]}}'
@@ -0,0 +1,112 @@
+import io
+import json
+import os
+import time
+
+import pytest
+from loguru import logger
+
+from server import create_server
+from server.utils.log_sink import AsyncLogSink, RotatingFileWriter
+
+
+class TestAsyncLogSink:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.stream = io.StringIO()
+        self.sink = AsyncLogSink(self.stream)
+        self.handler_id = logger.add(self.sink, format="{message}", level="INFO")
+        yield
+        logger.remove(self.handler_id)
+
+    def lines(self):
+        assert self.sink.wait_until_empty()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_records_are_json_lines_with_request_context(self):
+        # Act
+        with self.app.test_request_context('/api/v1/user/', headers={"X-Request-ID": "abc123"}):
+            self.app.preprocess_request()
+            logger.bind(latency_ms=1.5).info("Handled {}", "request")
+
+        # Assert
+        line = self.lines()[-1]
+        assert line["message"] == "Handled request"
+        assert line["level"] == "INFO"
+        assert line["request_id"] == "abc123"
+        assert line["endpoint"] == "user.get_user"
+        assert line["latency_ms"] == 1.5
+
+    def test_full_buffer_drops_and_counts(self):
+        # Arrange
+        logger.remove(self.handler_id)
+        self.sink = AsyncLogSink(self.stream, capacity=0)
+        self.handler_id = logger.add(self.sink, format="{message}", level="INFO")
+
+        # Act
+        for i in range(3):
+            logger.info("Dropped {}", i)
+        time.sleep(0.6)
+
+        # Assert
+        assert self.sink.stats()["dropped"] == 3
+        assert self.lines()[-1]["dropped_total"] == 3
+
+
+def log_files(directory):
+    # The rotation lock file is hidden
+    return [name for name in os.listdir(directory) if not name.startswith('.')]
+
+
+class TestRotatingFileWriter:
+    def test_rotates_and_compresses(self, tmp_path):
+        # Arrange
+        writer = RotatingFileWriter(str(tmp_path / "server.log"), max_bytes=5, backup_count=1, grace_seconds=0)
+
+        # Act
+        writer.write("first\n")
+        writer.write("second\n")
+        writer.write("third\n")
+        writer.close()
+        deadline = time.time() + 2
+        while time.time() < deadline and any(not name.endswith(('.gz', '.log')) for name in log_files(tmp_path)):
+            time.sleep(0.01)
+
+        # Assert
+        names = log_files(tmp_path)
+        assert (tmp_path / "server.log").read_text() == "third\n"
+        assert len([name for name in names if name.endswith('.gz')]) == 1
+
+    def test_size_is_counted_in_bytes(self, tmp_path):
+        # Arrange
+        writer = RotatingFileWriter(str(tmp_path / "server.log"), max_bytes=100, compress=False)
+
+        # Act
+        writer.write("é" * 10)
+
+        # Assert
+        assert writer._size == 20
+        writer.close()
+
+    def test_workers_sharing_a_file_rotate_it_once(self, tmp_path):
+        # Arrange
+        path = str(tmp_path / "server.log")
+        first = RotatingFileWriter(path, max_bytes=20, backup_count=5, compress=False, check_interval=0)
+        second = RotatingFileWriter(path, max_bytes=20, backup_count=5, compress=False, check_interval=0)
+        first.write("01234567890123456789\n")
+        first.flush()
+
+        # Act
+        second.write("second\n")
+        second.flush()
+        first.write("first\n")
+        first.flush()
+        first.close()
+        second.close()
+
+        # Assert
+        rotated = [name for name in log_files(tmp_path) if name != "server.log"]
+        assert len(rotated) == 1
+        assert (tmp_path / rotated[0]).read_text() == "01234567890123456789\n"
+        assert (tmp_path / "server.log").read_text() == "second\nfirst\n"
@@ -0,0 +1,113 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from server import create_server
+from server.extensions import metrics
+from server.utils.metrics import MetricsRegistry, MmapValues
+
+
+class TestMetrics:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.client = self.app.test_client()
+        metrics.clear()
+
+    def test_requests_are_counted_per_endpoint(self):
+        # Act
+        for _ in range(3):
+            self.client.get('/api/v1/server/health')
+        self.client.get('/does-not-exist')
+        body = self.client.get('/api/v1/server/metrics').get_data(as_text=True)
+
+        # Assert
+        assert 'http_requests_total{blueprint="server",endpoint="server.health_check",method="GET",status="418"} 3' in body
+        assert 'endpoint="<unmatched>"' in body
+        assert 'http_request_duration_seconds_bucket{blueprint="server",endpoint="server.health_check",status="418",le="+Inf"} 3' in body
+        assert 'http_request_duration_seconds_count{blueprint="server",endpoint="server.health_check",status="418"} 3' in body
+        assert '# TYPE http_request_duration_seconds histogram' in body
+
+    def test_metrics_are_only_served_to_allowed_scrapers(self):
+        # Arrange
+        metrics.token = "scrape-token"
+
+        # Act
+        local = self.client.get('/api/v1/server/metrics')
+        remote = self.client.get('/api/v1/server/metrics', environ_base={'REMOTE_ADDR': '203.0.113.7'})
+        with_token = self.client.get('/api/v1/server/metrics', environ_base={'REMOTE_ADDR': '203.0.113.7'},
+                                     headers={"Authorization": "Bearer scrape-token"})
+        wrong_token = self.client.get('/api/v1/server/metrics', environ_base={'REMOTE_ADDR': '203.0.113.7'},
+                                      headers={"Authorization": "Bearer other-token"})
+
+        # Assert
+        assert local.status_code == 200
+        assert remote.status_code == 403
+        assert with_token.status_code == 200
+        assert wrong_token.status_code == 403
+
+    def test_buckets_are_cumulative(self):
+        # Arrange
+        registry = MetricsRegistry()
+        histogram = registry.histogram('job_seconds', 'Job time', ('job', ), buckets=(0.1, 1))
+
+        # Act
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, 'sync')
+        body = registry.render()
+
+        # Assert
+        assert 'job_seconds_bucket{job="sync",le="0.1"} 1\n' in body
+        assert 'job_seconds_bucket{job="sync",le="1"} 2\n' in body
+        assert 'job_seconds_bucket{job="sync",le="+Inf"} 3\n' in body
+        assert 'job_seconds_sum{job="sync"} 5.55\n' in body
+
+    def test_mmap_values_are_summed_across_workers(self, tmp_path):
+        # Arrange
+        registry = MetricsRegistry()
+        registry.values = MmapValues(str(tmp_path))
+        counter = registry.counter('jobs_total', 'Jobs run', ('job', ))
+        counter.inc('sync', amount=2)
+        # Another worker's file, written as that worker would have
+        other = MmapValues(str(tmp_path))
+        other._pid = 1
+        other._map = bytearray(4096)
+        other._offset('jobs_total{job="sync"}')
+        other._value.pack_into(other._map, other._offsets['jobs_total{job="sync"}'], 5.0)
+        with open(tmp_path / "metrics_1.db", 'wb') as file:
+            file.write(other._map)
+
+        # Act
+        body = registry.render()
+
+        # Assert
+        assert 'jobs_total{job="sync"} 7\n' in body
+        assert os.path.exists(tmp_path / f"metrics_{os.getpid()}.db")
+
+    @staticmethod
+    def write_worker_file(directory, pid, values):
+        with open(directory / f"metrics_{pid}.db", 'wb') as file:
+            file.write(MmapValues._encode(values))
+
+    def test_exited_workers_are_merged_into_the_archive(self, tmp_path):
+        # Arrange
+        registry = MetricsRegistry()
+        registry.values = MmapValues(str(tmp_path))
+        registry.counter('jobs_total', 'Jobs run', ('job', ))
+        registry.gauge('jobs_running', 'Jobs running')
+        exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+        exited.wait()
+        self.write_worker_file(tmp_path, exited.pid, {'jobs_total{job="sync"}': 4.0, 'jobs_running': 2.0})
+
+        # Act
+        first = registry.render()
+        second = registry.render()
+
+        # Assert
+        assert 'jobs_total{job="sync"} 4\n' in first
+        assert 'jobs_total{job="sync"} 4\n' in second
+        assert 'jobs_running 2' not in second
+        assert not os.path.exists(tmp_path / f"metrics_{exited.pid}.db")
+        assert os.path.exists(tmp_path / MmapValues.archive_name)
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+
+import pytest
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from server import create_server
+from server.utils.passwords import PasswordHasher, PasswordHashingBusy, verify_password_hash
+
+
+class TestPasswordHasher:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.hasher = PasswordHasher()
+        yield
+        self.hasher.shutdown()
+
+    def configure(self, **config):
+        self.app.config.update(config)
+        self.hasher.init_app(self.app)
+
+    def test_pbkdf2_hashes_are_interchangeable_with_werkzeug(self):
+        # Arrange
+        self.configure(PASSWORD_HASH_ALGORITHM='pbkdf2', PASSWORD_PBKDF2_ITERATIONS=1000)
+
+        # Act
+        password_hash = self.hasher.hash("hunter2")
+
+        # Assert
+        assert password_hash.startswith("pbkdf2:sha256:1000$")
+        assert check_password_hash(password_hash, "hunter2")
+        assert self.hasher.verify(generate_password_hash("hunter2"), "hunter2")
+        assert not self.hasher.verify(password_hash, "hunter3")
+
+    def test_scrypt_hashes_fit_the_column(self):
+        # Arrange
+        self.configure(PASSWORD_HASH_ALGORITHM='scrypt', PASSWORD_SCRYPT_N=1024)
+
+        # Act
+        password_hash = self.hasher.hash("hunter2")
+
+        # Assert
+        assert len(password_hash) <= 128
+        assert verify_password_hash(password_hash, "hunter2")
+        assert not verify_password_hash(password_hash, "hunter3")
+
+    def test_changed_parameters_need_a_rehash(self):
+        # Arrange
+        self.configure(PASSWORD_HASH_ALGORITHM='pbkdf2', PASSWORD_PBKDF2_ITERATIONS=1000)
+        password_hash = self.hasher.hash("hunter2")
+
+        # Act
+        before = self.hasher.needs_rehash(password_hash)
+        self.configure(PASSWORD_PBKDF2_ITERATIONS=2000)
+        after = self.hasher.needs_rehash(password_hash)
+
+        # Assert
+        assert (before, after) == (False, True)
+
+    def test_dummy_hash_is_made_at_init_app(self):
+        # Arrange
+        self.configure(PASSWORD_HASH_ALGORITHM='pbkdf2', PASSWORD_PBKDF2_ITERATIONS=1000)
+        dummy_hash = self.hasher._dummy_hash
+
+        # Act
+        self.hasher.workers, self.hasher.max_pending = 1, 0
+        result = self.hasher.dummy_hash()
+
+        # Assert
+        assert dummy_hash.startswith("pbkdf2:sha256:1000$")
+        assert result == dummy_hash
+
+    def test_cpus_are_shared_between_web_workers(self):
+        # Act
+        self.configure(PASSWORD_HASH_WORKERS=-1, WEB_CONCURRENCY=2, PASSWORD_HASH_MAX_PENDING=0,
+                       PASSWORD_PBKDF2_ITERATIONS=1000)
+        shared = self.hasher.workers
+        self.configure(PASSWORD_HASH_WORKERS=-1, WEB_CONCURRENCY=(os.cpu_count() or 1) * 4)
+        oversubscribed = self.hasher.workers
+
+        # Assert
+        assert shared == max(1, (os.cpu_count() or 1) // 2)
+        assert oversubscribed == 1
+        assert self.hasher.max_pending == 4
+
+    def test_saturated_pool_rejects_straight_away(self):
+        # Arrange
+        self.configure(PASSWORD_HASH_ALGORITHM='pbkdf2', PASSWORD_PBKDF2_ITERATIONS=2000000,
+                       PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=1)
+        slow = threading.Thread(target=self.hasher.hash, args=("hunter2",))
+        slow.start()
+        while self.hasher.pending() == 0:
+            time.sleep(0.001)
+
+        # Act
+        start = time.perf_counter()
+        with pytest.raises(PasswordHashingBusy):
+            self.hasher.verify("pbkdf2:sha256:1000$salt$00", "hunter2")
+        rejected_after = time.perf_counter() - start
+        slow.join()
+
+        # Assert
+        assert rejected_after < 0.1
+        assert self.hasher.pending() == 0
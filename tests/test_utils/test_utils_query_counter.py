@@ -0,0 +1,49 @@
+import pytest
+from loguru import logger
+
+from server import create_server, db
+from server.models.user import Role, User
+from server.utils.query_counter import count_queries
+
+
+class TestQueryCounter:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.client = self.app.test_client()
+        self.messages = []
+        handler_id = logger.add(lambda message: self.messages.append(message.record['message']), level="WARNING")
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            Role.insert_roles()
+            db.session.add(User(first_name="Admin", last_name="Account", email=self.app.config['ADMIN_EMAIL'], password="password"))
+            for i in range(5):
+                db.session.add(User(first_name=f"User{i}", last_name="Test", email=f"user{i}@example.com", password="password"))
+            db.session.commit()
+        yield
+        logger.remove(handler_id)
+
+    def test_repeated_statements_are_flagged_as_n_plus_one(self):
+        # Arrange
+        @self.app.route('/n-plus-one')
+        def n_plus_one():
+            return {"roles": [user.get_role_name() for user in User.query.all()]}
+
+        # Act
+        self.client.get('/n-plus-one')
+
+        # Assert
+        warnings = [message for message in self.messages if message.startswith("Probable N+1 query on n_plus_one")]
+        assert len(warnings) == 1
+        assert "6 executions of SELECT roles." in warnings[0]
+
+    def test_count_queries_outside_a_request(self):
+        # Act
+        with self.app.app_context(), count_queries() as stats:
+            User.query.all()
+            User.query.filter_by(email="user1@example.com").first()
+
+        # Assert
+        assert stats.count == 2
+        assert stats.repeated(2) == []
@@ -0,0 +1,146 @@
+import pytest
+
+from server import create_server, db
+from server.extensions import limiter
+from server.utils.rate_limiter import (MemoryStorage, SharedMemoryStorage,
+                                       SlidingWindow, SQLiteStorage,
+                                       TokenBucket)
+
+
+class TestAlgorithms:
+
+    def test_token_bucket_allows_capacity_then_rejects(self):
+        # Arrange
+        bucket = TokenBucket(3, 30)
+        state = None
+
+        # Act
+        results = []
+        for _ in range(4):
+            state, result = bucket.hit(state, 100.0)
+            results.append(result)
+
+        # Assert
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert results[2].remaining == 0
+        assert results[3].retry_after == pytest.approx(10.0)
+
+    def test_token_bucket_refills_over_time(self):
+        # Arrange
+        bucket = TokenBucket(2, 10)
+        state = None
+        for _ in range(2):
+            state, _ = bucket.hit(state, 100.0)
+
+        # Act
+        state, result = bucket.hit(state, 105.0)
+
+        # Assert
+        assert result.allowed is True
+
+    def test_sliding_window_rejects_over_limit(self):
+        # Arrange
+        window = SlidingWindow(2, 10)
+        state = None
+
+        # Act
+        state, first = window.hit(state, 100.0)
+        state, second = window.hit(state, 101.0)
+        state, third = window.hit(state, 102.0)
+
+        # Assert
+        assert first.allowed and second.allowed
+        assert third.allowed is False
+        assert third.retry_after == pytest.approx(8.0)
+
+    def test_sliding_window_weights_previous_window(self):
+        # Arrange
+        window = SlidingWindow(2, 10)
+        state = None
+        state, _ = window.hit(state, 101.0)
+        state, _ = window.hit(state, 102.0)
+
+        # Act - early in the next window the previous requests still count
+        state, early = window.hit(state, 111.0)
+        # Act - once most of the previous window has slid out there is room again
+        state, late = window.hit(state, 116.0)
+
+        # Assert
+        assert early.allowed is False
+        assert late.allowed is True
+
+
+class TestStorage:
+
+    @pytest.fixture(params=['memory', 'shared_memory', 'sqlite'])
+    def storage(self, request, tmp_path):
+        if request.param == 'memory':
+            return MemoryStorage(max_keys=16)
+        if request.param == 'shared_memory':
+            return SharedMemoryStorage(str(tmp_path / 'limits.shm'), slots=64)
+        return SQLiteStorage(str(tmp_path / 'limits.sqlite'))
+
+    def test_counts_are_kept_per_key(self, storage):
+        # Arrange
+        algorithm = SlidingWindow(2, 60)
+
+        # Act
+        allowed = [storage.apply('a', algorithm, 1000.0).allowed for _ in range(3)]
+        other = storage.apply('b', algorithm, 1000.0)
+
+        # Assert
+        assert allowed == [True, True, False]
+        assert other.allowed is True
+
+    def test_reset_clears_state(self, storage):
+        # Arrange
+        algorithm = TokenBucket(1, 60)
+        storage.apply('a', algorithm, 1000.0)
+
+        # Act
+        storage.reset()
+        result = storage.apply('a', algorithm, 1000.0)
+
+        # Assert
+        assert result.allowed is True
+
+    def test_shared_memory_is_visible_to_other_instances(self, tmp_path):
+        # Arrange - two instances on one file behave like two workers
+        path = str(tmp_path / 'limits.shm')
+        first = SharedMemoryStorage(path, slots=64)
+        second = SharedMemoryStorage(path, slots=64)
+        algorithm = SlidingWindow(1, 60)
+
+        # Act
+        allowed = first.apply('login:127.0.0.1', algorithm, 1000.0)
+        rejected = second.apply('login:127.0.0.1', algorithm, 1000.0)
+
+        # Assert
+        assert allowed.allowed is True
+        assert rejected.allowed is False
+
+
+class TestRateLimitDecorator:
+
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.client = self.app.test_client()
+        limiter.storage.reset()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+
+    def test_login_is_limited_with_headers(self):
+        # Act
+        responses = [
+            self.client.post('/api/v1/auth/login', json={}) for _ in range(51)
+        ]
+
+        # Assert
+        assert responses[0].status_code == 400
+        assert responses[0].headers['X-RateLimit-Limit'] == '50'
+        assert responses[49].headers['X-RateLimit-Remaining'] == '0'
+        assert responses[50].status_code == 429
+        assert responses[50].get_json()['status_code'] == 429
+        assert int(responses[50].headers['Retry-After']) >= 1
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from server import create_server, db
+from server.models.user import Role, User
+from server.utils.serializer import get_serializer, serialize_many
+
+
+class TestSerializer:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            Role.insert_roles()
+            self.user = User(first_name="Test", last_name="User", email="test@example.com", password="password")
+            self.user.created_utc = datetime(2024, 1, 2, 3, 4, 5, 678000)
+            db.session.add(self.user)
+            db.session.commit()
+            yield
+
+    def test_public_fields_and_zulu_datetimes(self):
+        # Act
+        user_dict = self.user.to_dict()
+
+        # Assert
+        assert 'password_hash' not in user_dict and 'auth_version' not in user_dict
+        assert user_dict['email'] == "test@example.com"
+        assert user_dict['created_utc'] == "2024-01-02T03:04:05.678Z"
+
+    def test_include_sensitive(self):
+        # Act
+        user_dict = self.user.to_dict(include_sensitive=True)
+        role_dict = Role.query.first().to_dict(include_sensitive=True)
+
+        # Assert
+        assert user_dict['password_hash'] == self.user.password_hash
+        assert 'permissions' in role_dict
+        assert 'permissions' not in Role.query.first().to_dict()
+
+    def test_rows_serialize_like_models(self):
+        # Arrange
+        rows = db.session.query(*User.public_columns(), Role.name.label('role_name')).outerjoin(
+            Role, User.role_id == Role.id).all()
+
+        # Act
+        users = serialize_many(User, rows, extra=('role_name',))
+
+        # Assert
+        assert users == [{**self.user.to_dict(), 'role_name': 'User'}]
+
+    def test_aware_datetimes_are_converted_to_utc(self):
+        # Arrange
+        self.user.created_utc = datetime(2024, 1, 2, 13, 0, tzinfo=timezone(timedelta(hours=10)))
+
+        # Act
+        created = get_serializer(User)(self.user)['created_utc']
+
+        # Assert
+        assert created == "2024-01-02T03:00:00.000Z"
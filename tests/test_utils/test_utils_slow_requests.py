@@ -0,0 +1,73 @@
+import pytest
+
+from server import create_server, db
+from server.models.user import Role, User
+from server.utils.slow_requests import read_journal, redact_parameters
+from server.utils.timing import phase
+
+
+class TestSlowRequestJournal:
+    @pytest.fixture(autouse=True)
+    def setUp(self, tmp_path):
+        self.app = create_server('testing')
+        self.journal = str(tmp_path / 'journal.jsonl')
+        self.app.config['SLOW_REQUEST_JOURNAL_PATH'] = self.journal
+        self.app.config['SLOW_REQUEST_MS'] = 0.001
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            Role.insert_roles()
+
+        @self.app.route('/slow/<int:item_id>', methods=['POST'])
+        def slow(item_id):
+            User.query.all()
+            with phase("stripe", detail="Product.list"):
+                pass
+            return {"item": item_id}
+
+    def test_slow_request_is_journaled_with_context(self):
+        # Act
+        self.client.post('/slow/7?expand=prices', json={"email": "user@example.com", "password": "hunter2"})
+
+        # Assert
+        entry, = read_journal(self.journal)
+        assert entry['endpoint'] == 'slow'
+        assert entry['parameters'] == {
+            "path": {"item_id": 7},
+            "query": {"expand": "prices"},
+            "body": {"email": "user@example.com", "password": "[redacted]"},
+        }
+        assert entry['queries']['count'] == 1
+        assert entry['queries']['statements'][0]['statement'].startswith('SELECT users.')
+        assert entry['stripe_calls'][0]['call'] == 'Product.list'
+        assert {'db', 'app', 'total'} <= entry['timings'].keys()
+
+    def test_secrets_nested_in_lists_are_redacted(self):
+        # Act
+        redacted = redact_parameters({"creds": [{"user": "admin", "password": "hunter2"}], "ids": (1, 2)})
+
+        # Assert
+        assert redacted == {"creds": [{"user": "admin", "password": "[redacted]"}], "ids": [1, 2]}
+
+    def test_fast_requests_are_not_journaled(self):
+        # Arrange
+        self.app.config['SLOW_REQUEST_MS'] = 60000
+
+        # Act
+        self.client.post('/slow/7')
+
+        # Assert
+        assert read_journal(self.journal) == []
+
+    def test_journal_is_read_newest_first_across_rotations(self):
+        # Arrange
+        self.app.config['SLOW_REQUEST_JOURNAL_MAX_BYTES'] = 1
+        for item_id in range(3):
+            self.client.post(f'/slow/{item_id}')
+
+        # Act
+        entries = read_journal(self.journal, limit=2)
+
+        # Assert
+        assert [entry['parameters']['path']['item_id'] for entry in entries] == [2, 1]
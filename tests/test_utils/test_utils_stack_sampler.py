@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from server import create_server
+from server.utils.stack_sampler import ContinuousProfiler, folded_stack
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def idle_wait(stop):
+    stop.wait()
+
+
+class TestContinuousProfiler:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.app.config['PROFILER_ENABLED'] = True
+        self.app.config['PROFILER_HZ'] = 200
+        self.profiler = ContinuousProfiler()
+        self.profiler.init_app(self.app)
+        self.stop = threading.Event()
+        self.threads = [threading.Thread(target=target, args=(self.stop,)) for target in (busy_loop, idle_wait)]
+        yield
+        self.stop.set()
+        self.profiler.stop()
+
+    def test_only_threads_using_cpu_are_counted(self):
+        # Arrange
+        for thread in self.threads:
+            thread.start()
+
+        # Act
+        self.profiler._ensure_running()
+        time.sleep(0.5)
+        stacks = self.profiler.folded()
+
+        # Assert
+        assert any(':busy_loop:' in stack for stack in stacks)
+        if self.profiler.cpu_only:
+            assert not any(':idle_wait:' in stack for stack in stacks)
+
+    def test_windows_roll_over(self):
+        # Arrange
+        self.profiler.window_seconds = 0.02
+        self.threads[0].start()
+
+        # Act
+        self.profiler._ensure_running()
+        time.sleep(0.5)
+
+        # Assert
+        assert len(self.profiler.windows) == self.app.config['PROFILER_WINDOWS']
+        assert sum(self.profiler.folded(0.05).values()) < sum(self.profiler.folded().values())
+
+    def test_folded_stack_is_outermost_first(self):
+        # Act
+        stack = folded_stack(__import__('sys')._getframe())
+
+        # Assert
+        assert stack.split(';')[-1].startswith(f"{__name__}:test_folded_stack_is_outermost_first:")
@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from server import create_server, db
+from server.models.user import Role, User
+from server.services.auth import get_new_token
+from server.services.principal import principal_cache
+from server.utils.timing import phase, request_timings, server_timing_header
+
+
+class TestServerTiming:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.app = create_server('testing')
+        self.client = self.app.test_client()
+        principal_cache.clear()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            Role.insert_roles()
+            admin = User(first_name="Admin", last_name="Account", email=self.app.config['ADMIN_EMAIL'], password="password")
+            db.session.add(admin)
+            db.session.commit()
+            success, message, token = get_new_token(admin)
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def test_response_reports_each_phase(self):
+        # Act
+        response = self.client.get('/api/v1/user/all', headers=self.headers)
+
+        # Assert
+        metrics = {metric.split(';')[0] for metric in response.headers['Server-Timing'].split(', ')}
+        assert {"auth", "db", "serialize", "app", "middleware", "total"} <= metrics
+
+    def test_phases_accumulate_with_counts(self):
+        # Act
+        with self.app.test_request_context('/'):
+            for _ in range(2):
+                with phase("stripe"):
+                    time.sleep(0.01)
+            timings = request_timings()
+
+        # Assert
+        duration, count = timings["stripe"]
+        assert duration >= 20 and count == 2
+        assert server_timing_header({"stripe": timings["stripe"]}) == f'stripe;dur={duration};desc="Stripe (2)"'
+
+    def test_header_can_be_disabled(self):
+        # Arrange
+        self.app.config['SERVER_TIMING_ENABLED'] = False
+
+        # Act
+        response = self.client.get('/')
+
+        # Assert
+        assert 'Server-Timing' not in response.headers